@@ -0,0 +1,93 @@
+# benchmarks/bench_custos_concurrency.py
+#
+# Latência do /api/custos/ com outras requisições em voo (status lento + custos concorrentes),
+# comparando o Redis assíncrono atual com um Redis bloqueante (comportamento do cliente síncrono antigo).
+#
+# Uso (na raiz do projeto):  python -m benchmarks.bench_custos_concurrency --concurrency 50
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from benchmarks.fakes import FakeRedis, percentile
+from benchmarks.mock_dialer import create_app, free_port, start_in_thread
+
+
+async def _measure_custos(client, n: int) -> list[float]:
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = await client.get("/api/custos/")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+async def _background_load(client, stop: asyncio.Event, concurrency: int):
+    async def _worker(i: int):
+        path = "/api/status/MG" if i % 2 else "/api/custos/"
+        while not stop.is_set():
+            await client.get(path)
+
+    await asyncio.gather(*(_worker(i) for i in range(concurrency)))
+
+
+async def _scenario(label: str, fake_redis: FakeRedis, concurrency: int, samples: int):
+    import httpx
+    from api_server import app
+    from utils.http_clients import dialer_clients
+    from utils.redis_client import redis_store
+
+    fake_redis.data["cache_lovable"] = json.dumps({"saldo_atual": 1500.0, "custo_diario_total": 42.5})
+    redis_store._client = fake_redis
+    await dialer_clients.start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=60) as client:
+        idle = await _measure_custos(client, samples)
+
+        stop = asyncio.Event()
+        load = asyncio.create_task(_background_load(client, stop, concurrency))
+        await asyncio.sleep(0.2)  # Deixa a carga estabilizar
+        loaded = await _measure_custos(client, samples)
+        stop.set()
+        await load
+
+    await dialer_clients.aclose()
+    redis_store._client = None
+
+    print(f"{label:<22} ocioso p50 {statistics.median(idle):7.2f} ms p95 {percentile(idle, 0.95):7.2f} ms | "
+          f"com carga p50 {statistics.median(loaded):7.2f} ms p95 {percentile(loaded, 0.95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência do /api/custos/ sob concorrência")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requisições simultâneas em voo")
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--redis-latency-ms", type=float, default=5.0)
+    parser.add_argument("--dialer-latency-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    os.environ["BASE_URL_MG"] = f"http://127.0.0.1:{port}"
+    # Sem cache no /api/status: toda requisição de status vai ao discador lento
+    os.environ["STATUS_CACHE_TTL_SECONDS"] = "0"
+    os.environ["STATUS_CACHE_STALE_SECONDS"] = "0"
+    server = start_in_thread(create_app(latency_ms=args.dialer_latency_ms), port)
+
+    try:
+        print(f"{args.concurrency} requisições em voo | Redis {args.redis_latency_ms} ms | "
+              f"discador {args.dialer_latency_ms} ms")
+        asyncio.run(_scenario("Redis bloqueante", FakeRedis(args.redis_latency_ms, blocking=True),
+                              args.concurrency, args.samples))
+        asyncio.run(_scenario("Redis assíncrono", FakeRedis(args.redis_latency_ms),
+                              args.concurrency, args.samples))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# benchmarks/bench_e2e.py
+#
+# Benchmark ponta a ponta contra o discador falso (benchmarks/mock_dialer.py), pelo mesmo código
+# de produção: run_monitor (http e navegador), get_active_campaign_metrics, upload do mailing e
+# restart_campaign. Reporta p50/p95/p99 por cenário, erros e RSS (processo Python e Chromium).
+#
+#   monitor_http    : run_monitor com MONITOR_MODE=http (ch.php via httpx com o cookie da sessão)
+#   monitor_browser : leitura do ch.php pelo navegador do pool
+#   metricas_api    : list_campaign.php + campaign_exec.php
+#   upload          : transformação + import_mailling.php (mailing sintético de --upload-rows linhas)
+#   restart         : restart_campaign completo (navegação, finalização, dropdowns, envio)
+#
+# Uso (na raiz do projeto):
+#   python -m benchmarks.bench_e2e --iterations 50 --latency-ms 40 --error-rate 0.05 --ui-delay-ms 200
+
+import argparse
+import asyncio
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+from benchmarks.fakes import FakeTraceStore, percentile
+from benchmarks.mock_dialer import LOGIN_PATH, create_app, free_port, start_in_thread
+
+SCENARIOS = ["monitor_http", "monitor_browser", "metricas_api", "upload", "restart"]
+
+
+def _rss_mb(pid: int) -> float:
+    """RSS atual de um processo (Linux: /proc/<pid>/status). 0 se indisponível."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _descendants(root: int) -> list[int]:
+    """PIDs descendentes (o Chromium e seus renderers são filhos do driver do Playwright)."""
+    parents: dict[int, int] = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # O nome do processo vem entre parênteses e pode conter espaços
+                parents[int(entry)] = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    found, frontier = [], [root]
+    while frontier:
+        pid = frontier.pop()
+        children = [child for child, parent in parents.items() if parent == pid]
+        found.extend(children)
+        frontier.extend(children)
+    return found
+
+
+def _memory() -> dict:
+    return {
+        "python_mb": _rss_mb(os.getpid()),
+        "python_pico_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KB no Linux
+        "filhos_mb": sum(_rss_mb(pid) for pid in _descendants(os.getpid())),
+    }
+
+
+async def _measure(iterations: int, call, ok) -> dict:
+    """Executa `call` em sequência; `ok(resultado)` decide se a execução conta como sucesso."""
+    latencies, errors = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            result = await call()
+            if not ok(result):
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"amostras": latencies, "erros": errors, **_memory()}
+
+
+async def _bench(scenarios: list[str], iterations: int, restart_runs: int, upload_rows: int):
+    from benchmarks.bench_mailing_transform import generate_mailing
+    from scripts.monitor import run_monitor
+    from scripts.restart_campaign import restart_campaign
+    from utils import run_trace
+    from utils.dialer_driver import PlaywrightDialerDriver
+    from utils.http_clients import dialer_clients
+    from utils.login_manager import browser_pool
+    from utils.mailing_api import api_import_mailling_upload, get_active_campaign_metrics
+
+    # Traces do restart em memória: o benchmark não depende do Redis
+    run_trace.trace_store = traces = FakeTraceStore()
+    mailing_path = generate_mailing(upload_rows) if "upload" in scenarios else None
+
+    calls = {
+        "monitor_http": (iterations, lambda: run_monitor("MG"),
+                         lambda r: r["status"] == "OK" and r["fonte"] == "http"),
+        "monitor_browser": (iterations, lambda: PlaywrightDialerDriver().active_calls("MG"), lambda r: r >= 0),
+        "metricas_api": (iterations, lambda: get_active_campaign_metrics("MG"), lambda r: r["nome"] != "ERRO API"),
+        "upload": (iterations, lambda: api_import_mailling_upload("MG", "20", source_csv_path=mailing_path,
+                                                                  mailling_name="BENCH"),
+                   lambda r: bool(r.get("success"))),
+        "restart": (restart_runs, lambda: restart_campaign("MG"), bool),
+    }
+
+    await dialer_clients.start()
+    results = {"inicial": _memory()}
+    try:
+        # Aquece o pool (navegador + login pelo formulário) fora das medições
+        await browser_pool.get_context("MG")
+        for name in scenarios:
+            n, call, ok = calls[name]
+            results[name] = await _measure(n, call, ok)
+    finally:
+        await browser_pool.close()
+        await dialer_clients.aclose()
+
+    inicial = results.pop("inicial")
+    print(f"RSS inicial: Python {inicial['python_mb']:.0f} MB\n")
+    print(f"{'cenário':<16} {'n':>4} {'erros':>5} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'RSS py (MB)':>11} {'pico py':>8} {'RSS chromium':>12}")
+    for name, result in results.items():
+        samples = result["amostras"]
+        print(f"{name:<16} {len(samples):>4} {result['erros']:>5} {statistics.median(samples):>9.1f} "
+              f"{percentile(samples, 0.95):>9.1f} {percentile(samples, 0.99):>9.1f} "
+              f"{result['python_mb']:>11.0f} {result['python_pico_mb']:>8.0f} {result['filhos_mb']:>12.0f}")
+
+    if traces.traces:
+        print("\nEtapas do restart, média:")
+        for etapa, duracao in traces.mean_step_durations().items():
+            print(f"  {etapa:<22} {duracao:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ponta a ponta contra o discador falso")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--iterations", type=int, default=30, help="Execuções por cenário")
+    parser.add_argument("--restart-runs", type=int, default=3, help="Execuções do cenário restart")
+    parser.add_argument("--upload-rows", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência simulada do PHP")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de HTTP 500 em ch.php e /api/")
+    parser.add_argument("--active-calls", type=int, default=12)
+    parser.add_argument("--ui-delay-ms", type=int, default=100, help="Atraso de cada transição da tela Enviar")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # O registro de servidores e o login_manager leem o .env na importação: tudo aponta para o stand-in
+    os.environ.update({
+        "BASE_URL_MG": base_url,
+        "LOGIN_URL_MG": base_url + LOGIN_PATH,
+        "MONITOR_MODE_MG": "http",
+        "DISCADOR_USER": "bench",
+        "DISCADOR_PASS": "bench",
+        "API_TOKEN": "bench",
+        "HEADLESS_MODE": "True",
+        "SESSION_CACHE_BACKEND": "disk",
+        "SESSION_CACHE_DIR": tempfile.mkdtemp(prefix="bench_sessions_"),
+    })
+    app = create_app(args.latency_ms, args.error_rate, args.active_calls, args.ui_delay_ms)
+    server = start_in_thread(app, port)
+    try:
+        asyncio.run(_bench(args.scenarios, args.iterations, args.restart_runs, args.upload_rows))
+        print(f"\nStand-in: {base_url} | {app.state.dialer.snapshot()}")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
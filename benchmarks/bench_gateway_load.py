@@ -0,0 +1,280 @@
+# benchmarks/bench_gateway_load.py
+#
+# Carga no gateway (api_server.py) rodando no próprio processo (ASGI, sem rede), com Redis falso
+# (benchmarks/fakes.py) e o discador falso (benchmarks/mock_dialer.py) numa thread. Por cenário:
+# vazão, latência p50/p95/p99 por rota, erros e atraso do event loop do gateway.
+#
+#   dashboard    : --users dashboards fazendo polling de status (MG/SP), custos e logs
+#   upload_burst : --uploads envios simultâneos de mailing (multipart), acompanhando cada job até o fim
+#   misto        : dashboards + worker de custos (POST /api/atualizar-custos) + uploads esparsos
+#
+# O resultado vai para JSON (commit, parâmetros e métricas) para comparar execuções entre commits.
+#
+# Uso (na raiz do projeto):
+#   python -m benchmarks.bench_gateway_load --users 100 --duration 20
+#   python -m benchmarks.bench_gateway_load --compare benchmarks/results/gateway_load_<commit>.json
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks.fakes import FakeRedis, percentile
+from benchmarks.mock_dialer import create_app, free_port, start_in_thread
+
+SCENARIOS = ["dashboard", "upload_burst", "misto"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+LAG_INTERVAL = 0.01  # Segundos entre as sondas de atraso do event loop
+
+
+def _stats(samples: list[float]) -> dict:
+    if not samples:
+        return {"n": 0}
+    return {"n": len(samples), "p50_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2), "p99_ms": round(percentile(samples, 0.99), 2),
+            "max_ms": round(max(samples), 2)}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def _sample_csv(rows: int) -> bytes:
+    """Mailing de origem mínimo (31 colunas separadas por ';', telefone na coluna 29)."""
+    lines = [";".join(f"COLUNA_{i}" for i in range(31))]
+    for i in range(rows):
+        cols = ["x"] * 31
+        cols[0], cols[1], cols[3], cols[29] = f"CLIENTE {i}", f"{i:011d}", f"CH{i}", f"3199{i % 10 ** 7:07d}"
+        lines.append(";".join(cols))
+    return ("\r\n".join(lines) + "\r\n").encode("latin-1")
+
+
+class LoadRecorder:
+    """Latências por rota, erros e atraso do event loop durante um cenário."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.loop_lag: list[float] = []
+
+    async def request(self, client, route: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.latencies.setdefault(route, []).append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+    async def watch_loop(self, stop: asyncio.Event):
+        """Atraso do event loop: quanto cada sleep de LAG_INTERVAL passou do previsto."""
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.loop_lag.append(max(0.0, (time.perf_counter() - start - LAG_INTERVAL) * 1000))
+
+    def summary(self, duration: float) -> dict:
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "duracao_s": round(duration, 2),
+            "requisicoes": total,
+            "vazao_rps": round(total / duration, 1) if duration else 0.0,
+            "erros": sum(self.errors.values()),
+            "rotas": {route: {**_stats(samples), "erros": self.errors.get(route, 0)}
+                      for route, samples in sorted(self.latencies.items())},
+            "lag_event_loop": _stats(self.loop_lag),
+        }
+
+
+async def _dashboard_user(client, rec: LoadRecorder, stop: asyncio.Event, poll_seconds: float):
+    """Um dashboard aberto: a cada ciclo busca status dos dois servidores, custos e logs."""
+    while not stop.is_set():
+        await asyncio.gather(
+            rec.request(client, "GET /api/status/{id}", "GET", "/api/status/MG"),
+            rec.request(client, "GET /api/status/{id}", "GET", "/api/status/SP"),
+            rec.request(client, "GET /api/custos/", "GET", "/api/custos/"),
+            rec.request(client, "GET /api/logs/", "GET", "/api/logs/"),
+        )
+        await asyncio.sleep(poll_seconds)
+
+
+async def _cost_worker(client, rec: LoadRecorder, stop: asyncio.Event, every_seconds: float):
+    """Worker de custos empurrando a coleta para o gateway."""
+    custo = 10.0
+    while not stop.is_set():
+        custo += 0.5
+        payload = {"saldo_atual": 1500.0 - custo, "custo_diario_total": custo}
+        await rec.request(client, "POST /api/atualizar-custos", "POST", "/api/atualizar-custos", json=payload)
+        await asyncio.sleep(every_seconds)
+
+
+async def _upload(client, rec: LoadRecorder, csv_bytes: bytes, server: str, job_times: list[float]):
+    """Envia um mailing (202 + job) e acompanha o job até terminar."""
+    start = time.perf_counter()
+    response = await rec.request(
+        client, "POST /api/upload/{id}/arquivo", "POST", f"/api/upload/{server}/arquivo",
+        files={"file": ("mailing.csv", csv_bytes, "text/csv")}, data={"mailling_name": "BENCH"},
+    )
+    if response is None or response.status_code != 202:
+        return
+    status_url = response.json()["status_url"]
+    while True:
+        job = await rec.request(client, "GET /api/upload/jobs/{id}", "GET", status_url)
+        if job is None or job.json().get("estado") in ("concluido", "falhou"):
+            break
+        await asyncio.sleep(0.1)
+    job_times.append((time.perf_counter() - start) * 1000)
+
+
+async def _uploads_every(client, rec: LoadRecorder, stop: asyncio.Event, csv_bytes: bytes, every_seconds: float,
+                         job_times: list[float]):
+    uploads = []
+    while not stop.is_set():
+        uploads.append(asyncio.create_task(_upload(client, rec, csv_bytes, "MG", job_times)))
+        await asyncio.sleep(every_seconds)
+    await asyncio.gather(*uploads)
+
+
+async def _scenario(name: str, args, csv_bytes: bytes) -> dict:
+    import httpx
+    import api_server
+    from utils.http_clients import dialer_clients
+    from utils.redis_client import redis_store
+    from utils.upload_jobs import upload_jobs
+
+    # Estado novo por cenário: Redis falso com custos já coletados e cache de status vazio
+    fake_redis = FakeRedis(args.redis_latency_ms)
+    fake_redis.data["cache_lovable"] = json.dumps({"saldo_atual": 1500.0, "custo_diario_total": 42.5})
+    redis_store._client = fake_redis
+    api_server.status_cache._entries.clear()
+    api_server.status_cache._inflight.clear()
+    upload_jobs._semaphores.clear()  # Cada cenário roda num event loop novo (asyncio.run)
+    await dialer_clients.start()
+
+    rec, stop, job_times = LoadRecorder(), asyncio.Event(), []
+    transport = httpx.ASGITransport(app=api_server.app)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=120) as client:
+        watcher = asyncio.create_task(rec.watch_loop(stop))
+        tasks = []
+        if name in ("dashboard", "misto"):
+            tasks += [_dashboard_user(client, rec, stop, args.poll_seconds) for _ in range(args.users)]
+        if name == "misto":
+            tasks.append(_cost_worker(client, rec, stop, 1.0))
+            tasks.append(_uploads_every(client, rec, stop, csv_bytes, args.duration / max(1, args.uploads), job_times))
+
+        if name == "upload_burst":
+            # Rajada: todos os envios de uma vez; o cenário dura até o último job terminar
+            await asyncio.gather(*(_upload(client, rec, csv_bytes, "MG" if i % 2 else "SP", job_times)
+                                   for i in range(args.uploads)))
+        else:
+            running = [asyncio.create_task(task) for task in tasks]
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(*running)
+        stop.set()
+        await watcher
+    duration = time.perf_counter() - start
+
+    await dialer_clients.aclose()
+    redis_store._client = None
+
+    result = rec.summary(duration)
+    if job_times:
+        result["jobs_upload"] = _stats(job_times)
+    return result
+
+
+def _print(name: str, result: dict):
+    lag = result["lag_event_loop"]
+    print(f"\n== {name}: {result['requisicoes']} req em {result['duracao_s']} s | {result['vazao_rps']} req/s | "
+          f"{result['erros']} erro(s) | lag do loop p99 {lag.get('p99_ms', 0)} ms (máx {lag.get('max_ms', 0)} ms)")
+    for route, stats in result["rotas"].items():
+        print(f"   {route:<32} n {stats['n']:>6} | p50 {stats['p50_ms']:8.2f} | p95 {stats['p95_ms']:8.2f} | "
+              f"p99 {stats['p99_ms']:8.2f} ms | erros {stats['erros']}")
+    if "jobs_upload" in result:
+        jobs = result["jobs_upload"]
+        print(f"   {'job de upload (envio -> fim)':<32} n {jobs['n']:>6} | p50 {jobs['p50_ms']:8.2f} | "
+              f"p95 {jobs['p95_ms']:8.2f} | p99 {jobs['p99_ms']:8.2f} ms")
+
+
+def _compare(current: dict, baseline_path: str):
+    """Diferença de vazão, p95 por rota e lag em relação a um JSON salvo anteriormente."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nComparação com {baseline['commit']} ({baseline['data']}):")
+    for name, result in current["cenarios"].items():
+        before = baseline["cenarios"].get(name)
+        if not before:
+            continue
+        print(f"  {name}: vazão {before['vazao_rps']} -> {result['vazao_rps']} req/s | lag p99 "
+              f"{before['lag_event_loop'].get('p99_ms')} -> {result['lag_event_loop'].get('p99_ms')} ms")
+        for route, stats in result["rotas"].items():
+            old = before["rotas"].get(route)
+            if old and old.get("p95_ms") is not None:
+                print(f"    {route:<32} p95 {old['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do gateway FastAPI")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--users", type=int, default=50, help="Dashboards simultâneos")
+    parser.add_argument("--poll-seconds", type=float, default=1.0, help="Intervalo de polling de cada dashboard")
+    parser.add_argument("--duration", type=float, default=15.0, help="Segundos por cenário (dashboard/misto)")
+    parser.add_argument("--uploads", type=int, default=10, help="Envios na rajada (e ao longo do misto)")
+    parser.add_argument("--upload-rows", type=int, default=5000)
+    parser.add_argument("--redis-latency-ms", type=float, default=1.0)
+    parser.add_argument("--dialer-latency-ms", type=float, default=100.0)
+    parser.add_argument("--output", help="Arquivo JSON (padrão: benchmarks/results/gateway_load_<commit>_<data>.json)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--verbose", action="store_true", help="Mantém os logs do gateway no terminal")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # O registro de servidores lê o override do .env na importação
+    os.environ["BASE_URL_MG"] = base_url
+    os.environ["BASE_URL_SP"] = base_url
+    os.environ.setdefault("API_TOKEN", "bench")
+    server = start_in_thread(create_app(latency_ms=args.dialer_latency_ms), port)
+
+    commit = _git_commit()
+    report = {"commit": commit, "data": datetime.now().isoformat(timespec="seconds"),
+              "parametros": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose")},
+              "cenarios": {}}
+    csv_bytes = _sample_csv(args.upload_rows)
+    try:
+        for name in args.scenarios:
+            print(f"Rodando cenário '{name}'...")
+            with open(os.devnull, "w") as devnull, \
+                    (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+                report["cenarios"][name] = asyncio.run(_scenario(name, args, csv_bytes))
+            _print(name, report["cenarios"][name])
+    finally:
+        server.should_exit = True
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"gateway_load_{commit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultado salvo em {output}")
+
+    if args.compare:
+        _compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
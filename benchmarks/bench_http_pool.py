@@ -0,0 +1,71 @@
+# benchmarks/bench_http_pool.py
+#
+# Latência por requisição da API do discador: um AsyncClient novo por chamada (antes)
+# vs. o cliente keep-alive compartilhado do utils/http_clients.py (depois).
+#
+# Uso (na raiz do projeto):  python -m benchmarks.bench_http_pool --requests 300
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.fakes import percentile
+from benchmarks.mock_dialer import create_app, free_port, start_in_thread
+
+
+def _summary(label: str, samples: list[float]) -> str:
+    return (f"{label:<28} média {statistics.mean(samples):7.2f} ms | "
+            f"p50 {statistics.median(samples):7.2f} ms | p95 {percentile(samples, 0.95):7.2f} ms")
+
+
+async def _bench(n_requests: int, base_url: str):
+    import httpx
+    from utils.mailing_api import api_list_campaigns, get_base_url_for_api
+    from utils.http_clients import dialer_clients
+
+    url = f"{get_base_url_for_api('MG')}list_campaign.php"
+
+    # ANTES: comportamento original (cliente aberto e fechado a cada chamada)
+    antes = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=20.0, verify=False) as client:
+            response = await client.post(url, data={"token": "bench"})
+            response.raise_for_status()
+        antes.append((time.perf_counter() - start) * 1000)
+
+    # DEPOIS: cliente compartilhado com keep-alive
+    await dialer_clients.start()
+    depois = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        await api_list_campaigns("MG")
+        depois.append((time.perf_counter() - start) * 1000)
+    await dialer_clients.aclose()
+
+    print(f"Stand-in: {base_url} | {n_requests} requisições sequenciais")
+    print(_summary("Antes (cliente por chamada)", antes))
+    print(_summary("Depois (cliente pooled)", depois))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cliente HTTP pooled")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência simulada do PHP")
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # O registro de servidores lê o override do .env na importação
+    os.environ["BASE_URL_MG"] = base_url
+    server = start_in_thread(create_app(latency_ms=args.latency_ms), port)
+    try:
+        asyncio.run(_bench(args.requests, base_url))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/bench_mailing_transform.py
+#
+# Tempo de parede e pico de RSS da transformação do mailing, por motor de leitura, com mailings
+# sintéticos de 10k, 100k e 1M linhas (31 colunas, cabeçalho, CPF/telefone com zero à esquerda).
+# Cada medição roda num subprocesso próprio para o pico de RSS não contaminar as demais.
+#
+#   legado  : transformação original (arquivo inteiro em memória + parser Python, todas as colunas)
+#   python  : streaming em blocos, parser Python, todas as colunas
+#   c       : streaming em blocos, parser C, só as 5 colunas usadas
+#   pyarrow : streaming em blocos, parser pyarrow, só as 5 colunas usadas
+#
+# Uso (na raiz do projeto):  python -m benchmarks.bench_mailing_transform --sizes 10000 100000 1000000
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ENGINES = ["legado", "python", "c", "pyarrow"]
+NUM_COLUMNS = 31
+DATA_DIR = os.path.join(tempfile.gettempdir(), "bench_mailing")
+
+
+def generate_mailing(rows: int) -> str:
+    """Gera (ou reaproveita) um CSV sintético de origem com `rows` linhas."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"mailing_{rows}.csv")
+    if os.path.exists(path):
+        return path
+
+    rnd = random.Random(rows)
+    nomes = ["JOÃO DA SILVA", "MARIA APARECIDA", "JOSÉ SOUZA", "ANA; PAULA", ""]
+    with open(path, "w", encoding="latin-1", newline="") as f:
+        f.write(";".join(f"COLUNA_{i}" for i in range(NUM_COLUMNS)) + "\r\n")
+        for i in range(rows):
+            cols = [f"campo{i % 97}"] * NUM_COLUMNS
+            nome = rnd.choice(nomes)
+            cols[0] = f'"{nome}"' if ";" in nome else nome
+            cols[1] = f"{rnd.randrange(10 ** 10):011d}"        # CPF com zero à esquerda
+            cols[2] = rnd.choice(["", "LIVRE", "0042"])
+            cols[3] = f"CH{i}"
+            cols[29] = f"0{rnd.randrange(11, 99)}9{rnd.randrange(10 ** 8):08d}" if i % 50 else ""
+            f.write(";".join(cols) + "\r\n")
+    return path
+
+
+def _legacy_transform(path: str, out):
+    """Cópia fiel da transformação original (antes do streaming), lendo do arquivo em vez do base64."""
+    from io import StringIO
+    import pandas as pd
+    from utils.mailing_api import _generate_metadata_line
+
+    with open(path, "rb") as f:
+        decoded_content = f.read().decode("latin-1")
+    df_source = pd.read_csv(StringIO(decoded_content), sep=';', header=None, engine='python')
+
+    df_target = pd.DataFrame()
+    df_target[0] = df_source[29].astype(str)
+    df_target[1] = ""
+    df_target[2] = df_source[0]
+    df_target[3] = df_source[1].astype(str)
+    df_target[4] = df_source[2].fillna('')
+    df_target[5] = df_source[3].fillna('')
+    for i in range(6, 13): df_target[i] = ""
+
+    out.write((_generate_metadata_line("20", "BENCH", "MG", "BENCH") + os.linesep).encode("latin-1"))
+    out.write(df_target.iloc[1:].to_csv(sep=';', header=False, index=False).encode("latin-1"))
+
+
+def _run_worker(engine: str, path: str):
+    """Executa uma transformação e imprime o resultado em JSON (processo filho)."""
+    import utils.mailing_api as mailing_api
+
+    # Metadados fixos para o hash da saída ser comparável entre motores
+    mailing_api._generate_metadata_line = lambda *args, **kwargs: "20;BENCH;70;DISCADOR_MG"
+    rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    with tempfile.TemporaryFile() as out:
+        if engine == "legado":
+            _legacy_transform(path, out)
+        else:
+            with open(path, "rb") as source:
+                buffer = mailing_api._transform_source_stream(source, "20", "BENCH", "MG", "BENCH", engine=engine)
+            with buffer:
+                while chunk := buffer.read(1024 * 1024):
+                    out.write(chunk)
+        elapsed = time.perf_counter() - start
+
+        out.seek(0)
+        digest = hashlib.sha256()
+        while chunk := out.read(1024 * 1024):
+            digest.update(chunk)
+
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "segundos": elapsed,
+        "rss_pico_mb": rss_pico / 1024,          # ru_maxrss em KB no Linux
+        "rss_delta_mb": (rss_pico - rss_base) / 1024,
+        "sha256": digest.hexdigest()[:12],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos motores de transformação do mailing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--engines", nargs="+", default=ENGINES, choices=ENGINES)
+    parser.add_argument("--worker", nargs=2, metavar=("ENGINE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _run_worker(*args.worker)
+        return
+
+    print(f"{'linhas':>9} {'motor':<8} {'tempo (s)':>10} {'RSS pico (MB)':>14} {'Δ RSS (MB)':>11}  saída")
+    for rows in args.sizes:
+        path = generate_mailing(rows)
+        for engine in args.engines:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_mailing_transform", "--worker", engine, path],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{rows:>9} {engine:<8} FALHOU: {proc.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{rows:>9} {engine:<8} {result['segundos']:>10.2f} {result['rss_pico_mb']:>14.1f} "
+                  f"{result['rss_delta_mb']:>11.1f}  {result['sha256']}")
+
+
+if __name__ == "__main__":
+    main()
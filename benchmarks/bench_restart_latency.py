@@ -0,0 +1,118 @@
+# benchmarks/bench_restart_latency.py
+#
+# Tempo até o restart contra a tela "Enviar" do DA Preditivo do discador falso (benchmarks/mock_dialer.py):
+# sequência antiga com sleeps fixos (antes) vs. esperas por condição do scripts/restart_campaign.py (depois).
+# O stand-in reage com `--ui-delay-ms` em cada transição (menu, painel, diálogo, dropdown).
+#
+# Uso (na raiz do projeto):  python -m benchmarks.bench_restart_latency --runs 5 --ui-delay-ms 300
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.fakes import FakeTraceStore
+from benchmarks.mock_dialer import LOGIN_PATH, SESSION_COOKIE, create_app, free_port, start_in_thread
+
+
+async def _legacy_restart(page, fila_name: str, saidas: str) -> bool:
+    """Sequência original de restart_campaign (sleeps fixos de 5000/200/1000/500/1000/2000 ms)."""
+    from scripts.restart_campaign import (
+        get_current_campaign_name, SELETOR_BOTAO_FINALIZAR, SELETOR_CONFIRMAR_FINALIZAR, SELETOR_LISTA_ABERTA_ITEM,
+        SELETOR_BOTAO_TELEFONE_ABRIR, SELETOR_BOTAO_FILA_ABRIR, SELETOR_INPUT_SAIDAS, SELETOR_BOTAO_SUBIR_MAILING,
+    )
+    await page.wait_for_timeout(5000)
+    await page.get_by_role("link", name="send Discador Automático").click()
+    await page.wait_for_timeout(200)
+    await page.get_by_role("link", name="DA Preditivo").click()
+    await page.wait_for_timeout(1000)
+    await page.get_by_text("Enviar").click()
+    campanha = await get_current_campaign_name(page)
+    if not campanha:
+        return False
+    await page.wait_for_selector(SELETOR_BOTAO_FINALIZAR, state='visible', timeout=10000)
+    await page.click(SELETOR_BOTAO_FINALIZAR)
+    await page.click(SELETOR_CONFIRMAR_FINALIZAR)
+    await page.wait_for_timeout(1000)
+    for opener, option_name in ((page.get_by_role("button", name="Escolha a opção").first, campanha),
+                                (page.locator(SELETOR_BOTAO_TELEFONE_ABRIR), campanha),
+                                (page.locator(SELETOR_BOTAO_FILA_ABRIR), fila_name)):
+        await opener.click()
+        await page.wait_for_timeout(500)
+        option = page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=option_name)
+        await option.wait_for(state='visible', timeout=10000)
+        await option.click(timeout=20000)
+    await page.fill(SELETOR_INPUT_SAIDAS, saidas)
+    await page.click(SELETOR_BOTAO_SUBIR_MAILING)
+    await page.wait_for_timeout(2000)
+    return True
+
+
+def _summary(label: str, samples: list[float]) -> str:
+    return (f"{label:<30} média {statistics.mean(samples):8.0f} ms | p50 {statistics.median(samples):8.0f} ms | "
+            f"máx {max(samples):8.0f} ms")
+
+
+async def _bench(url: str, session: str, runs: int, server: str):
+    from playwright.async_api import async_playwright
+    from config.servers import get_server
+    from scripts.restart_campaign import run_restart_steps
+    from utils.run_trace import RunTrace
+
+    entry = get_server(server)
+    store = FakeTraceStore()
+    antes, depois = [], []
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            for _ in range(runs):
+                for label, samples in (("antes", antes), ("depois", depois)):
+                    context = await browser.new_context()
+                    await context.add_cookies([{"name": SESSION_COOKIE, "value": session, "url": url}])
+                    page = await context.new_page()
+                    await page.goto(url)
+                    start = time.perf_counter()
+                    if label == "antes":
+                        ok = await _legacy_restart(page, entry.fila_nome, entry.saidas)
+                    else:
+                        trace = RunTrace("restart_campaign", server, store=store)
+                        ok = await run_restart_steps(page, server, trace)
+                        await trace.finish(ok)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    await context.close()
+                    if not ok:
+                        raise RuntimeError(f"Restart '{label}' falhou contra o stand-in.")
+        finally:
+            await browser.close()
+
+    print(f"Stand-in: {url} | {runs} restart(s) por modo")
+    print(_summary("Antes (sleeps fixos)", antes))
+    print(_summary("Depois (esperas por condição)", depois))
+    print("\nEtapas (depois), média:")
+    for etapa, duracao in store.mean_step_durations().items():
+        print(f"  {etapa:<22} {duracao:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do tempo até o restart")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ui-delay-ms", type=int, default=300, help="Atraso do stand-in em cada transição")
+    parser.add_argument("--server", default="MG", help="Servidor do registro (fila e saídas)")
+    args = parser.parse_args()
+
+    from config.servers import get_server
+
+    port = free_port()
+    app = create_app(ui_delay_ms=args.ui_delay_ms, fila_nome=get_server(args.server).fila_nome)
+    server = start_in_thread(app, port)
+    try:
+        # Sessão criada direto no stand-in (sem formulário de login); o trace fica em memória (sem Redis)
+        asyncio.run(_bench(f"http://127.0.0.1:{port}{LOGIN_PATH}", app.state.dialer.new_session(),
+                           args.runs, args.server))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/fakes.py (Dublês em memória para rodar o gateway sem Redis real e utilitários dos benchmarks)
+
+import asyncio
+import time
+
+
+class FakeRedis:
+    """
+    Subconjunto do redis.asyncio.Redis usado pelo gateway, em memória.
+    `blocking=True` simula o cliente síncrono antigo (time.sleep trava o event loop).
+    """
+
+    def __init__(self, latency_ms: float = 1.0, blocking: bool = False):
+        self.latency = latency_ms / 1000
+        self.blocking = blocking
+        self.data: dict[str, str] = {}
+
+    async def _wait(self):
+        if self.blocking:
+            time.sleep(self.latency)
+            await asyncio.sleep(0)  # O handler ainda devolve o controle ao loop ao responder
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def get(self, key):
+        await self._wait()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        await self._wait()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, *keys):
+        await self._wait()
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    async def aclose(self):
+        pass
+
+
+class FakeTraceStore:
+    """Guarda os traces de automação (utils/run_trace.py) em memória, no lugar do Redis."""
+
+    def __init__(self):
+        self.traces: list[dict] = []
+
+    async def save(self, data: dict):
+        self.traces.append(data)
+
+    def mean_step_durations(self) -> dict[str, float]:
+        """Duração média (ms) de cada etapa, na ordem em que aparecem."""
+        durations: dict[str, list[int]] = {}
+        for trace in self.traces:
+            for span in trace["etapas"]:
+                durations.setdefault(span["etapa"], []).append(span["duracao_ms"])
+        return {etapa: sum(values) / len(values) for etapa, values in durations.items()}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Percentil por posição na amostra ordenada (`pct` de 0 a 1)."""
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * pct) - 1)]
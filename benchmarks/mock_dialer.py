@@ -0,0 +1,264 @@
+# benchmarks/mock_dialer.py (Stand-in local do discador azcall)
+#
+# Emula o que a automação usa do discador real, sem depender das caixas 186.194.50.x:
+#   pages/login.php  : formulário de login (sem sessão) ou página inicial com o menu e a tela
+#                      "Enviar" do DA Preditivo (painel, Finalizar Campanha, dropdowns, Subir Mailing)
+#   pages/ch.php     : "<N> active calls" (redireciona ao login sem sessão)
+#   api/list_campaign.php, api/campaign_exec.php, api/import_mailling.php
+# Respostas com PHP Notice antes do JSON (igual ao servidor real); latência, taxa de erro,
+# chamadas ativas e atraso da UI configuráveis (na criação ou em /mock/estado).
+#
+# Uso avulso:  python -m benchmarks.mock_dialer --port 8080 --active-calls 5 --error-rate 0.1
+#   (apontar BASE_URL_MG=http://127.0.0.1:8080 e LOGIN_URL_MG=http://127.0.0.1:8080/azcall/pages/login.php)
+
+import argparse
+import asyncio
+import json
+import random
+import secrets
+import socket
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI, Form, Request
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
+
+PHP_NOTICE = "<br />\n<b>Notice</b>:  Undefined index: id in <b>/var/www/html/api/config.php</b> on line <b>12</b><br />\n"
+PHP_FATAL = "<br />\n<b>Fatal error</b>:  Maximum execution time of 30 seconds exceeded in <b>/var/www/html/api/db.php</b><br />\n"
+
+SESSION_COOKIE = "PHPSESSID"
+LOGIN_PATH = "/azcall/pages/login.php"
+CAMPANHA = "MAILING_DISCADOR_EMP - 01-01"
+
+
+class MockDialerState:
+    """Configuração e contadores do discador falso (alteráveis com o servidor no ar)."""
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, active_calls: int = 12,
+                 ui_delay_ms: int = 0, fila_nome: str = "DISCADOR_MG", campanha: str = CAMPANHA):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.active_calls = active_calls
+        self.ui_delay_ms = ui_delay_ms
+        self.fila_nome = fila_nome
+        self.campanha = campanha
+        self.sessions: set[str] = set()
+        self.counters = {"logins": 0, "finalizacoes": 0, "envios": 0, "imports": 0, "linhas_importadas": 0,
+                         "erros_injetados": 0}
+
+    def new_session(self) -> str:
+        """Cria uma sessão válida (o benchmark pode injetar o cookie sem passar pelo formulário)."""
+        token = secrets.token_hex(16)
+        self.sessions.add(token)
+        return token
+
+    def snapshot(self) -> dict:
+        return {"latency_ms": self.latency_ms, "error_rate": self.error_rate, "active_calls": self.active_calls,
+                "ui_delay_ms": self.ui_delay_ms, "contadores": dict(self.counters)}
+
+
+def _dropdown(options: list[str]) -> str:
+    """bootstrap-select: div > div[1] > button, lista em div.dropdown-menu (ganha .open ao abrir)."""
+    items = "".join(f'<a role="option" href="#">{name}</a>' for name in options)
+    return (f'<div class="bootstrap-select"><div><button type="button" class="dd">Escolha a opção</button></div>'
+            f'<div class="dropdown-menu" data-items="{items.replace(chr(34), "&quot;")}"></div></div>')
+
+
+def render_login_page() -> str:
+    return """<!doctype html><html><head><meta charset="utf-8"><title>azcall</title></head><body>
+<form method="post" action="login.php">
+  <input name="login"><input name="password" type="password"><button type="submit">ENTRAR</button>
+</form></body></html>"""
+
+
+def render_home_page(state: MockDialerState) -> str:
+    """
+    Página inicial autenticada com a tela "Enviar" do DA Preditivo, com a mesma estrutura que os
+    seletores do restart esperam (incluindo os XPaths dos dropdowns). Cada transição leva `ui_delay_ms`.
+    """
+    return f"""<!doctype html><html><head><meta charset="utf-8"><title>azcall</title>
+<style>.hidden{{display:none}} .dropdown-menu{{display:none}} .dropdown-menu.open{{display:block}}</style></head>
+<body>
+<nav>
+  <a href="#Discador_AutomáticoCollapse" id="menu"><i>send</i> Discador Automático</a>
+  <div id="Discador_AutomáticoCollapse" class="hidden"><a href="#" id="preditivo">DA Preditivo</a></div>
+  <div id="submenu" class="hidden"><a href="#" id="enviar">Enviar</a></div>
+</nav>
+<div id="painel" class="hidden">
+  <h4>Contatos pendentes</h4><span>{state.campanha}</span>
+  <button type="button" id="finalizar">Finalizar Campanha</button>
+</div>
+<div id="confirmacao" class="hidden"><button type="button" id="confirmar">Sim, pode finalizar!</button></div>
+<div id="Discador"><div><div><div><div>
+  <div></div>
+  <div><div>
+    <div>{_dropdown([state.campanha])}</div>
+    <div></div>
+    <div>{_dropdown([state.campanha])}</div>
+    <div></div>
+    <div></div>
+    <div>{_dropdown([state.fila_nome])}</div>
+  </div></div>
+  <input id="saida"><button type="button" id="btCampanha1">Subir Mailing</button>
+</div></div></div></div></div>
+<script>
+const D = {state.ui_delay_ms};
+const show = (id) => setTimeout(() => document.getElementById(id).classList.remove("hidden"), D);
+document.getElementById("menu").onclick = (e) => {{ e.preventDefault(); show("Discador_AutomáticoCollapse"); }};
+document.getElementById("preditivo").onclick = (e) => {{ e.preventDefault(); show("submenu"); }};
+document.getElementById("enviar").onclick = (e) => {{ e.preventDefault(); show("painel"); }};
+document.getElementById("finalizar").onclick = () => show("confirmacao");
+document.getElementById("confirmar").onclick = () => fetch("../ajax/finalizar.php", {{method: "POST"}}).then(() =>
+  setTimeout(() => document.getElementById("confirmacao").classList.add("hidden"), D));
+document.querySelectorAll(".bootstrap-select").forEach((sel) => {{
+  const button = sel.querySelector("button"), menu = sel.querySelector(".dropdown-menu");
+  button.onclick = () => {{
+    document.querySelectorAll(".dropdown-menu.open").forEach((m) => m.classList.remove("open"));
+    menu.classList.add("open");
+    setTimeout(() => {{  // Lista populada via AJAX, como no discador
+      menu.innerHTML = menu.dataset.items;
+      menu.querySelectorAll("a").forEach((a) => a.onclick = (e) => {{
+        e.preventDefault(); button.textContent = a.textContent; menu.classList.remove("open");
+      }});
+    }}, D);
+  }};
+}});
+document.getElementById("btCampanha1").onclick = () =>
+  fetch("../ajax/enviar.php", {{method: "POST", body: new URLSearchParams({{saida: document.getElementById("saida").value}})}});
+</script></body></html>"""
+
+
+def create_app(latency_ms: float = 0.0, error_rate: float = 0.0, active_calls: int = 12, ui_delay_ms: int = 0,
+               fila_nome: str = "DISCADOR_MG") -> FastAPI:
+    """
+    Cria o app do discador falso. `latency_ms` simula o tempo de processamento do PHP, `error_rate`
+    a fração de respostas HTTP 500 (PHP Fatal error) em ch.php e /api/. O estado fica em `app.state.dialer`.
+    """
+    app = FastAPI(title="Mock azcall")
+    state = app.state.dialer = MockDialerState(latency_ms, error_rate, active_calls, ui_delay_ms, fila_nome)
+
+    async def _latency():
+        if state.latency_ms:
+            await asyncio.sleep(state.latency_ms / 1000)
+
+    def _injected_error() -> PlainTextResponse | None:
+        if state.error_rate and random.random() < state.error_rate:
+            state.counters["erros_injetados"] += 1
+            return PlainTextResponse(PHP_FATAL, status_code=500)
+        return None
+
+    def _authenticated(request: Request) -> bool:
+        return request.cookies.get(SESSION_COOKIE) in state.sessions
+
+    @app.get(LOGIN_PATH)
+    async def login_page(request: Request):
+        await _latency()
+        if _authenticated(request):
+            return HTMLResponse(render_home_page(state))
+        return HTMLResponse(render_login_page())
+
+    @app.post(LOGIN_PATH)
+    async def login_submit(login: str = Form(""), password: str = Form("")):
+        await _latency()
+        if not login or not password:
+            return HTMLResponse(render_login_page(), status_code=401)
+        state.counters["logins"] += 1
+        response = RedirectResponse(LOGIN_PATH, status_code=303)
+        response.set_cookie(SESSION_COOKIE, state.new_session())
+        return response
+
+    @app.get("/azcall/pages/ch.php")
+    async def channels(request: Request):
+        await _latency()
+        if not _authenticated(request):
+            return RedirectResponse(LOGIN_PATH, status_code=302)
+        if error := _injected_error():
+            return error
+        return HTMLResponse(f"{PHP_NOTICE}<div class=\"panel\"><b>{state.active_calls}</b> active calls</div>")
+
+    @app.post("/azcall/ajax/finalizar.php")
+    async def finalizar():
+        await _latency()
+        state.counters["finalizacoes"] += 1
+        return PlainTextResponse(PHP_NOTICE + json.dumps({"success": True}))
+
+    @app.post("/azcall/ajax/enviar.php")
+    async def enviar():
+        await _latency()
+        state.counters["envios"] += 1
+        return PlainTextResponse(PHP_NOTICE + json.dumps({"success": True}))
+
+    @app.post("/api/list_campaign.php")
+    async def list_campaign():
+        await _latency()
+        if error := _injected_error():
+            return error
+        body = [{"id": "20", "nome": state.campanha}]
+        return PlainTextResponse(PHP_NOTICE + json.dumps(body))
+
+    @app.get("/api/campaign_exec.php")
+    async def campaign_exec(id: str = ""):
+        await _latency()
+        if error := _injected_error():
+            return error
+        body = {"status": "OK", "progresso": "42%", "dados": [{"saidas": "130"}]}
+        return PlainTextResponse(PHP_NOTICE + json.dumps(body))
+
+    @app.post("/api/import_mailling.php")
+    async def import_mailling(request: Request):
+        await _latency()
+        if error := _injected_error():
+            return error
+        form = await request.form()
+        upload = form.get("import")
+        linhas = (await upload.read()).count(b"\n") - 1 if upload else 0
+        state.counters["imports"] += 1
+        state.counters["linhas_importadas"] += linhas
+        return PlainTextResponse(PHP_NOTICE + json.dumps({"success": True, "id_lista": "1", "linhas": linhas}))
+
+    @app.get("/mock/estado")
+    async def get_estado():
+        return state.snapshot()
+
+    @app.post("/mock/estado")
+    async def set_estado(request: Request):
+        """Altera latency_ms, error_rate, active_calls ou ui_delay_ms com o servidor no ar."""
+        for key, value in (await request.json()).items():
+            if key in ("latency_ms", "error_rate", "active_calls", "ui_delay_ms"):
+                setattr(state, key, type(getattr(state, key))(value))
+        return state.snapshot()
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_in_thread(app, port: int) -> uvicorn.Server:
+    """Sobe o app em uma thread separada (loop próprio) e espera ficar pronto."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discador azcall falso para desenvolvimento e benchmarks")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas HTTP 500 (0 a 1)")
+    parser.add_argument("--active-calls", type=int, default=12)
+    parser.add_argument("--ui-delay-ms", type=int, default=0, help="Atraso de cada transição da tela Enviar")
+    parser.add_argument("--fila", default="DISCADOR_MG", help="Fila de atendimento oferecida no dropdown")
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.error_rate, args.active_calls, args.ui_delay_ms, args.fila)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="info")
+
+
+if __name__ == "__main__":
+    main()
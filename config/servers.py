@@ -0,0 +1,96 @@
+# config/servers.py (Registro de Servidores do Discador)
+
+import os
+import json
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from config.settings import (
+    LOGIN_URL_MG,
+    LOGIN_URL_SP,
+    BASE_URL_MG,
+    BASE_URL_SP,
+    FILA_NOME_MG,
+    FILA_NOME_SP,
+    ID_CAMPANHA_MG,
+    ID_CAMPANHA_SP,
+    SAIDAS_VALOR,
+    MONITOR_MODE_MG,
+    MONITOR_MODE_SP,
+)
+
+load_dotenv()
+
+
+@dataclass(frozen=True)
+class DialerServer:
+    """Uma caixa do discador (azcall): URLs, fila, campanha e canais."""
+    server_id: str
+    base_url: str
+    login_url: str
+    fila_nome: str
+    campanha_id: str
+    saidas: str = SAIDAS_VALOR
+    monitor_mode: str = "http"
+    max_concurrency: int = 1           # Operações simultâneas permitidas neste servidor
+    mailing_arquivo: str | None = None  # Prefixo do arquivo do mailing diário
+
+
+def _env(server_id: str, name: str, default: str) -> str:
+    """Permite sobrescrever qualquer campo via .env (ex.: BASE_URL_MG)."""
+    return os.getenv(f"{name}_{server_id}", default)
+
+
+_SERVIDORES_PADRAO = [
+    DialerServer(
+        server_id="MG",
+        base_url=_env("MG", "BASE_URL", BASE_URL_MG),
+        login_url=_env("MG", "LOGIN_URL", LOGIN_URL_MG),
+        fila_nome=_env("MG", "FILA_NOME", FILA_NOME_MG),
+        campanha_id=_env("MG", "ID_CAMPANHA", ID_CAMPANHA_MG),
+        monitor_mode=_env("MG", "MONITOR_MODE", MONITOR_MODE_MG),
+        mailing_arquivo="MAILING_DISCADOR_EMP",
+    ),
+    DialerServer(
+        server_id="SP",
+        base_url=_env("SP", "BASE_URL", BASE_URL_SP),
+        login_url=_env("SP", "LOGIN_URL", LOGIN_URL_SP),
+        fila_nome=_env("SP", "FILA_NOME", FILA_NOME_SP),
+        campanha_id=_env("SP", "ID_CAMPANHA", ID_CAMPANHA_SP),
+        monitor_mode=_env("SP", "MONITOR_MODE", MONITOR_MODE_SP),
+        mailing_arquivo="MAILING_DISCADOR_CARD",
+    ),
+]
+
+
+def _load_extra_servers() -> list[DialerServer]:
+    """
+    Servidores adicionais via DIALER_SERVERS_JSON, ex.:
+    [{"server_id": "RJ", "base_url": "http://...", "login_url": "http://.../azcall/pages/login.php",
+      "fila_nome": "DISCADOR_RJ", "campanha_id": "30"}]
+    """
+    raw = os.getenv("DIALER_SERVERS_JSON")
+    if not raw:
+        return []
+    extras = []
+    for entry in json.loads(raw):
+        entry["server_id"] = entry["server_id"].upper()
+        extras.append(DialerServer(**entry))
+    return extras
+
+
+SERVER_REGISTRY: dict[str, DialerServer] = {
+    server.server_id: server for server in _SERVIDORES_PADRAO + _load_extra_servers()
+}
+
+
+def get_server(server: str) -> DialerServer:
+    """Retorna a entrada do registro para o servidor (MG, SP, ...). ValueError se não registrado."""
+    try:
+        return SERVER_REGISTRY[server.upper()]
+    except KeyError:
+        raise ValueError(f"Servidor inválido: {server}. Registrados: {', '.join(SERVER_REGISTRY)}") from None
+
+
+def registered_servers() -> list[str]:
+    """IDs de todos os servidores registrados, na ordem do registro."""
+    return list(SERVER_REGISTRY)
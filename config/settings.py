@@ -17,6 +17,13 @@ FILA_NOME_SP = "DISCADOR_SP"
 SAIDAS_VALOR = "130" # Valor de canais para o upload diário
 
 
+# --- MODO DO MONITOR DE ACTIVE CALLS (ch.php) ---
+# "http": lê o ch.php via httpx com o cookie da sessão (cai para o navegador se falhar)
+# "browser": sempre usa o Playwright
+MONITOR_MODE_MG = "http"
+MONITOR_MODE_SP = "http"
+
+
 
 # --- CONTROLE DE SEGURANÇA ---
 API_TOKEN_NAME = "API_TOKEN" # Chave lida do Railway Secrets/Local .env
@@ -1,52 +1,119 @@
-# cost_scheduler.py
+# cost_scheduler.py (Worker de custos: processo asyncio único, horários exatos)
 
-import time
-import subprocess
+import asyncio
+import os
+import signal
 import sys
-from datetime import datetime, time as dt_time, timedelta
+from datetime import datetime, time as dt_time
 
-INTERVALO_VERIFICACAO = 1800  # 30 minutos
+import httpx
+
+from scripts.cost_monitor import executar_coleta, ROUTER_LAUNCH_ARGS
+from utils.login_manager import BrowserPool
+from utils.scheduler import JobScheduler, SchedulerState, SCHEDULER_STATE_PATH
+from utils.metrics import METRICS_PORT_CUSTOS, start_metrics_server
 
 HORARIOS_ALVO = [
     dt_time(18, 0),
     dt_time(21, 30)
 ]
 
-last_run_time = None
+# Atraso máximo para recuperar um horário perdido (antes: janela de 30 min após o alvo)
+JANELA_RECUPERACAO_SEGUNDOS = 30 * 60
+
+# Marcadores próprios: o main.py grava o dele no mesmo volume
+COST_SCHEDULER_STATE_PATH = os.getenv(
+    "COST_SCHEDULER_STATE_PATH",
+    os.path.join(os.path.dirname(SCHEDULER_STATE_PATH), "cost_scheduler_state.json")
+)
+
+
+class CostWorker:
+    """
+    Coletor de custos de longa duração: o Chromium e o cliente HTTP são criados uma vez
+    e reaproveitados por todas as execuções. Execuções nunca se sobrepõem.
+    """
+
+    def __init__(self):
+        self.browser_pool = BrowserPool(headless=True, launch_args=ROUTER_LAUNCH_ARGS)
+        self.client: httpx.AsyncClient | None = None
+        self._run_lock = asyncio.Lock()
+        self._manual_task: asyncio.Task | None = None
+
+    async def start(self):
+        self.client = httpx.AsyncClient()
+        try:
+            await self.browser_pool.start()
+        except Exception as e:
+            print(f"[CUSTOS] ⚠️ Falha ao aquecer o navegador (nova tentativa na coleta): {e}")
+
+    async def close(self):
+        await self.browser_pool.close()
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def run_once(self, manual: bool = False):
+        """
+        Uma coleta completa. Horários agendados entram na fila atrás de uma coleta em andamento
+        (o marcador do dia já foi gravado: pular perderia o horário); pedidos manuais são descartados.
+        """
+        if manual and self._run_lock.locked():
+            print(f"[{datetime.now()}] ⏭️ Coleta de custos já em andamento. Pedido manual ignorado.")
+            return
+        async with self._run_lock:
+            print(f"[{datetime.now()}] 🚀 Iniciando scraping de custos...")
+            try:
+                browser = await self.browser_pool.get_browser()
+                await executar_coleta(browser=browser, client=self.client)
+            except Exception as e:
+                print(f"Erro no worker: {e}")
 
-def should_run_now():
-    global last_run_time
-    now = datetime.now().time()
+    def run_now(self):
+        """Gatilho manual (SIGUSR1: `docker kill -s USR1 <container>`): coleta imediata fora do horário."""
+        self._manual_task = asyncio.get_running_loop().create_task(self.run_once(manual=True))
 
-    if last_run_time and (datetime.now() - last_run_time).total_seconds() < INTERVALO_VERIFICACAO:
-        return False
 
-    is_near = any(t <= now <= (datetime.combine(datetime.today(), t) + timedelta(minutes=30)).time()
-                  for t in HORARIOS_ALVO)
+def build_scheduler(worker: CostWorker) -> JobScheduler:
+    scheduler = JobScheduler(state=SchedulerState(COST_SCHEDULER_STATE_PATH))
+    for alvo in HORARIOS_ALVO:
+        scheduler.daily(f"custos_{alvo.strftime('%H%M')}", worker.run_once, hour=alvo.hour, minute=alvo.minute,
+                        weekdays=tuple(range(7)), catchup_seconds=JANELA_RECUPERACAO_SEGUNDOS)
+    return scheduler
 
-    if is_near:
-        last_run_time = datetime.now()
-        return True
-    return False
 
-def run_worker():
-    print(f"[{datetime.now()}] 🚀 Iniciando scraping de custos (Execução Imediata)...")
+async def main(run_only_once: bool = False):
+    worker = CostWorker()
+    scheduler = build_scheduler(worker)
+    await worker.start()
+    metrics_server = None if run_only_once else await start_metrics_server(METRICS_PORT_CUSTOS)
     try:
-        # Chama o script de monitoramento que agora envia via POST para a API
-        subprocess.run([sys.executable, "scripts/cost_monitor.py"], check=True)
-    except Exception as e:
-        print(f"Erro no worker: {e}")
+        # --- GATILHO DE VISUALIZAÇÃO IMEDIATA ---
+        # Garante que o dashboard carregue os dados assim que o card sobe
+        await worker.run_once()
+        if run_only_once:
+            return
 
-if __name__ == "__main__":
-    print("Agendador de Custos iniciado no Railway...")
-    
-    # --- GATILHO DE VISUALIZAÇÃO IMEDIATA ---
-    # Esta linha garante que o dashboard carregue os dados assim que o card sobe
-    run_worker() 
-    # ----------------------------------------
+        # A coleta de subida já cobre um horário recém-vencido: não recupera o mesmo de novo
+        for job in scheduler.jobs:
+            slot = job.pending_slot(datetime.now())
+            if slot is not None:
+                job.state.mark(job.name, slot.date().isoformat())
+
+        if hasattr(signal, "SIGUSR1"):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, worker.run_now)
+
+        horarios = ", ".join(alvo.strftime('%H:%M') for alvo in HORARIOS_ALVO)
+        print(f"[CUSTOS] ⏰ Próximas coletas agendadas para {horarios} (SIGUSR1 = coletar agora)")
+        await scheduler.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await worker.close()
 
-    while True:
-        if should_run_now():
-            run_worker()
-        time.sleep(INTERVALO_VERIFICACAO)
 
+if __name__ == "__main__":
+    print("Agendador de Custos iniciado no Railway...")
+    try:
+        asyncio.run(main(run_only_once="--once" in sys.argv))
+    except KeyboardInterrupt:
+        print("Agendador de Custos encerrado.")
@@ -1,17 +1,35 @@
 # main.py (Scheduler Principal)
 
 import asyncio
+import os
 import time
 import datetime  # Importado para a lógica de horário e dias
 from scripts.monitor import run_monitor
-from scripts.restart_campaign import restart_campaign
 from scripts.daily_mailing_worker import run_daily_import_pipeline
-
-# Lista dos servidores que devem ser monitorados em cada ciclo
-SERVERS_TO_MONITOR = ["MG", "SP"]
-
-# Intervalo de Checagem (30 segundos)
-CHECK_INTERVAL_SECONDS = 15  # Usando 15s para performance
+from utils.login_manager import browser_pool
+from utils.http_clients import dialer_clients
+from utils.dialer_driver import dialer_driver, DriverError
+from utils.restart_guard import restart_guard
+from utils.mailing_api import get_active_campaign_metrics
+from utils.monitor_cadence import monitor_cadence, CADENCE_DEFAULT_SECONDS
+from utils.scheduler import JobScheduler
+from utils.redis_client import redis_store
+from utils.calls_history import calls_history
+from utils.metrics import ACTIVE_CALLS, RESTARTS_TOTAL, FAILURES_TOTAL, METRICS_PORT_MONITOR, start_metrics_server
+from config.servers import SERVER_REGISTRY, registered_servers
+
+# Lista dos servidores que devem ser monitorados em cada ciclo (vem do registro)
+SERVERS_TO_MONITOR = registered_servers()
+
+# Quantos servidores são processados ao mesmo tempo em cada ciclo
+MAX_CONCURRENT_SERVERS = int(os.getenv("MAX_CONCURRENT_SERVERS", str(len(SERVERS_TO_MONITOR))))
+
+# Intervalo de Checagem fora do expediente (no expediente a cadência é adaptativa por servidor)
+CHECK_INTERVAL_SECONDS = CADENCE_DEFAULT_SECONDS
+
+# Consulta o 'progresso' da campanha via API para antecipar o fim do mailing
+# (desligado por padrão: custa list_campaign.php + campaign_exec.php a cada checagem com chamadas)
+CADENCE_TRACK_PROGRESS = os.getenv("CADENCE_TRACK_PROGRESS", "False").lower() == "true"
 
 # --- CONSTANTES DE HORÁRIO DE EXPEDIENTE (AJUSTADO PARA UTC/RAILWAY) ---
 START_HOUR = 12   # 09:30h + 3h = 12:30h UTC
@@ -55,28 +73,80 @@ async def check_and_act(server: str):
     Executa o monitoramento e acionamento (restart) para um servidor específico.
     """
     # 1. Executa o Monitoramento (Passa o parâmetro 'server' para o worker)
-    result = await run_monitor(server=server)
+    cadence = monitor_cadence.get(server)
+    try:
+        result = await run_monitor(server=server)
+    except Exception as e:
+        # Conta como falha do monitor: sem isso a cadência ficaria vencida e o loop giraria sem pausa
+        result = {"active_calls": -1, "status": f"Erro inesperado: {e}"}
     active_calls = result.get("active_calls", -1)
     status = result.get("status", "ERRO")
 
-    print(f"[{server}] Resultado: {active_calls} active calls. Status: {status}")
+    print(f"[{server}] Resultado: {active_calls} active calls. Status: {status} (via {result.get('fonte', 'N/A')})")
+
+    # Série temporal para o /api/history (rampa de queda, minutos ociosos, efeito dos restarts)
+    if status == "OK":
+        ACTIVE_CALLS.set(active_calls, server=server)
+        await calls_history.record(server, active_calls)
+        restart_guard.observe(server, active_calls)  # Fecha a janela de rampa do último restart
 
     # 2. Lógica Condicional: Acionar Restart se Active Calls == 0
     if active_calls == 0 and status == "OK":
         print(f"🚨 ALERTA [{server}]: Chamadas zeradas. Acionando ROTINA DE RESTART...")
 
         # 3. Aciona o Restarter (Passa o parâmetro 'server' para o worker)
-        success = await restart_campaign(server=server)
-
-        if success:
+        # O guard barra restarts durante a rampa do anterior, no cooldown ou em andamento em outro processo
+        success = False
+        skipped = False
+        try:
+            # Driver mais barato que suporte o restart (hoje a UI; um endpoint HTTP entra sem mexer aqui)
+            outcome = await restart_guard.run(server, lambda: dialer_driver.restart(server))
+            skipped = outcome is None
+            success = bool(outcome)
+        except DriverError as e:
+            print(f"[{server}] {e}")
+        finally:
+            if not skipped:
+                cadence.reset()  # Histórico anterior ao restart não vale para a tendência
+                RESTARTS_TOTAL.inc(server=server, resultado="sucesso" if success else "falha")
+
+        if skipped:
+            cadence.record(active_calls)  # Segue checando no intervalo curto até a rampa fechar
+            print(f"[{server}] ⏱️ Próxima checagem em {cadence.interval:.0f}s ({cadence.reason})")
+        elif success:
             print(f"✅ RESTART SUCESSO [{server}]: Campanha reimportada e subida.")
         else:
             print(f"❌ RESTART FALHA [{server}]: Falha na rotina de reimportação.")
 
     elif active_calls > 0:
         print(f"[{server}] Operação normal. Chamadas ativas: {active_calls}")
+        progresso = None
+        if CADENCE_TRACK_PROGRESS:
+            progresso = (await get_active_campaign_metrics(server)).get("progresso")
+        cadence.record(active_calls, progresso)
     else:
         print(f"[{server}] FALHA CRÍTICA no Monitoramento. Status: {status}")
+        FAILURES_TOTAL.inc(componente="monitor", motivo=status.split(":")[0])
+        cadence.record_failure()
+
+    if not (active_calls == 0 and status == "OK"):
+        print(f"[{server}] ⏱️ Próxima checagem em {cadence.interval:.0f}s ({cadence.reason})")
+
+
+# Limites de concorrência: global (servidores em paralelo) e por servidor (DialerServer.max_concurrency)
+_global_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SERVERS)
+_server_semaphores = {
+    server_id: asyncio.Semaphore(entry.max_concurrency) for server_id, entry in SERVER_REGISTRY.items()
+}
+
+
+async def _run_for_server(server: str, action):
+    """Executa a ação de um servidor respeitando os limites de concorrência e isolando falhas."""
+    async with _global_semaphore, _server_semaphores[server]:
+        try:
+            return await action(server=server)
+        except Exception as e:
+            print(f"[{server}] ❌ Erro inesperado no ciclo: {e}")
 
 
 async def main_scheduler():
@@ -85,35 +155,81 @@ async def main_scheduler():
     """
     print("Iniciando Scheduler Principal (Modo Headless Railway)...")
 
-    while True:
-        now = datetime.datetime.now()
+    # Navegador persistente do processo: contextos logados por servidor reaproveitados entre ciclos
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        print(f"[POOL] ⚠️ Falha ao aquecer o navegador (nova tentativa sob demanda): {e}")
 
-        # 1. Checagem da Rotina Diária (Horário Fixo: 11:00h)
-        if now.hour == DAILY_IMPORT_HOUR and now.minute == DAILY_IMPORT_MINUTE and now.weekday() < 5:
-            print("\n--- INICIANDO PIPELINE DE IMPORTAÇÃO DIÁRIA (11:00h) ---")
+    # Clientes HTTP keep-alive por discador (status/import e caminho rápido do monitor)
+    await dialer_clients.start()
 
-            # Execução sequencial: Excluir/Importar Mailing Novo em MG e SP
-            await run_daily_import_pipeline(server="MG")
-            await run_daily_import_pipeline(server="SP")
+    # Pool Redis assíncrono (histórico de active calls)
+    await redis_store.connect()
 
-            # ✅ PAUSA DE SEGURANÇA: CRUCIAL para evitar a execução duplicada no mesmo minuto
-            await asyncio.sleep(60)
+    # Exportador /metrics (Prometheus) do processo
+    metrics_server = await start_metrics_server(METRICS_PORT_MONITOR)
 
-            # 2. Rotina de Monitoramento Contínuo (09:30h - 18:30h)
-        if is_within_operating_hours():
-            print(f"\n--- [ATIVO] Ciclo de Monitoramento Iniciado ({now.strftime('%H:%M:%S')}) ---")
+    try:
+        await _scheduler_loop()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await browser_pool.close()
+        await dialer_clients.aclose()
+        await redis_store.close()
 
-            # Executa as checagens de forma sequencial para MG e SP
-            await check_and_act(server="MG")
-            await check_and_act(server="SP")
 
-        else:
-            # A checagem de horário é FALSE, apenas loga o status inativo
-            print(
-                f"--- [INATIVO] Fora do Horário Comercial ({now.strftime('%H:%M:%S')}). Próxima checagem em {CHECK_INTERVAL_SECONDS} segundos. ---")
+async def monitor_server(server: str):
+    """Job de monitoramento de um servidor: só age dentro do horário de expediente."""
+    if not is_within_operating_hours():
+        print(f"--- [INATIVO] [{server}] Fora do Horário Comercial ({datetime.datetime.now().strftime('%H:%M:%S')}). "
+              f"Próxima checagem em {CHECK_INTERVAL_SECONDS:.0f} segundos. ---")
+        return
+    await _run_for_server(server, check_and_act)
+
+
+def _monitor_interval(server: str) -> float:
+    """No expediente segue a cadência adaptativa do servidor; fora dele, o intervalo fixo."""
+    if is_within_operating_hours():
+        return monitor_cadence.get(server).interval
+    return CHECK_INTERVAL_SECONDS
+
+
+async def _import_server(server: str):
+    """
+    Pipeline diário de um servidor. Fica fora dos semáforos do monitor (as leituras seguem durante
+    o import), mas segura o lock do servidor no restart_guard: restart e finalizar/importar não se
+    sobrepõem na mesma caixa.
+    """
+    try:
+        async with restart_guard.exclusive(server):
+            await run_daily_import_pipeline(server=server)
+    except Exception as e:
+        print(f"[{server}] ❌ Erro inesperado no pipeline diário: {e}")
+
+
+async def run_daily_import():
+    print("\n--- INICIANDO PIPELINE DE IMPORTAÇÃO DIÁRIA (11:00h) ---")
+    # Execução concorrente: Excluir/Importar Mailing Novo em todos os servidores
+    await asyncio.gather(*(_import_server(server) for server in SERVERS_TO_MONITOR))
+
+
+def build_scheduler() -> JobScheduler:
+    """
+    Um job por servidor para o monitoramento (tasks independentes) e o pipeline diário
+    como job estilo cron, com marcador persistido: dispara uma vez por dia útil, recuperando se perdido.
+    """
+    scheduler = JobScheduler()
+    for server in SERVERS_TO_MONITOR:
+        scheduler.every(f"monitor_{server}", lambda server=server: monitor_server(server),
+                        interval=lambda server=server: _monitor_interval(server))
+    scheduler.daily("importacao_diaria", run_daily_import, hour=DAILY_IMPORT_HOUR, minute=DAILY_IMPORT_MINUTE)
+    return scheduler
+
 
-        print(f"--- Fim do Ciclo. Aguardando {CHECK_INTERVAL_SECONDS} segundos. ---")
-        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+async def _scheduler_loop():
+    await build_scheduler().run()
 
 
 if __name__ == '__main__':
@@ -2,11 +2,25 @@ import os
 import re
 import json
 import asyncio
+import contextlib
 import httpx
 from typing import Dict, Any
 from datetime import datetime
 from dotenv import load_dotenv
-from playwright.async_api import async_playwright
+
+try:
+    from utils.metrics import PAGE_GOTO_SECONDS, FAILURES_TOTAL
+except ImportError:
+    # Execução avulsa (python scripts/cost_monitor.py): sem a raiz do projeto no path, métricas viram no-op
+    class _NoOpMetric:
+        @contextlib.contextmanager
+        def time(self, **labels):
+            yield dict(labels)
+
+        def inc(self, amount: float = 1.0, **labels):
+            pass
+
+    PAGE_GOTO_SECONDS = FAILURES_TOTAL = _NoOpMetric()
 
 load_dotenv()
 
@@ -36,100 +50,135 @@ def processar_dados_para_dashboard_formatado(d: Dict[str, Any]) -> Dict[str, Any
         "data_coleta": datetime.now().isoformat()
     }
 
-async def coletar_custos_async(headless: bool = True) -> Dict[str, Any]:
-    browser = None
+ROUTER_LAUNCH_ARGS = ["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
+
+
+async def coletar_custos_async(headless: bool = True, browser=None) -> Dict[str, Any]:
+    """
+    Coleta saldo e custo do dia no roteador. Com `browser` (navegador já aberto pelo worker)
+    só abre um contexto novo e o fecha ao final; sem ele lança um Chromium próprio (execução avulsa).
+    """
+    if browser is not None:
+        return await _coletar_no_navegador(browser)
+
+    # Import tardio: o gateway importa este módulo só pela formatação e não tem o Playwright
+    from playwright.async_api import async_playwright
+
     try:
         print("\n[WORKER-DEBUG] 🟢 Iniciando Playwright...")
         async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=headless, 
-                args=["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu"]
-            )
-            context = await browser.new_context(ignore_https_errors=True)
-            page = await context.new_page()
-
-            print(f"[WORKER-DEBUG] 🌐 Acessando roteador em: {BASE_URL}")
+            own_browser = await p.chromium.launch(headless=headless, args=ROUTER_LAUNCH_ARGS)
+            try:
+                return await _coletar_no_navegador(own_browser)
+            finally:
+                print("[WORKER-DEBUG] 🔒 Fechando navegador...")
+                await own_browser.close()
+    except Exception as e:
+        print(f"[WORKER-ERROR] ❌ Erro Crítico durante a coleta: {str(e)}")
+        return {"erro": str(e)}
+
+
+async def _coletar_no_navegador(browser) -> Dict[str, Any]:
+    context = None
+    try:
+        # Contexto novo por coleta: o login do roteador é refeito, mas o Chromium é reaproveitado
+        context = await browser.new_context(ignore_https_errors=True)
+        page = await context.new_page()
+
+        print(f"[WORKER-DEBUG] 🌐 Acessando roteador em: {BASE_URL}")
+        with PAGE_GOTO_SECONDS.time(server="ROTEADOR", pagina="login"):
             await page.goto(BASE_URL, wait_until="domcontentloaded", timeout=60000)
-            
-            await page.fill("#username", USUARIO)
-            await page.fill("#password", SENHA)
-            await page.click('button:has-text("Conectar")')
-            
-            # 1. Extração do Saldo (Sempre visível após login)
-            saldo_el = "#system-container > div > div:nth-child(2) > div > h3"
-            await page.wait_for_selector(saldo_el, timeout=45000)
-            saldo_text = await page.text_content(saldo_el)
-            print(f"[WORKER-DEBUG] ✅ Saldo extraído: {saldo_text}")
-
-            # 2. Navegação para Relatórios
-            print("[WORKER-DEBUG] 🖱️ Navegando para Relatórios Agrupados...")
-            await page.click('#main-menu > li:nth-child(5) > a') 
-            await page.wait_for_timeout(2000) 
-            await page.click("#relatorioAgrupadoLinhas", force=True)
-            
-            # --- LÓGICA DE VERIFICAÇÃO DE CONSUMO ---
-            print("[WORKER-DEBUG] ⏳ Verificando se há consumo registrado hoje...")
-            custo_diario = 0.0
+
+        await page.fill("#username", USUARIO)
+        await page.fill("#password", SENHA)
+        await page.click('button:has-text("Conectar")')
+
+        # 1. Extração do Saldo (Sempre visível após login)
+        saldo_el = "#system-container > div > div:nth-child(2) > div > h3"
+        await page.wait_for_selector(saldo_el, timeout=45000)
+        saldo_text = await page.text_content(saldo_el)
+        print(f"[WORKER-DEBUG] ✅ Saldo extraído: {saldo_text}")
+
+        # 2. Navegação para Relatórios
+        print("[WORKER-DEBUG] 🖱️ Navegando para Relatórios Agrupados...")
+        await page.click('#main-menu > li:nth-child(5) > a')
+        await page.wait_for_timeout(2000)
+        await page.click("#relatorioAgrupadoLinhas", force=True)
+
+        # --- LÓGICA DE VERIFICAÇÃO DE CONSUMO ---
+        print("[WORKER-DEBUG] ⏳ Verificando se há consumo registrado hoje...")
+        custo_diario = 0.0
+        try:
+            # Tenta localizar a tabela por apenas 15 segundos
+            await page.wait_for_selector("#tblMain", timeout=15000, state="visible")
+            print("[WORKER-DEBUG] 📊 Tabela encontrada. Extraindo valores...")
+
+            # Extração das linhas de Discador e URA
+            discador_text = "0"
             try:
-                # Tenta localizar a tabela por apenas 15 segundos
-                await page.wait_for_selector("#tblMain", timeout=15000, state="visible")
-                print("[WORKER-DEBUG] 📊 Tabela encontrada. Extraindo valores...")
-                
-                # Extração das linhas de Discador e URA
-                discador_text = "0"
-                try:
-                    discador_text = await page.locator('#tblMain > tbody > tr:nth-child(1) > td:nth-child(7)').text_content(timeout=5000)
-                except: pass
-
-                ura_text = "0"
-                try:
-                    ura_text = await page.locator('#tblMain > tbody > tr:nth-child(2) > td:nth-child(7)').text_content(timeout=5000)
-                except: pass
-                
-                custo_diario = clean_to_float(discador_text) + clean_to_float(ura_text)
-                
-            except Exception:
-                # Caso a tabela não apareça, o custo é zero (o roteador não gera a tabela sem dados)
-                print("[WORKER-DEBUG] ℹ️ Tabela não localizada. Assumindo custo zero para o dia.")
-                custo_diario = 0.0
-
-            dados = {
-                "saldo_atual": clean_to_float(saldo_text),
-                "custo_diario_total": custo_diario,
-                "custo_semanal_acumulado": 0.0 
-            }
-            return dados
-            
+                discador_text = await page.locator('#tblMain > tbody > tr:nth-child(1) > td:nth-child(7)').text_content(timeout=5000)
+            except: pass
+
+            ura_text = "0"
+            try:
+                ura_text = await page.locator('#tblMain > tbody > tr:nth-child(2) > td:nth-child(7)').text_content(timeout=5000)
+            except: pass
+
+            custo_diario = clean_to_float(discador_text) + clean_to_float(ura_text)
+
+        except Exception:
+            # Caso a tabela não apareça, o custo é zero (o roteador não gera a tabela sem dados)
+            print("[WORKER-DEBUG] ℹ️ Tabela não localizada. Assumindo custo zero para o dia.")
+            custo_diario = 0.0
+
+        dados = {
+            "saldo_atual": clean_to_float(saldo_text),
+            "custo_diario_total": custo_diario,
+            "custo_semanal_acumulado": 0.0
+        }
+        return dados
+
     except Exception as e:
         print(f"[WORKER-ERROR] ❌ Erro Crítico durante a coleta: {str(e)}")
+        FAILURES_TOTAL.inc(componente="custos", motivo=type(e).__name__)
         return {"erro": str(e)}
     finally:
-        if browser: 
-            print("[WORKER-DEBUG] 🔒 Fechando navegador...")
-            await browser.close()
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
 
-async def enviar_para_api(dados: Dict[str, Any]):
+async def enviar_para_api(dados: Dict[str, Any], client: httpx.AsyncClient | None = None):
+    """Entrega os custos ao Gateway. `client` permite reaproveitar a conexão keep-alive do worker."""
     print(f"[WORKER-API] 📡 Enviando dados para Gateway (Diário: R$ {dados['custo_diario_total']})...")
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.post(API_URL_INTERNA, json=dados, timeout=20.0)
-            if resp.status_code == 200:
-                print("✅ [WORKER-API] Entrega confirmada pela API Gateway.")
-            else:
-                print(f"❌ [WORKER-API] Erro na API: {resp.status_code}")
-        except Exception as e:
-            print(f"❌ [WORKER-API] Falha de conexão: {e}")
+    if client is None:
+        async with httpx.AsyncClient() as own_client:
+            return await enviar_para_api(dados, own_client)
+    try:
+        resp = await client.post(API_URL_INTERNA, json=dados, timeout=20.0)
+        if resp.status_code == 200:
+            print("✅ [WORKER-API] Entrega confirmada pela API Gateway.")
+        else:
+            print(f"❌ [WORKER-API] Erro na API: {resp.status_code}")
+    except Exception as e:
+        print(f"❌ [WORKER-API] Falha de conexão: {e}")
 
-if __name__ == '__main__':
+async def executar_coleta(browser=None, client: httpx.AsyncClient | None = None) -> Dict[str, Any]:
+    """Uma execução completa: coleta no roteador e entrega ao Gateway."""
     print(f"--- [WORKER START] {datetime.now().strftime('%d/%m %H:%M:%S')} ---")
-    dados_brutos = asyncio.run(coletar_custos_async())
+    dados_brutos = await coletar_custos_async(browser=browser)
 
     if not dados_brutos.get('erro'):
         # Envia os resultados para a API
-        asyncio.run(enviar_para_api(dados_brutos)) 
-        
+        await enviar_para_api(dados_brutos, client)
+
         fmt = processar_dados_para_dashboard_formatado(dados_brutos)
         print(f"--- [WORKER FINISH] Saldo: {fmt['saldo_atual']} | Diário: {fmt['custo_diario']} ---")
+    return dados_brutos
+
+if __name__ == '__main__':
+    asyncio.run(executar_coleta())
 
 
 
@@ -7,15 +7,15 @@ import pandas as pd
 import httpx  # Necessário para a API
 
 # --- IMPORTAÇÕES DE FUNÇÕES DO PROJETO ---
-from scripts.restart_campaign import finalize_campaign_only
-from utils.mailing_api import api_import_mailling_upload
+from utils.dialer_driver import dialer_driver, DriverError
 from config.settings import LOCAL_MAILING_BASE_DIR  # Caminho local
+from config.servers import get_server
 
 # Assumimos que as constantes estão no escopo global ou importadas.
 # ----------------------------------------
 
 # --- VARIÁVEIS DE CONTROLE ---
-MAILING_FILE_MAP = {"MG": "MAILING_DISCADOR_EMP", "SP": "MAILING_DISCADOR_CARD"}
+# O prefixo do arquivo de cada servidor vem do registro (DialerServer.mailing_arquivo)
 TEST_IMPORT_ID = "1"
 TEST_LOGIN_CRM = "DAILY_IMPORTER"
 
@@ -31,7 +31,10 @@ async def run_daily_import_pipeline(server: str):
 
     # 1. PREPARAÇÃO DO ARQUIVO (LOCAL)
     TODAY_FILE_SUFFIX = datetime.now().strftime(' - %d-%m') + ".csv"
-    base_name = MAILING_FILE_MAP.get(server_name)
+    base_name = get_server(server_name).mailing_arquivo
+    if not base_name:
+        print(f"[{server_name}] ⚠️ Servidor sem mailing diário configurado. Ignorando.")
+        return False
     source_file_path = os.path.join(LOCAL_MAILING_BASE_DIR, f"{base_name}{TODAY_FILE_SUFFIX}")
 
     if not os.path.exists(source_file_path):
@@ -39,8 +42,12 @@ async def run_daily_import_pipeline(server: str):
         return False
 
     # 2. PASSO 1: LIMPEZA/FINALIZAÇÃO DA CAMPANHA ANTIGA (Web Scraping)
-    print(f"[{server_name}] 2. Limpeza: Finalizando campanha antiga via UI...")
-    clean_success = await finalize_campaign_only(server)
+    print(f"[{server_name}] 2. Limpeza: Finalizando campanha antiga...")
+    try:
+        clean_success = await dialer_driver.finalize(server)
+    except DriverError as e:
+        print(f"[{server_name}] {e}")
+        clean_success = False
 
     if not clean_success:
         print(f"[{server_name}] ❌ Alerta: Falha na limpeza. ABORTANDO para evitar conflito.")
@@ -52,16 +59,17 @@ async def run_daily_import_pipeline(server: str):
     try:
         mailling_name_for_api = base_name + datetime.now().strftime(' - %d-%m')
 
-        upload_result = await api_import_mailling_upload(
-            server=server,
-            campaign_id=TEST_IMPORT_ID,
+        upload_result = await dialer_driver.import_mailing(
+            server,
+            TEST_IMPORT_ID,
             source_csv_path=source_file_path,
             mailling_name=mailling_name_for_api,
             login_crm=TEST_LOGIN_CRM
         )
 
         if upload_result.get('success'):
-            print(f"[{server_name}] ✅ SUCESSO: Upload concluído. ID Lista: {upload_result.get('id_lista', 'N/A')}")
+            ids_lista = upload_result.get('ids_lista') or [upload_result.get('id_lista', 'N/A')]
+            print(f"[{server_name}] ✅ SUCESSO: Upload concluído. ID Lista: {', '.join(map(str, ids_lista))}")
 
             # 4. PASSO 3: ATIVAÇÃO
             # Aqui entraria a lógica de Web Scraping para ATIVAR a campanha com 70 canais (Se necessário).
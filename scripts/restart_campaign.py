@@ -1,9 +1,13 @@
 # scripts/restart_campaign.py
 
 import asyncio
-from playwright.async_api import async_playwright
-from utils.login_manager import create_context_and_login, get_fila_name, get_server_name
-from config.settings import SAIDAS_VALOR
+import sys
+from contextlib import AsyncExitStack
+from utils.login_manager import browser_pool, get_fila_name, get_server_name
+from utils.run_trace import RunTrace, TRACE_PLAYWRIGHT_ON_FAILURE
+from utils.restart_guard import restart_guard
+from utils.redis_client import redis_store
+from config.servers import get_server
 
 # --- Constantes do Script (Seletores Validados) ---
 SELETOR_BOTAO_FINALIZAR = 'button:has-text("Finalizar Campanha")'
@@ -19,6 +23,15 @@ SELETOR_BOTAO_TELEFONE_ABRIR = 'xpath=//*[@id="Discador"]/div[1]/div/div/div/div
 # NOVO SELETOR HIERÁRQUICO
 SELETOR_LISTA_ABERTA_ITEM = 'div.dropdown-menu.open'
 
+# --- Orçamentos de espera por condição (ms). Substituem os sleeps fixos: cada etapa segue assim que a
+# condição é atendida e só falha se o discador passar do orçamento daquela etapa.
+TIMEOUT_MENU_MS = 15000         # Links do menu lateral (Discador Automático -> DA Preditivo -> Enviar)
+TIMEOUT_PAINEL_MS = 20000       # Painel 'Contatos pendentes' com o nome da campanha
+TIMEOUT_FINALIZAR_MS = 10000    # Botão 'Finalizar Campanha' e fechamento do diálogo de confirmação
+TIMEOUT_DROPDOWN_MS = 10000     # Lista aberta do dropdown populada com a opção desejada
+TIMEOUT_OPCAO_MS = 20000        # Clique na opção do dropdown
+TIMEOUT_SUBIR_MS = 5000         # Rede ociosa após 'Subir Mailing' (não bloqueia o sucesso)
+
 
 async def get_current_campaign_name(page) -> str | None:
     """
@@ -26,7 +39,7 @@ async def get_current_campaign_name(page) -> str | None:
     """
     try:
         # AUMENTO DE TIMEOUT: 20s para o painel de pendentes aparecer (Máxima tolerância)
-        await page.wait_for_selector(SELETOR_PAINEL_PENDENTES, state='visible', timeout=20000) 
+        await page.wait_for_selector(SELETOR_PAINEL_PENDENTES, state='visible', timeout=TIMEOUT_PAINEL_MS)
         
         campaign_elements = page.locator('text=/MAILING_/')
         all_texts = await campaign_elements.all_inner_texts()
@@ -43,154 +56,203 @@ async def get_current_campaign_name(page) -> str | None:
 # --- FUNÇÃO ISOLADA PARA LIMPEZA (CHAMADA PELO DAILY WORKER) ---
 async def finalize_campaign_only(server: str):
     """Navega até a página de envio e executa apenas a finalização da campanha atual."""
-    async with async_playwright() as p:
-        # 1. Recebe os 3 objetos (context, page, browser)
-        context, page, browser = await create_context_and_login(p, server=server)
-
-        if not context:
-            return False
+    trace = RunTrace("finalize_campaign", server)
+    success = False
+    # O trace fecha dentro do stack: o tracing do Playwright para antes do contexto dedicado fechar
+    async with AsyncExitStack() as stack:
+        try:
+            page = await _open_authenticated_page(stack, server, trace)
+            if page is not None:
+                success = await _finalize_campaign_only(page, server, trace)
+            return success
+        finally:
+            await trace.finish(success)
 
-        server_name = get_server_name(server)
 
-        try:
-            # ----------------------------------------------------
-            # ETAPA 1: NAVEGAÇÃO E EXTRAÇÃO DO NOME DA CAMPANHA
-            # ----------------------------------------------------
-            print(f"[{server_name}] 1. Navegando para Finalização de Campanha...")
+async def _open_authenticated_page(stack: AsyncExitStack, server: str, trace: RunTrace):
+    """
+    Etapa 'login': pede uma página ao pool e abre a página inicial autenticada. None se falhar.
+    Com o tracing do Playwright ligado, a página vem de um contexto dedicado à execução.
+    """
+    with trace.step("login") as span:
+        pool_page = browser_pool.isolated_page(server) if TRACE_PLAYWRIGHT_ON_FAILURE else browser_pool.page(server)
+        page = await stack.enter_async_context(pool_page)
+        if page is None or not await browser_pool.open_home(page, server):
+            span["resultado"] = "falhou"
+            return None
+        await trace.attach_playwright(page.context)
+        return page
+
+
+async def _navigate_to_preditivo(page, trace: RunTrace):
+    """Etapa 'navegar_preditivo': Discador Automático -> Preditivo -> Enviar."""
+    with trace.step("navegar_preditivo"):
+        # Navegação (Clique Discador Automático -> Preditivo -> Enviar): cada clique espera
+        # o próximo link ficar visível (menu expandido), em vez de pausas fixas
+        for target in (page.get_by_role("link", name="send Discador Automático"),
+                       page.get_by_role("link", name="DA Preditivo"),
+                       page.get_by_text("Enviar")):
+            await target.wait_for(state='visible', timeout=TIMEOUT_MENU_MS)
+            await target.click(timeout=TIMEOUT_MENU_MS)
+
+
+async def _read_campaign_name(page, trace: RunTrace) -> str | None:
+    with trace.step("ler_nome_campanha") as span:
+        current_campaign = await get_current_campaign_name(page)
+        if not current_campaign:
+            span["resultado"] = "nao_encontrado"
+        return current_campaign
+
+
+async def _finalize_current(page, trace: RunTrace):
+    with trace.step("finalizar"):
+        await page.wait_for_selector(SELETOR_BOTAO_FINALIZAR, state='visible', timeout=TIMEOUT_FINALIZAR_MS)
+        await page.click(SELETOR_BOTAO_FINALIZAR, timeout=TIMEOUT_FINALIZAR_MS)
+
+        # ✅ CORREÇÃO: Usando a constante correta
+        await page.click(SELETOR_CONFIRMAR_FINALIZAR, timeout=TIMEOUT_FINALIZAR_MS)
+        # Pronto quando o diálogo de confirmação fecha
+        await page.wait_for_selector(SELETOR_CONFIRMAR_FINALIZAR, state='hidden', timeout=TIMEOUT_FINALIZAR_MS)
+
+
+async def _finalize_campaign_only(page, server: str, trace: RunTrace) -> bool:
+    server_name = get_server_name(server)
 
-            # Estabilização pós-login
-            await page.wait_for_timeout(5000)
+    try:
+        # ----------------------------------------------------
+        # ETAPA 1: NAVEGAÇÃO E EXTRAÇÃO DO NOME DA CAMPANHA
+        # ----------------------------------------------------
+        print(f"[{server_name}] 1. Navegando para Finalização de Campanha...")
+        await _navigate_to_preditivo(page, trace)
 
-            # Navegação (Clique Discador Automático -> Preditivo -> Enviar)
-            await page.get_by_role("link", name="send Discador Automático").click()
-            await page.wait_for_timeout(200)
-            await page.get_by_role("link", name="DA Preditivo").click()
-            await page.wait_for_timeout(1000)
-            await page.get_by_text("Enviar").click()
+        # Extração (Necessário para a próxima etapa, mas não para a finalização em si)
+        current_campaign = await _read_campaign_name(page, trace)
 
-            # Extração (Necessário para a próxima etapa, mas não para a finalização em si)
-            current_campaign = await get_current_campaign_name(page)
+        if not current_campaign:
+            print(
+                f"[{server_name}] ⚠️ Alerta: Nome da campanha não encontrado para log. Prosseguindo com a finalização.")
 
-            if not current_campaign:
-                print(
-                    f"[{server_name}] ⚠️ Alerta: Nome da campanha não encontrado para log. Prosseguindo com a finalização.")
+        print(f"[{server_name}] 2. Finalizando Campanha atual via UI...")
 
-            print(f"[{server_name}] 2. Finalizando Campanha atual via UI...")
+        # Finalização (O ponto final da rotina de limpeza)
+        await _finalize_current(page, trace)
 
-            # Finalização (O ponto final da rotina de limpeza)
-            await page.wait_for_selector(SELETOR_BOTAO_FINALIZAR, state='visible', timeout=10000)
-            await page.click(SELETOR_BOTAO_FINALIZAR)
-            await page.click(SELETOR_CONFIRMAR_FINALIZAR)
-            await page.wait_for_timeout(1000)
+        print(f"[{server_name}] ✅ Campanha antiga finalizada com sucesso.")
+        return True
 
-            print(f"[{server_name}] ✅ Campanha antiga finalizada com sucesso.")
-            return True
+    except Exception as e:
+        print(f"[{server_name}] ❌ Erro durante a FINALIZAÇÃO da campanha: {e}")
+        return False
 
-        except Exception as e:
-            print(f"[{server_name}] ❌ Erro durante a FINALIZAÇÃO da campanha: {e}")
-            return False
 
+async def _wait_network_idle(page, timeout_ms: int):
+    """Espera a rede ficar ociosa (envio processado). Páginas com polling podem nunca ficar: só loga."""
+    try:
+        await page.wait_for_load_state('networkidle', timeout=timeout_ms)
+    except Exception:
+        print(f"⚠️ Rede não ficou ociosa em {timeout_ms} ms após o envio. Seguindo.")
+
+
+async def _select_dropdown_option(page, trace: RunTrace, step: str, open_button, option_name: str):
+    """Abre um dropdown (locator ou seletor) e escolhe a opção pelo nome."""
+    with trace.step(step):
+        if isinstance(open_button, str):
+            await page.click(open_button, timeout=TIMEOUT_DROPDOWN_MS)
+        else:
+            await open_button.click(timeout=TIMEOUT_DROPDOWN_MS)
+
+        # Pronto quando a lista aberta (div.dropdown-menu.open) já traz a opção desejada
+        option = page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=option_name)
+        await option.wait_for(state='visible', timeout=TIMEOUT_DROPDOWN_MS)
+        await option.click(timeout=TIMEOUT_OPCAO_MS)
+
+
+async def restart_campaign(server: str):
+    """Restart completo com trace por etapa (ver /api/traces/restart_campaign)."""
+    trace = RunTrace("restart_campaign", server)
+    success = False
+    # O trace fecha dentro do stack: o tracing do Playwright para antes do contexto dedicado fechar
+    async with AsyncExitStack() as stack:
+        try:
+            # 1. Pede uma página ao pool e abre a página inicial autenticada
+            page = await _open_authenticated_page(stack, server, trace)
+            if page is not None:
+                success = await run_restart_steps(page, server, trace)
+            return success
         finally:
-            if browser:  # ✅ GARANTIA DE RECURSOS: Fecha o navegador após cada ciclo.
-                await browser.close()
+            await trace.finish(success)
+
 
-async def restart_campaign(server: str): 
-    async with async_playwright() as p:
-        # 1. Recebe os 3 objetos (context, page, browser)
-        context, page, browser = await create_context_and_login(p, server=server)
+async def run_restart_steps(page, server: str, trace: RunTrace) -> bool:
+    """Etapas do restart a partir da página inicial autenticada (usado também pelo benchmark)."""
+    server_name = get_server_name(server)
+    fila_name = get_fila_name(server)
+
+    try:
+        # ----------------------------------------------------
+        # ETAPA 1: NAVEGAÇÃO, EXTRAÇÃO E FINALIZAÇÃO
+        # ----------------------------------------------------
+        print(f"[{server_name}] 1. Navegando para Envio de Campanhas e extraindo nome da campanha...")
+        await _navigate_to_preditivo(page, trace)
 
-        if not context:
+        current_campaign = await _read_campaign_name(page, trace)
+
+        if not current_campaign:
+            print(f"[{server_name}] ⚠️ Alerta: Não foi possível obter o nome da campanha. Abortando restart.")
             return False
 
-        server_name = get_server_name(server)
-        fila_name = get_fila_name(server)
+        print(f"[{server_name}] ✅ Campanha atual identificada: {current_campaign}")
 
-        try:
-            # ----------------------------------------------------
-            # ETAPA 1: NAVEGAÇÃO, EXTRAÇÃO E FINALIZAÇÃO
-            # ----------------------------------------------------
-            print(f"[{server_name}] 1. Navegando para Envio de Campanhas e extraindo nome da campanha...")
-
-            # Estabilização pós-login
-            await page.wait_for_timeout(5000) 
-
-            # Navegação (Clique Discador Automático -> Preditivo -> Enviar)
-            await page.get_by_role("link", name="send Discador Automático").click()
-            await page.wait_for_timeout(200) 
-            await page.get_by_role("link", name="DA Preditivo").click()
-            await page.wait_for_timeout(1000)
-            await page.get_by_text("Enviar").click()
-
-            current_campaign = await get_current_campaign_name(page)
-
-            if not current_campaign:
-                print(f"[{server_name}] ⚠️ Alerta: Não foi possível obter o nome da campanha. Abortando restart.")
-                return False
-
-            print(f"[{server_name}] ✅ Campanha atual identificada: {current_campaign}")
-
-            print(f"[{server_name}] 2. Finalizando Campanha atual...")
-            await page.wait_for_selector(SELETOR_BOTAO_FINALIZAR, state='visible', timeout=10000)
-            await page.click(SELETOR_BOTAO_FINALIZAR)
-            
-            # ✅ CORREÇÃO: Usando a constante correta
-            await page.click(SELETOR_CONFIRMAR_FINALIZAR) 
-            await page.wait_for_timeout(1000) 
-
-            # ----------------------------------------------------
-            # ETAPA 3: RECONFIGURAÇÃO E DISPARO (AÇÕES OTIMIZADAS/ROBUSTAS)
-            # ----------------------------------------------------
-            print(f"[{server_name}] 3. Reconfigurando e disparando o mailing...")
-
-            # AÇÃO A: Selecionar a CAMPANHA
-            await page.get_by_role("button", name="Escolha a opção").first.click()
-            # ✅ CORREÇÃO: Restaurando espera de sincronia de 500ms
-            await page.wait_for_timeout(500) 
-            
-            await page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=current_campaign).wait_for(state='visible', timeout=10000) 
-            await page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=current_campaign).click(
-                timeout=20000) 
-
-            # AÇÃO B: SELECIONAR TELEFONE/MAILING
-            await page.click(SELETOR_BOTAO_TELEFONE_ABRIR)
-            # ✅ CORREÇÃO: Restaurando espera de sincronia de 500ms
-            await page.wait_for_timeout(500) 
-            
-            await page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=current_campaign).wait_for(state='visible', timeout=10000)
-            await page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=current_campaign).click(
-                timeout=20000) 
-
-            # AÇÃO C: Selecionar a FILA DE ATENDIMENTO
-            await page.click(SELETOR_BOTAO_FILA_ABRIR)
-            # ✅ CORREÇÃO: Restaurando espera de sincronia de 500ms
-            await page.wait_for_timeout(500) 
-            
-            await page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=fila_name).wait_for(state='visible', timeout=10000)
-            await page.locator(SELETOR_LISTA_ABERTA_ITEM).get_by_role("option", name=fila_name).click(timeout=20000)
-
-            # AÇÃO D: Preencher Saídas
-            await page.fill(SELETOR_INPUT_SAIDAS, SAIDAS_VALOR)
-
-            # AÇÃO E: Clicar no BOTÃO DE ENVIO (Subir Mailing)
+        print(f"[{server_name}] 2. Finalizando Campanha atual...")
+        await _finalize_current(page, trace)
+
+        # ----------------------------------------------------
+        # ETAPA 3: RECONFIGURAÇÃO E DISPARO (AÇÕES OTIMIZADAS/ROBUSTAS)
+        # ----------------------------------------------------
+        print(f"[{server_name}] 3. Reconfigurando e disparando o mailing...")
+
+        # AÇÃO A: Selecionar a CAMPANHA
+        await _select_dropdown_option(page, trace, "selecionar_campanha",
+                                      page.get_by_role("button", name="Escolha a opção").first, current_campaign)
+
+        # AÇÃO B: SELECIONAR TELEFONE/MAILING
+        await _select_dropdown_option(page, trace, "selecionar_telefone",
+                                      SELETOR_BOTAO_TELEFONE_ABRIR, current_campaign)
+
+        # AÇÃO C: Selecionar a FILA DE ATENDIMENTO
+        await _select_dropdown_option(page, trace, "selecionar_fila", SELETOR_BOTAO_FILA_ABRIR, fila_name)
+
+        # AÇÃO D: Preencher Saídas
+        with trace.step("preencher_saidas"):
+            await page.fill(SELETOR_INPUT_SAIDAS, get_server(server).saidas)
+
+        # AÇÃO E: Clicar no BOTÃO DE ENVIO (Subir Mailing)
+        with trace.step("subir_mailing"):
             await page.click(SELETOR_BOTAO_SUBIR_MAILING)
-            
-            await page.wait_for_timeout(2000) 
+            await _wait_network_idle(page, TIMEOUT_SUBIR_MS)
 
-            print(f"[{server_name}] ✅ Campanhas reconfigurada e subida com sucesso!")
-            return True
+        print(f"[{server_name}] ✅ Campanhas reconfigurada e subida com sucesso!")
+        return True
 
-        except Exception as e:
-            print(f"[{server_name}] ❌ Erro durante a automação do restart: {e}")
-            return False
+    except Exception as e:
+        print(f"[{server_name}] ❌ Erro durante a automação do restart: {e}")
+        return False
 
-        finally:
-            if browser: # ✅ GARANTIA DE RECURSOS: Fecha o navegador após cada ciclo.
-                await browser.close()
+
+async def _run_standalone(server: str, force: bool = False):
+    """
+    Execução avulsa: usa o pool do processo e o encerra ao final. Respeita o lock distribuído
+    (não corre em paralelo com o scheduler); `force` ignora apenas o cooldown compartilhado.
+    """
+    try:
+        return await restart_guard.run(server, lambda: restart_campaign(server=server), force=force)
+    finally:
+        await browser_pool.close()
+        await redis_store.close()
 
 
 if __name__ == '__main__':
-    import asyncio
-    asyncio.run(restart_campaign(server="MG"))
+    asyncio.run(_run_standalone(server="MG", force="--force" in sys.argv))
     # Loga, extrai nome da campanha em execução, finaliza campanha,
     # reconfigura os 3 dropdowns (Campanha, Telefone, Fila) e envia o mailing.
 
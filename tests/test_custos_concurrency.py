@@ -0,0 +1,131 @@
+# tests/test_custos_concurrency.py
+#
+# O /api/custos/ não pode degradar com outras requisições em voo: o gateway roda no próprio processo
+# (httpx.ASGITransport), com o Redis falso assíncrono (benchmarks/fakes.py, latência injetada), um
+# /api/status lento (discador simulado com asyncio.sleep) e outros /api/custos/ concorrentes. Com o
+# cliente Redis bloqueante antigo (FakeRedis(blocking=True)) o p95 com carga estoura o limite.
+# Também cobre a queda do Redis: o endpoint devolve o último valor conhecido em vez de 500.
+#
+# Uso (na raiz do projeto):  python -m unittest tests.test_custos_concurrency
+
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+# Sem cache no /api/status: toda requisição de status vai ao discador lento
+os.environ.setdefault("STATUS_CACHE_TTL_SECONDS", "0")
+os.environ.setdefault("STATUS_CACHE_STALE_SECONDS", "0")
+
+import httpx
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+import api_server
+from benchmarks.fakes import FakeRedis, percentile
+from utils.redis_client import redis_store
+
+REDIS_LATENCY_MS = 5.0
+DIALER_LATENCY_SECONDS = 0.2
+CONCURRENCY = 20          # Requisições em voo durante a medição com carga (metade status, metade custos)
+SAMPLES = 60
+# p95 com carga <= p95 ocioso * LOAD_FACTOR + SLACK_MS (folga para o ruído do event loop compartilhado)
+LOAD_FACTOR = 4.0
+SLACK_MS = 30.0
+
+CACHE_LOVABLE = {"saldo_atual": 1500.0, "custo_diario_total": 42.5, "custo_semanal_acumulado": 180.0}
+
+
+class FlakyRedis(FakeRedis):
+    """FakeRedis que passa a recusar conexões quando `down` é ligado."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.down = False
+
+    async def _wait(self):
+        if self.down:
+            raise RedisConnectionError("Redis fora do ar (simulado)")
+        await super()._wait()
+
+
+async def _slow_campaign_metrics(server: str) -> dict:
+    await asyncio.sleep(DIALER_LATENCY_SECONDS)
+    return {"nome": "CAMPANHA TESTE", "status": "OK", "progresso": "42%", "saidas": "130"}
+
+
+class CustosConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.fake_redis = FlakyRedis(latency_ms=REDIS_LATENCY_MS)
+        self.fake_redis.data["cache_lovable"] = json.dumps(CACHE_LOVABLE)
+        self._saved = (redis_store._client, dict(redis_store._last_known))
+        redis_store._client = self.fake_redis
+        redis_store._last_known.clear()
+
+        self._patch = mock.patch.object(api_server, "get_active_campaign_metrics", _slow_campaign_metrics)
+        self._patch.start()
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api_server.app),
+                                        base_url="http://gateway", timeout=30)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        self._patch.stop()
+        redis_store._client, last_known = self._saved
+        redis_store._last_known.clear()
+        redis_store._last_known.update(last_known)
+
+    async def _measure_custos(self, n: int) -> list[float]:
+        latencies = []
+        for _ in range(n):
+            start = time.perf_counter()
+            response = await self.client.get("/api/custos/")
+            self.assertEqual(response.status_code, 200)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    async def test_custos_latency_stable_with_requests_in_flight(self):
+        await self._measure_custos(5)  # Aquece rotas e imports fora da medição
+        idle = await self._measure_custos(SAMPLES)
+
+        stop = asyncio.Event()
+        status_calls = 0
+
+        async def _worker(path: str):
+            nonlocal status_calls
+            while not stop.is_set():
+                response = await self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                status_calls += path.startswith("/api/status")
+
+        workers = [asyncio.create_task(_worker("/api/status/MG" if i % 2 else "/api/custos/"))
+                   for i in range(CONCURRENCY)]
+        await asyncio.sleep(DIALER_LATENCY_SECONDS / 2)  # Todas as requisições de status já em voo
+        try:
+            loaded = await self._measure_custos(SAMPLES)
+        finally:
+            stop.set()
+            await asyncio.gather(*workers)
+
+        idle_p95, loaded_p95 = percentile(idle, 0.95), percentile(loaded, 0.95)
+        self.assertGreater(status_calls, 0, "a carga de /api/status não rodou durante a medição")
+        self.assertLessEqual(
+            loaded_p95, idle_p95 * LOAD_FACTOR + SLACK_MS,
+            f"/api/custos/ p95 com carga {loaded_p95:.1f} ms vs. ocioso {idle_p95:.1f} ms",
+        )
+
+    async def test_redis_outage_returns_last_known_value(self):
+        before = await self.client.get("/api/custos/")
+        self.assertEqual(before.status_code, 200)
+
+        self.fake_redis.down = True
+        during = await self.client.get("/api/custos/")
+
+        self.assertEqual(during.status_code, 200)
+        for key in ("saldo_atual", "custo_diario", "custo_semanal"):  # data_coleta é o instante da formatação
+            self.assertEqual(during.json()[key], before.json()[key])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+# utils/calls_history.py (Série temporal de active calls por servidor, com rollups no Redis)
+
+import os
+import time
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from utils.redis_client import AsyncRedisStore, redis_store
+from utils.metrics import REDIS_SECONDS
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES (retenção em segundos) ---
+HISTORY_RAW_RETENTION = int(os.getenv("HISTORY_RAW_RETENTION", str(2 * 86400)))        # Pontos brutos: 2 dias
+HISTORY_MINUTE_RETENTION = int(os.getenv("HISTORY_MINUTE_RETENTION", str(35 * 86400)))  # Rollup 1 min: ~1 mês
+HISTORY_HOUR_RETENTION = int(os.getenv("HISTORY_HOUR_RETENTION", str(400 * 86400)))     # Rollup 1 h: ~13 meses
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "500"))                        # Pontos por resposta (step auto)
+HISTORY_KEY_PREFIX = "historico_chamadas:"
+
+# Resoluções guardadas: nome -> (largura do bucket em segundos, retenção)
+RESOLUCOES = {
+    "1m": (60, HISTORY_MINUTE_RETENTION),
+    "1h": (3600, HISTORY_HOUR_RETENTION),
+}
+
+
+def _merge(stats: dict | None, count: int, total: float, minimum: float, maximum: float) -> dict:
+    """Combina um agregado (count/sum/min/max) com outro."""
+    if stats is None:
+        return {"count": count, "sum": total, "min": minimum, "max": maximum}
+    return {
+        "count": stats["count"] + count,
+        "sum": stats["sum"] + total,
+        "min": min(stats["min"], minimum),
+        "max": max(stats["max"], maximum),
+    }
+
+
+def _encode(stats: dict) -> str:
+    return f"{stats['count']}:{stats['sum']:g}:{stats['min']:g}:{stats['max']:g}"
+
+
+def _decode(raw: str) -> dict:
+    count, total, minimum, maximum = raw.split(":")
+    return {"count": int(count), "sum": float(total), "min": float(minimum), "max": float(maximum)}
+
+
+def downsample(buckets: list[tuple[float, dict]], step: int) -> list[dict]:
+    """Reagrupa buckets (início, agregado) ordenados em janelas de `step` segundos."""
+    points: list[dict] = []
+    current_start, current = None, None
+    for start, stats in buckets:
+        window = int(start // step * step)
+        if window != current_start:
+            if current is not None:
+                points.append(_point(current_start, current))
+            current_start, current = window, None
+        current = _merge(current, stats["count"], stats["sum"], stats["min"], stats["max"])
+    if current is not None:
+        points.append(_point(current_start, current))
+    return points
+
+
+def _point(start: int, stats: dict) -> dict:
+    return {
+        "ts": start,
+        "min": stats["min"],
+        "max": stats["max"],
+        "avg": round(stats["sum"] / stats["count"], 2),
+        "amostras": stats["count"],
+    }
+
+
+def choose_resolution(start: float, step: int) -> str:
+    """Resolução mais grossa que ainda atende o step pedido e cobre o período."""
+    if step < 60 and start >= time.time() - HISTORY_RAW_RETENTION:
+        return "raw"
+    if step < 3600 and start >= time.time() - HISTORY_MINUTE_RETENTION:
+        return "1m"
+    return "1h"
+
+
+class CallsHistory:
+    """
+    Guarda cada amostra do monitor em sorted sets do Redis:
+    - `raw`: pontos brutos (score = timestamp), mantidos por HISTORY_RAW_RETENTION;
+    - `1m` / `1h`: rollups min/max/avg atualizados na escrita (índice ZSET + HASH de agregados).
+    Consultas longas leem só os rollups, então o custo não cresce com meses de histórico.
+    """
+
+    def __init__(self, store: AsyncRedisStore = redis_store, prefix: str = HISTORY_KEY_PREFIX):
+        self.store = store
+        self.prefix = prefix
+        self._last_trim: dict[str, float] = {}
+
+    def _key(self, server: str, resolution: str, kind: str = "idx") -> str:
+        return f"{self.prefix}{server.upper()}:{resolution}:{kind}"
+
+    async def record(self, server: str, active_calls: int, ts: float | None = None):
+        """Grava uma amostra. Falha do Redis é logada e não interrompe o monitoramento."""
+        if active_calls < 0:
+            return  # Leitura inválida do monitor
+        ts = ts if ts is not None else time.time()
+        try:
+            with REDIS_SECONDS.time(operacao="historico_gravar", resultado="erro") as labels:
+                await self._write(server, active_calls, ts)
+                labels["resultado"] = "ok"
+        except (RedisError, OSError) as e:
+            print(f"[{server}] ⚠️ Histórico de chamadas não gravado (Redis indisponível): {e}")
+
+    async def _write(self, server: str, active_calls: int, ts: float):
+        """Grava o ponto bruto e atualiza os rollups dos buckets correntes."""
+        await self.store.connect()
+        client = self.store.client
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zadd(self._key(server, "raw"), {f"{ts:.3f}:{active_calls}": ts})
+            for resolution, (width, _) in RESOLUCOES.items():
+                pipe.hget(self._key(server, resolution, "dados"), str(int(ts // width * width)))
+            current = await pipe.execute()
+
+        async with client.pipeline(transaction=False) as pipe:
+            for raw_stats, (resolution, (width, _)) in zip(current[1:], RESOLUCOES.items()):
+                bucket = int(ts // width * width)
+                stats = _merge(_decode(raw_stats) if raw_stats else None, 1, active_calls, active_calls,
+                               active_calls)
+                pipe.hset(self._key(server, resolution, "dados"), str(bucket), _encode(stats))
+                pipe.zadd(self._key(server, resolution), {str(bucket): bucket})
+            await pipe.execute()
+
+        await self._trim(server, ts)
+
+    async def _trim(self, server: str, now: float):
+        """Remove pontos e buckets fora da retenção (no máximo uma vez por minuto por servidor)."""
+        if now - self._last_trim.get(server, 0.0) < 60:
+            return
+        self._last_trim[server] = now
+        client = self.store.client
+        await client.zremrangebyscore(self._key(server, "raw"), "-inf", now - HISTORY_RAW_RETENTION)
+        for resolution, (_, retention) in RESOLUCOES.items():
+            expired = await client.zrangebyscore(self._key(server, resolution), "-inf", now - retention)
+            if expired:
+                async with client.pipeline(transaction=False) as pipe:
+                    pipe.hdel(self._key(server, resolution, "dados"), *expired)
+                    pipe.zrem(self._key(server, resolution), *expired)
+                    await pipe.execute()
+
+    async def query(self, server: str, start: float, end: float, step: int | None = None) -> dict:
+        """Pontos (min/max/avg) entre `start` e `end` (epoch), agrupados em `step` segundos."""
+        if step is None or step <= 0:
+            step = max(1, int((end - start) // HISTORY_MAX_POINTS))
+        resolution = choose_resolution(start, step)
+        await self.store.connect()
+        with REDIS_SECONDS.time(operacao="historico_ler", resultado="erro") as labels:
+            buckets = await self._read(server, resolution, start, end)
+            labels["resultado"] = "ok"
+        if resolution != "raw":
+            step = max(step, RESOLUCOES[resolution][0])
+
+        return {
+            "servidor": server.upper(),
+            "de": int(start),
+            "ate": int(end),
+            "step": step,
+            "resolucao": resolution,
+            "pontos": downsample(buckets, step),
+        }
+
+    async def _read(self, server: str, resolution: str, start: float, end: float) -> list[tuple[float, dict]]:
+        """Buckets (início, agregado) da resolução escolhida dentro do período."""
+        client = self.store.client
+        if resolution == "raw":
+            members = await client.zrangebyscore(self._key(server, "raw"), start, end)
+            buckets = []
+            for member in members:
+                ts, value = member.split(":")
+                buckets.append((float(ts), _merge(None, 1, float(value), float(value), float(value))))
+        else:
+            width = RESOLUCOES[resolution][0]
+            # Inclui o bucket que começa antes de `start` mas o contém
+            bucket_ids = await client.zrangebyscore(self._key(server, resolution), start // width * width, end)
+            raw_stats = await client.hmget(self._key(server, resolution, "dados"), bucket_ids) if bucket_ids else []
+            buckets = [(float(b), _decode(s)) for b, s in zip(bucket_ids, raw_stats) if s]
+        return buckets
+
+
+# Instância compartilhada do processo
+calls_history = CallsHistory()
@@ -0,0 +1,136 @@
+# utils/circuit_breaker.py (Circuit breaker por servidor do Discador)
+
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))       # Falhas seguidas para abrir
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))      # Tempo aberto até testar
+CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))   # Chamadas de teste simultâneas
+
+# Estados
+FECHADO = "fechado"          # Normal: chamadas passam, falhas são contadas
+ABERTO = "aberto"            # Caixa fora: chamadas falham na hora, sem ir à rede
+MEIO_ABERTO = "meio_aberto"  # Recuperação: poucas chamadas de teste decidem se fecha ou reabre
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem ir à rede porque o circuito do servidor está aberto."""
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um servidor. Após `failure_threshold` falhas seguidas abre e recusa chamadas
+    por `recovery_seconds`; depois deixa passar até `half_open_max_calls` chamadas de teste:
+    sucesso fecha o circuito, falha reabre.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_seconds: float = CIRCUIT_RECOVERY_SECONDS,
+                 half_open_max_calls: int = CIRCUIT_HALF_OPEN_MAX_CALLS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._state = FECHADO
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_inflight = 0
+        self.total_failures = 0
+        self.total_rejected = 0
+        self.times_opened = 0
+        self.last_error: str | None = None
+
+    @property
+    def state(self) -> str:
+        if self._state == ABERTO and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = MEIO_ABERTO
+            self._half_open_inflight = 0
+        return self._state
+
+    def retry_in(self) -> float:
+        """Segundos até o circuito aberto aceitar uma chamada de teste."""
+        if self.state != ABERTO:
+            return 0.0
+        return max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+
+    def before_call(self):
+        """Reserva a chamada ou levanta CircuitOpenError (falha rápida)."""
+        state = self.state
+        if state == ABERTO or (state == MEIO_ABERTO and self._half_open_inflight >= self.half_open_max_calls):
+            self.total_rejected += 1
+            raise CircuitOpenError(
+                f"Circuito aberto para {self.name} (nova tentativa em {self.retry_in():.0f}s). "
+                f"Último erro: {self.last_error}"
+            )
+        if state == MEIO_ABERTO:
+            self._half_open_inflight += 1
+
+    def record_success(self):
+        if self._state != FECHADO:
+            print(f"[{self.name}] ✅ Circuito FECHADO: servidor respondeu novamente.")
+        self._state = FECHADO
+        self._consecutive_failures = 0
+        self._half_open_inflight = 0
+
+    def record_failure(self, error: Exception):
+        self.total_failures += 1
+        self._consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"[:300]
+        if self._state == MEIO_ABERTO or self._consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def release_half_open(self):
+        """Devolve a vaga de teste de uma chamada que não conta como sucesso nem falha."""
+        if self._state == MEIO_ABERTO and self._half_open_inflight > 0:
+            self._half_open_inflight -= 1
+
+    def _open(self):
+        if self._state != ABERTO:
+            self.times_opened += 1
+            print(f"[{self.name}] 🔌 Circuito ABERTO após {self._consecutive_failures} falha(s) "
+                  f"({self.last_error}). Falha rápida por {self.recovery_seconds:.0f}s.")
+        self._state = ABERTO
+        self._opened_at = time.monotonic()
+        self._half_open_inflight = 0
+
+    def reset(self):
+        self._state = FECHADO
+        self._consecutive_failures = 0
+        self._half_open_inflight = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "estado": self.state,
+            "falhas_seguidas": self._consecutive_failures,
+            "limite_falhas": self.failure_threshold,
+            "reabre_em_segundos": round(self.retry_in(), 1),
+            "vezes_aberto": self.times_opened,
+            "falhas_total": self.total_failures,
+            "rejeitadas_total": self.total_rejected,
+            "ultimo_erro": self.last_error,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Um CircuitBreaker por servidor, criado sob demanda."""
+
+    def __init__(self):
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, server: str) -> CircuitBreaker:
+        server_id = server.upper()
+        breaker = self._breakers.get(server_id)
+        if breaker is None:
+            breaker = self._breakers[server_id] = CircuitBreaker(server_id)
+        return breaker
+
+    def snapshot(self) -> dict:
+        return {server_id: breaker.snapshot() for server_id, breaker in self._breakers.items()}
+
+
+# Instância compartilhada do processo
+dialer_breakers = CircuitBreakerRegistry()
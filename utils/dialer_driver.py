@@ -0,0 +1,294 @@
+# utils/dialer_driver.py (Drivers do Discador: API HTTP direta com fallback para a automação de UI)
+
+import json
+import os
+import re
+import httpx
+from dotenv import load_dotenv
+from config.servers import get_server, registered_servers
+from utils.circuit_breaker import CircuitOpenError
+from utils.http_clients import dialer_clients
+from utils.metrics import DRIVER_OPERATIONS_TOTAL, FAILURES_TOTAL, PAGE_GOTO_SECONDS
+from utils.session_cache import session_cache
+
+load_dotenv()
+
+ACTIVE_CALLS_REGEX = r'(\d+)\s+active calls'
+
+OPERATIONS = ("active_calls", "list_campaigns", "campaign_status", "finalize", "restart", "import_mailing")
+
+# Operações que alteram o discador: só passam ao próximo driver se nada chegou à caixa
+# (operação não suportada ou circuito aberto). Repetir por outro caminho poderia duplicar a ação.
+MUTATING_OPERATIONS = frozenset({"finalize", "restart", "import_mailing"})
+
+# --- POLÍTICA (ordem de preferência por operação: o caminho barato primeiro) ---
+# Override parcial via .env, ex.: DIALER_DRIVER_POLICY='{"restart": ["browser"]}'
+DEFAULT_DRIVER_POLICY = {operation: ["http", "browser"] for operation in OPERATIONS}
+
+
+def _load_policy() -> dict[str, list[str]]:
+    policy = {operation: list(order) for operation, order in DEFAULT_DRIVER_POLICY.items()}
+    raw = os.getenv("DIALER_DRIVER_POLICY")
+    if raw:
+        for operation, order in json.loads(raw).items():
+            if operation not in OPERATIONS:
+                raise ValueError(f"DIALER_DRIVER_POLICY: operação desconhecida '{operation}'. Use {OPERATIONS}.")
+            policy[operation] = list(order)
+    return policy
+
+
+# A URL de monitoramento direta (ch.php) é construída dinamicamente
+def get_monitor_url(server: str):
+    # CORREÇÃO DE PROTOCOLO: Usa o mesmo protocolo do LOGIN_URL
+    login_url = get_server(server).login_url
+    return login_url.replace('pages/login.php', 'pages/ch.php')
+
+
+async def _get_session_cookies(server: str) -> dict | None:
+    """
+    Cookies da sessão autenticada: do cache compartilhado ou, na falta dele, do contexto que o pool
+    já tiver aberto (regravado no cache). Nunca lança o navegador nem faz login: sem sessão, retorna
+    None e a política cai para o driver do navegador, que renova o cache.
+    """
+    storage_state = await session_cache.load(server)
+    if not storage_state:
+        # Import tardio: o login_manager traz o Playwright, que a imagem da API não tem
+        from utils.login_manager import browser_pool
+
+        context = browser_pool.existing_context(server)
+        if context is None:
+            return None
+        storage_state = await context.storage_state()
+        await session_cache.save(server, storage_state)
+    return {cookie["name"]: cookie["value"] for cookie in storage_state.get("cookies", [])}
+
+
+async def _fetch_active_calls_http(server: str) -> int | None:
+    """
+    Caminho rápido: busca o ch.php direto via httpx com o cookie da sessão e aplica a regex.
+    Retorna None se a sessão for rejeitada ou o texto não puder ser interpretado.
+    """
+    server_name = server.upper()
+    try:
+        cookies = await _get_session_cookies(server)
+    except Exception as e:
+        print(f"[{server_name}] ⚠️ Sem sessão para o caminho HTTP: {e}")
+        return None
+    if not cookies:
+        return None
+
+    # Cookie enviado no cabeçalho: o cliente keep-alive do servidor é compartilhado com a API
+    cookie_header = "; ".join(f"{name}={value}" for name, value in cookies.items())
+    try:
+        response = await dialer_clients.get(server).get(
+            get_monitor_url(server), headers={"Cookie": cookie_header}, follow_redirects=True, timeout=10.0
+        )
+    except httpx.HTTPError as e:
+        print(f"[{server_name}] ⚠️ Caminho HTTP falhou: {e}")
+        return None
+
+    if "login.php" in str(response.url):
+        print(f"[{server_name}] ⌛ Sessão rejeitada pelo ch.php (redirecionado ao login).")
+        await session_cache.invalidate(server)
+        return None
+
+    if response.status_code != 200:
+        print(f"[{server_name}] ⚠️ ch.php respondeu HTTP {response.status_code}.")
+        return None
+
+    # Remove as tags para a regex enxergar o mesmo texto que o navegador
+    page_text = re.sub(r'<[^>]+>', ' ', response.text)
+    match = re.search(ACTIVE_CALLS_REGEX, page_text)
+    if not match:
+        return None
+    return int(match.group(1))
+
+
+class DriverUnsupported(Exception):
+    """O driver não tem a operação para este servidor: o roteador passa ao próximo sem contar falha."""
+
+
+class DriverError(Exception):
+    """A operação falhou em todos os drivers da política. `last_error` é a mensagem do último."""
+
+    def __init__(self, operation: str, server: str, errors: list[tuple[str, str]]):
+        self.operation = operation
+        self.server = server
+        self.errors = errors
+        self.last_error = errors[-1][1] if errors else "nenhum driver suporta a operação"
+        detail = "; ".join(f"{name}: {error}" for name, error in errors) or self.last_error
+        super().__init__(f"{operation} em {server} falhou ({detail})")
+
+
+class DialerDriver:
+    """
+    Interface das operações de campanha de uma caixa do discador. `supports` lista as operações
+    (de OPERATIONS) que o driver implementa, cada uma como método async `(server, ...)` que levanta
+    uma exceção se a operação falhar.
+    """
+    name = ""
+    supports: frozenset[str] = frozenset()
+
+
+class HttpDialerDriver(DialerDriver):
+    """
+    Endpoints diretos: ch.php com o cookie da sessão e a API PHP (/api/).
+    Finalizar e restart ainda não têm endpoint conhecido: quando tiverem, basta implementar aqui.
+    """
+    name = "http"
+    supports = frozenset({"active_calls", "list_campaigns", "campaign_status", "import_mailing"})
+
+    async def active_calls(self, server: str) -> int:
+        count = await _fetch_active_calls_http(server)
+        if count is None:
+            FAILURES_TOTAL.inc(componente="monitor", motivo="http_sem_resultado")
+            raise RuntimeError("ch.php sem resultado")
+        return count
+
+    async def list_campaigns(self, server: str) -> list[dict]:
+        from utils.mailing_api import api_list_campaigns
+        return await api_list_campaigns(server)
+
+    async def campaign_status(self, server: str, campaign_id: str) -> dict:
+        from utils.mailing_api import api_get_campaign_status
+        return await api_get_campaign_status(server, campaign_id)
+
+    async def import_mailing(self, server: str, campaign_id: str, **kwargs) -> dict:
+        from utils.mailing_api import api_import_mailling_upload
+        return await api_import_mailling_upload(server, campaign_id, **kwargs)
+
+
+class PlaywrightDialerDriver(DialerDriver):
+    """Automação da UI pelo navegador do pool (ch.php aqui; finalizar e restart em scripts/restart_campaign.py)."""
+    name = "browser"
+    supports = frozenset({"active_calls", "finalize", "restart"})
+
+    async def active_calls(self, server: str) -> int:
+        # Import tardio: o login_manager traz o Playwright, que a imagem da API não tem
+        from utils.login_manager import browser_pool, is_login_page
+
+        server_name = server.upper()
+
+        # 1. Pede uma página ao pool (contexto já logado; o navegador não é relançado a cada ciclo)
+        async with browser_pool.page(server) as page:
+            if page is None:
+                raise RuntimeError("Login Falhou")
+
+            try:
+                # --- Etapa 1: Navegação Pós-Login ---
+                monitor_url = get_monitor_url(server)
+
+                # Tolerância alta para o goto (lida com a lentidão e redirecionamento)
+                with PAGE_GOTO_SECONDS.time(server=server_name, pagina="ch.php"):
+                    await page.goto(monitor_url, wait_until='domcontentloaded', timeout=40000)
+
+                # Sessão expirada: o ch.php redireciona para o login. Reloga e tenta de novo.
+                if is_login_page(page):
+                    if not await browser_pool.ensure_session(page, server):
+                        raise RuntimeError("Login Falhou")
+                    await page.goto(monitor_url, wait_until='domcontentloaded', timeout=40000)
+
+                print(f"[{server_name}] Redirecionado com tolerância para: {monitor_url}")
+
+                # --- Etapa 2: Extrair o número de Active Calls ---
+                active_calls_element = page.locator('text=/active calls/').first
+                await active_calls_element.wait_for(state='visible', timeout=20000)
+                full_text = await active_calls_element.inner_text()
+
+                match = re.search(ACTIVE_CALLS_REGEX, full_text)
+                return int(match.group(1)) if match else 0
+
+            except RuntimeError:
+                raise  # Login Falhou: a mensagem já é a final
+            except Exception as e:
+                print(f"[{server_name}] ❌ Erro na extração ou navegação: {e}")
+                FAILURES_TOTAL.inc(componente="monitor", motivo=type(e).__name__)
+                raise RuntimeError(f"Extração Falhou: {e}") from e
+
+    async def finalize(self, server: str) -> bool:
+        from scripts.restart_campaign import finalize_campaign_only
+
+        if not await finalize_campaign_only(server):
+            raise RuntimeError("finalização pela UI falhou")
+        return True
+
+    async def restart(self, server: str) -> bool:
+        from scripts.restart_campaign import restart_campaign
+
+        if not await restart_campaign(server):
+            raise RuntimeError("restart pela UI falhou")
+        return True
+
+
+class FallbackDialerDriver(DialerDriver):
+    """
+    Roteia cada operação pelos drivers na ordem da política, caindo para o próximo quando
+    o driver não suporta a operação ou (só em leituras) quando falha.
+    """
+    name = "fallback"
+    supports = frozenset(OPERATIONS)
+
+    def __init__(self, drivers: list[DialerDriver], policy: dict[str, list[str]] | None = None):
+        self.drivers = {driver.name: driver for driver in drivers}
+        self.policy = policy if policy is not None else _load_policy()
+        for operation, order in self.policy.items():
+            unknown = [name for name in order if name not in self.drivers]
+            if unknown:
+                raise ValueError(f"Política de '{operation}' cita drivers inexistentes: {unknown}")
+
+    def order_for(self, operation: str, server: str) -> list[str]:
+        """Drivers da operação para o servidor. monitor_mode='browser' tira o HTTP das active calls."""
+        order = self.policy.get(operation, [])
+        if operation == "active_calls" and get_server(server).monitor_mode == "browser":
+            order = [name for name in order if name != "http"]
+        return order
+
+    async def run(self, operation: str, server: str, *args, **kwargs) -> tuple:
+        """Executa a operação e retorna (resultado, driver usado). DriverError se nenhum driver conseguir."""
+        server_name = server.upper()
+        errors: list[tuple[str, str]] = []
+        for name in self.order_for(operation, server):
+            driver = self.drivers[name]
+            if operation not in driver.supports:
+                continue
+            try:
+                result = await getattr(driver, operation)(server, *args, **kwargs)
+            except DriverUnsupported:
+                continue
+            except Exception as e:
+                DRIVER_OPERATIONS_TOTAL.inc(operacao=operation, driver=name, resultado="falha")
+                errors.append((name, str(e) or type(e).__name__))
+                if operation in MUTATING_OPERATIONS and not isinstance(e, CircuitOpenError):
+                    break
+                print(f"[{server_name}] ↩️ {operation} via {name} falhou ({errors[-1][1]}). Tentando o próximo driver...")
+                continue
+            DRIVER_OPERATIONS_TOTAL.inc(operacao=operation, driver=name, resultado="ok")
+            return result, name
+        raise DriverError(operation, server_name, errors)
+
+    async def active_calls(self, server: str) -> int:
+        return (await self.run("active_calls", server))[0]
+
+    async def list_campaigns(self, server: str) -> list[dict]:
+        return (await self.run("list_campaigns", server))[0]
+
+    async def campaign_status(self, server: str, campaign_id: str) -> dict:
+        return (await self.run("campaign_status", server, campaign_id))[0]
+
+    async def finalize(self, server: str) -> bool:
+        return (await self.run("finalize", server))[0]
+
+    async def restart(self, server: str) -> bool:
+        return (await self.run("restart", server))[0]
+
+    async def import_mailing(self, server: str, campaign_id: str, **kwargs) -> dict:
+        return (await self.run("import_mailing", server, campaign_id, **kwargs))[0]
+
+    def snapshot(self) -> dict:
+        """Ordem efetiva dos drivers por servidor e operação (para o /api/drivers)."""
+        return {server_id: {operation: self.order_for(operation, server_id) for operation in OPERATIONS}
+                for server_id in registered_servers()}
+
+
+# Instância compartilhada do processo
+dialer_driver = FallbackDialerDriver([HttpDialerDriver(), PlaywrightDialerDriver()])
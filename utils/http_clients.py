@@ -0,0 +1,60 @@
+# utils/http_clients.py (Clientes HTTP compartilhados por servidor do Discador)
+
+import os
+import httpx
+from dotenv import load_dotenv
+from config.servers import get_server, registered_servers
+
+load_dotenv()
+
+# --- PERFIS DE TIMEOUT ---
+# Status/listagem: respostas pequenas, falha rápida na conexão
+TIMEOUT_STATUS = httpx.Timeout(float(os.getenv("HTTP_TIMEOUT_STATUS", "20")), connect=5.0)
+# Upload: o import_mailling.php pode demorar para processar o arquivo
+TIMEOUT_UPLOAD = httpx.Timeout(float(os.getenv("HTTP_TIMEOUT_UPLOAD", "120")), connect=10.0)
+
+# --- LIMITES DE CONEXÃO (por servidor) ---
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+)
+
+
+class DialerHttpClients:
+    """
+    Um httpx.AsyncClient com keep-alive por caixa do discador: o handshake TCP/TLS
+    é pago uma vez e reaproveitado por todas as chamadas seguintes.
+    """
+
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def get(self, server: str) -> httpx.AsyncClient:
+        """Retorna (criando sob demanda) o cliente do servidor."""
+        server_id = server.upper()
+        client = self._clients.get(server_id)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=get_server(server_id).base_url,
+                timeout=TIMEOUT_STATUS,
+                limits=HTTP_LIMITS,
+                verify=False,
+            )
+            self._clients[server_id] = client
+        return client
+
+    async def start(self):
+        """Cria os clientes de todos os servidores registrados (lifespan do FastAPI / startup do scheduler)."""
+        for server_id in registered_servers():
+            self.get(server_id)
+
+    async def aclose(self):
+        """Fecha todas as conexões abertas."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+# Instância compartilhada do processo
+dialer_clients = DialerHttpClients()
@@ -1,16 +1,13 @@
 # utils/login_manager.py (Versão FINAL DE DEPLOY)
 
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from playwright.async_api import Page, BrowserContext, Browser 
-from config.settings import (
-    LOGIN_URL_MG, 
-    LOGIN_URL_SP, 
-    BASE_URL_MG, 
-    BASE_URL_SP,
-    FILA_NOME_MG, 
-    FILA_NOME_SP # <-- HEADLESS_MODE foi removido desta lista
-)
+from playwright.async_api import Page, BrowserContext, Browser, async_playwright
+from config.servers import get_server
+from utils.session_cache import session_cache
+from utils.metrics import BROWSER_LAUNCH_SECONDS, LOGIN_SECONDS, PAGE_GOTO_SECONDS, FAILURES_TOTAL, CACHE_REQUESTS_TOTAL
 
 # Carrega as variáveis de ambiente (Credenciais e Headless)
 load_dotenv()
@@ -23,73 +20,355 @@ SENHA = os.getenv("DISCADOR_PASS")
 HEADLESS_MODE = os.getenv("HEADLESS_MODE", "False").lower() == "true"
 # --------------------------------------------------------
 
+# Marcador que só existe na página autenticada (menu lateral do Discador)
+SELETOR_MARCADOR_AUTENTICADO = 'a[href="#Discador_AutomáticoCollapse"]'
+
 
 # --- Funções Auxiliares (AGORA USAM O PARÂMETRO 'server') ---
 def get_base_url(server: str) -> str:
-    """Retorna a URL base (MG ou SP) baseada no parâmetro 'server'."""
-    if server.upper() == "SP":
-        return BASE_URL_SP
-    return BASE_URL_MG
+    """Retorna a URL base do servidor a partir do registro."""
+    return get_server(server).base_url
 
 def get_login_url(server: str) -> str:
-    """Retorna a URL de login (MG ou SP) baseada no parâmetro 'server'."""
-    if server.upper() == "SP":
-        return LOGIN_URL_SP
-    return LOGIN_URL_MG
+    """Retorna a URL de login do servidor a partir do registro."""
+    return get_server(server).login_url
 
 def get_fila_name(server: str) -> str:
-    """Retorna o nome da Fila de Atendimento (MG ou SP) baseado no parâmetro 'server'."""
-    if server.upper() == "SP":
-        return FILA_NOME_SP
-    return FILA_NOME_MG
+    """Retorna o nome da Fila de Atendimento do servidor a partir do registro."""
+    return get_server(server).fila_nome
 
 def get_server_name(server: str) -> str:
     """Retorna o nome do servidor atual para logging."""
     return server.upper()
 
 
+def is_login_page(page: Page) -> bool:
+    """Indica se a página caiu (ou foi redirecionada) na tela de login, ou seja, sessão expirada."""
+    return "login.php" in page.url
+
+
+async def submit_login(page: Page) -> None:
+    """
+    Preenche e envia o formulário de login na página atual e espera o marcador pós-login.
+    Lança exceção se o login não for confirmado.
+    """
+    await page.fill('input[name="login"]', USUARIO)
+    await page.fill('input[name="password"]', SENHA)
+
+    # Tolerância de 60s para o clique
+    await page.click('button:has-text("ENTRAR")', timeout=60000)
+
+    # Espera Pós-Login
+    await page.wait_for_selector(SELETOR_MARCADOR_AUTENTICADO, state='visible', timeout=15000)
+
+
+async def probe_session(page: Page, server: str) -> bool:
+    """
+    Sonda barata de validade da sessão: abre a página inicial e procura o marcador
+    do menu '#Discador_AutomáticoCollapse'. Não submete o formulário de login.
+    """
+    try:
+        with PAGE_GOTO_SECONDS.time(server=get_server_name(server), pagina="inicio"):
+            await page.goto(get_login_url(server), timeout=60000)
+        await page.wait_for_selector(SELETOR_MARCADOR_AUTENTICADO, state='visible', timeout=5000)
+        return True
+    except Exception:
+        return False
+
+
+async def open_authenticated_context(browser: Browser, server: str) -> tuple[BrowserContext, Page] | tuple[None, None]:
+    """
+    Abre um contexto autenticado no navegador recebido, retornando (context, page) na página inicial.
+    Reaproveita a sessão do cache (storage_state) quando ainda é válida; só refaz o login se estiver velha.
+    """
+    server_name = get_server_name(server)
+
+    # 1. Tenta a sessão em cache (sem round-trip de login)
+    cached_state = await session_cache.load(server)
+    CACHE_REQUESTS_TOTAL.inc(cache="sessao", resultado="hit" if cached_state else "miss")
+    if cached_state:
+        with LOGIN_SECONDS.time(server=server_name, modo="cache", resultado="expirada") as labels:
+            context = await browser.new_context(ignore_https_errors=True, storage_state=cached_state)
+            page = await context.new_page()
+            if await probe_session(page, server):
+                labels["resultado"] = "ok"
+                print(f"[{server_name}] ♻️ Sessão reaproveitada do cache.")
+                return context, page
+        print(f"[{server_name}] ⌛ Sessão em cache expirada. Refazendo login...")
+        await context.close()
+        await session_cache.invalidate(server)
+
+    # 2. Login completo
+    if not USUARIO or not SENHA:
+        print(f"[{server_name}] ❌ Credenciais não configuradas. Configure DISCADOR_USER/PASS no .env ou Railway Secrets.")
+        return None, None
+
+    context = await browser.new_context(ignore_https_errors=True)
+    try:
+        with LOGIN_SECONDS.time(server=server_name, modo="login", resultado="erro") as labels:
+            page = await context.new_page()
+
+            # Tolerância de 60s
+            login_url = get_login_url(server)
+            with PAGE_GOTO_SECONDS.time(server=server_name, pagina="login"):
+                await page.goto(login_url, timeout=60000)
+            print(f"[{server_name}] Navegando para: {login_url}")
+
+            await submit_login(page)
+            labels["resultado"] = "ok"
+        await session_cache.save(server, await context.storage_state())
+
+        print(f"[{server_name}] ✅ Login realizado e página autenticada!")
+        return context, page
+    except Exception as e:
+        print(f"[{server_name}] ❌ Erro durante o processo de login: {e}")
+        FAILURES_TOTAL.inc(componente="login", motivo=type(e).__name__)
+        await context.close()
+        return None, None
+
+
 async def create_context_and_login(playwright_instance, server: str) -> tuple[BrowserContext, Page, Browser] | tuple[None, None, None]:
     """
     Cria o contexto do navegador, realiza o login e retorna (context, page, browser).
     Aplica tolerância de 60 segundos nas ações de rede críticas.
     """
-    login_url = get_login_url(server) 
     server_name = get_server_name(server)
     browser = None 
 
-    if not USUARIO or not SENHA:
-        print(f"[{server_name}] ❌ Credenciais não configuradas. Configure DISCADOR_USER/PASS no .env ou Railway Secrets.")
-        return None, None, None
-
     try:
         # 1. Cria o Navegador (Usando HEADLESS_MODE)
-        browser = await playwright_instance.chromium.launch(headless=HEADLESS_MODE)
-        context = await browser.new_context(ignore_https_errors=True) 
-        page = await context.new_page()
-
-        # 2. Navega para a URL de Login
-        # Tolerância de 60s
-        await page.goto(login_url, timeout=60000) 
-        print(f"[{server_name}] Navegando para: {login_url}")
-
-        # 3. Realiza o Login
-        await page.fill('input[name="login"]', USUARIO) 
-        await page.fill('input[name="password"]', SENHA)
-        
-        # Tolerância de 60s para o clique
-        await page.click('button:has-text("ENTRAR")', timeout=60000) 
-        
-        # 4. Espera Pós-Login
-        await page.wait_for_selector('a[href="#Discador_AutomáticoCollapse"]', state='visible', timeout=15000)
-        
-        print(f"[{server_name}] ✅ Login realizado e página autenticada!")
+        with BROWSER_LAUNCH_SECONDS.time():
+            browser = await playwright_instance.chromium.launch(headless=HEADLESS_MODE)
+
+        # 2. Reaproveita a sessão em cache ou realiza o login
+        context, page = await open_authenticated_context(browser, server)
+        if context is None:
+            await browser.close()
+            return None, None, None
+
         return context, page, browser 
 
     except Exception as e:
         print(f"[{server_name}] ❌ Erro durante o processo de login ou inicialização: {e}")
-        if 'browser' in locals() and browser:
+        if browser:
             await browser.close()
         return None, None, None
 
 
+# --- POOL DE NAVEGADOR PERSISTENTE (Um Chromium por processo, um contexto logado por servidor) ---
+class BrowserPool:
+    """
+    Mantém um Chromium de longa duração e um BrowserContext autenticado por servidor (MG, SP, ...).
+    As páginas são entregues sob demanda via `page(server)`. Navegador morto ou sessão expirada
+    são detectados e reconstruídos de forma transparente.
+    """
+
+    def __init__(self, headless: bool = HEADLESS_MODE, launch_args: list[str] | None = None):
+        self.headless = headless
+        self.launch_args = launch_args or []
+        self._playwright = None
+        self._browser: Browser | None = None
+        self._contexts: dict[str, BrowserContext] = {}
+        self._browser_lock = asyncio.Lock()
+        self._context_locks: dict[str, asyncio.Lock] = {}
+
+    async def start(self):
+        """Aquece o navegador (opcional: o pool também inicia sob demanda)."""
+        await self.get_browser()
+
+    async def close(self):
+        """Fecha todos os contextos, o navegador e o Playwright. Chamado no encerramento do processo."""
+        for context in list(self._contexts.values()):
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def get_browser(self) -> Browser:
+        """Retorna o navegador vivo, relançando-o se tiver caído (os contextos antigos são descartados)."""
+        async with self._browser_lock:
+            if self._browser and self._browser.is_connected():
+                return self._browser
+
+            if self._browser:
+                print("[POOL] ⚠️ Navegador desconectado. Reconstruindo pool...")
+                self._contexts.clear()
+
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            with BROWSER_LAUNCH_SECONDS.time():
+                self._browser = await self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+            print("[POOL] 🟢 Navegador iniciado.")
+            return self._browser
+
+    def existing_context(self, server: str) -> BrowserContext | None:
+        """Contexto já aberto do servidor, se houver. Não lança o navegador nem faz login."""
+        if self._browser is None or not self._browser.is_connected():
+            return None
+        return self._contexts.get(get_server_name(server))
+
+    async def get_context(self, server: str) -> BrowserContext | None:
+        """Retorna o contexto autenticado do servidor, criando e logando se ainda não existir."""
+        server_name = get_server_name(server)
+        browser = await self.get_browser()
+        lock = self._context_locks.setdefault(server_name, asyncio.Lock())
+
+        async with lock:
+            context = self._contexts.get(server_name)
+            if context is not None and browser.is_connected():
+                return context
+
+            context = await self._new_authenticated_context(browser, server)
+            if context is not None:
+                self._contexts[server_name] = context
+            return context
+
+    async def _new_authenticated_context(self, browser: Browser, server: str) -> BrowserContext | None:
+        try:
+            context, page = await open_authenticated_context(browser, server)
+        except Exception as e:
+            print(f"[{get_server_name(server)}] ❌ Erro ao abrir contexto no pool: {e}")
+            return None
+
+        if context is not None:
+            await page.close()
+        return context
+
+    async def invalidate(self, server: str, session_expired: bool = False):
+        """
+        Descarta o contexto do servidor. O próximo uso recria o contexto; se a sessão
+        expirou, o cache em disco/Redis também é limpo e o login é refeito.
+        """
+        if session_expired:
+            await session_cache.invalidate(server)
+        context = self._contexts.pop(get_server_name(server), None)
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _refresh_cached_session(self, page: Page, server: str):
+        """Grava no cache a sessão renovada, para que os outros processos também a reaproveitem."""
+        try:
+            await session_cache.save(server, await page.context.storage_state())
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self, server: str):
+        """
+        Entrega uma página nova dentro do contexto autenticado do servidor e a fecha ao final.
+        Entrega None se não for possível autenticar.
+        """
+        page = None
+        try:
+            context = await self.get_context(server)
+            if context is not None:
+                try:
+                    page = await context.new_page()
+                except Exception:
+                    # Contexto ou navegador morreu entre ciclos: reconstrói uma vez
+                    await self.invalidate(server)
+                    context = await self.get_context(server)
+                    if context is not None:
+                        page = await context.new_page()
+        except Exception as e:
+            print(f"[{get_server_name(server)}] ❌ Pool indisponível: {e}")
+
+        try:
+            yield page
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+    @asynccontextmanager
+    async def isolated_page(self, server: str):
+        """
+        Como `page()`, mas num contexto próprio (fechado ao final) com a sessão do contexto do pool.
+        Para execuções que ligam algo no contexto inteiro, como o tracing do Playwright: o contexto
+        compartilhado receberia as páginas do monitor e recusaria um segundo tracing em paralelo.
+        """
+        context = page = None
+        try:
+            shared = await self.get_context(server)
+            if shared is not None:
+                browser = await self.get_browser()
+                context = await browser.new_context(ignore_https_errors=True,
+                                                    storage_state=await shared.storage_state())
+                page = await context.new_page()
+        except Exception as e:
+            print(f"[{get_server_name(server)}] ❌ Contexto dedicado indisponível: {e}")
+
+        try:
+            yield page
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+
+    async def ensure_session(self, page: Page, server: str) -> bool:
+        """
+        Se a página foi redirecionada para o login (sessão expirada), refaz o login nela mesma.
+        Retorna True se a página estiver autenticada ao final.
+        """
+        if not is_login_page(page):
+            return True
+
+        server_name = get_server_name(server)
+        print(f"[{server_name}] 🔁 Sessão expirada. Refazendo login no contexto do pool...")
+        try:
+            await submit_login(page)
+            await self._refresh_cached_session(page, server)
+            return True
+        except Exception as e:
+            print(f"[{server_name}] ❌ Falha ao renovar sessão: {e}")
+            await self.invalidate(server, session_expired=True)
+            return False
+
+    async def open_home(self, page: Page, server: str) -> bool:
+        """Abre a página inicial autenticada (menu do Discador), relogando se a sessão tiver expirado."""
+        server_name = get_server_name(server)
+        try:
+            with PAGE_GOTO_SECONDS.time(server=server_name, pagina="inicio"):
+                await page.goto(get_login_url(server), timeout=60000)
+        except Exception as e:
+            print(f"[{server_name}] ❌ Falha ao navegar para a página inicial: {e}")
+            return False
+
+        try:
+            await page.wait_for_selector(SELETOR_MARCADOR_AUTENTICADO, state='visible', timeout=5000)
+            return True
+        except Exception:
+            pass
+
+        try:
+            await submit_login(page)
+            await self._refresh_cached_session(page, server)
+            return True
+        except Exception as e:
+            print(f"[{server_name}] ❌ Falha ao abrir a página inicial autenticada: {e}")
+            await self.invalidate(server, session_expired=True)
+            return False
+
 
+# Pool compartilhado pelo processo (scheduler, daily worker e execuções avulsas)
+browser_pool = BrowserPool()
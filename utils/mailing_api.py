@@ -1,5 +1,6 @@
 # utils/mailing_api.py (VERSÃO FINAL COM CORREÇÃO DE PHP NOTICE)
 
+import asyncio
 import httpx
 import pandas as pd
 import os
@@ -7,20 +8,64 @@ import datetime
 import json
 from dotenv import load_dotenv
 import base64
-from io import StringIO
+import binascii
+import io
+import tempfile
 from datetime import datetime as dt  # Alias para evitar conflito com datetime
 import re  # 🚨 NOVO: Para limpeza de PHP Notice
+import random
+import numpy as np
+from config.servers import get_server
+from utils.http_clients import dialer_clients, TIMEOUT_UPLOAD
+from utils.circuit_breaker import dialer_breakers, CircuitOpenError
+from utils.metrics import DIALER_API_SECONDS, UPLOAD_TRANSFORM_SECONDS, UPLOAD_POST_SECONDS, FAILURES_TOTAL
+
+try:  # Parser pyarrow é opcional: sem ele o motor 'auto' usa o parser C do pandas
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
 
 # Carrega variáveis de ambiente (necessário para os.getenv)
 load_dotenv()
 
 # --- CONSTANTES GLOBAIS ---
-BASE_URL_MG = os.getenv("BASE_URL_MG", "http://186.194.50.155")
-BASE_URL_SP = os.getenv("BASE_URL_SP", "https://186.194.50.149")
+# URLs e filas por servidor vêm do registro (config/servers.py, com override via .env)
 API_TOKEN = os.getenv("API_TOKEN")
 SAIDAS_VALOR = os.getenv("SAIDAS_VALOR", "70")
-FILA_NOME_MG = os.getenv("FILA_NOME_MG", "DISCADOR_MG")
-FILA_NOME_SP = os.getenv("FILA_NOME_SP", "DISCADOR_SP")
+
+# --- TRANSFORMAÇÃO EM STREAMING (memória limitada pelo tamanho do bloco, não do arquivo) ---
+TRANSFORM_CHUNK_ROWS = int(os.getenv("TRANSFORM_CHUNK_ROWS", "50000"))    # Linhas por bloco do CSV
+TRANSFORM_BLOCK_BYTES = int(os.getenv("TRANSFORM_BLOCK_BYTES", str(4 * 1024 * 1024)))  # Bloco do pyarrow
+SPOOL_MAX_BYTES = int(os.getenv("TRANSFORM_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))  # Acima disso vai a disco
+
+# --- IMPORT EM LOTES (0 = arquivo inteiro num único POST, comportamento original) ---
+MAILING_UPLOAD_CHUNK_ROWS = int(os.getenv("MAILING_UPLOAD_CHUNK_ROWS", "0"))          # Linhas por lote
+MAILING_UPLOAD_CONCURRENCY = int(os.getenv("MAILING_UPLOAD_CONCURRENCY", "2"))        # Lotes em voo por import
+MAILING_UPLOAD_RETRIES = int(os.getenv("MAILING_UPLOAD_RETRIES", "3"))                # Tentativas por lote
+MAILING_UPLOAD_RETRY_BACKOFF = float(os.getenv("MAILING_UPLOAD_RETRY_BACKOFF", "2"))  # Segundos (dobra a cada falha)
+IMPORT_RETRY_STATUS = {429, 502, 503, 504}  # Lote recusado sem processar (proxy/servidor sobrecarregado)
+
+# --- RESILIÊNCIA DAS CHAMADAS AO DISCADOR (circuit breaker em utils/circuit_breaker.py) ---
+DIALER_RETRY_ATTEMPTS = int(os.getenv("DIALER_RETRY_ATTEMPTS", "3"))                # Tentativas (só idempotentes)
+DIALER_RETRY_BACKOFF = float(os.getenv("DIALER_RETRY_BACKOFF", "0.25"))             # Segundos (dobra a cada falha)
+DIALER_RETRY_MAX_BACKOFF = float(os.getenv("DIALER_RETRY_MAX_BACKOFF", "2"))        # Teto da espera entre tentativas
+
+# Motor de leitura do CSV: "auto" (pyarrow se instalado, senão "c"), "pyarrow", "c" ou "python" (legado)
+MAILING_CSV_ENGINE = os.getenv("MAILING_CSV_ENGINE", "auto").lower()
+
+# Posições das colunas usadas no CSV de origem do cliente
+POS_NUMERO = 29
+POS_NOME = 0
+POS_CPF = 1
+POS_LIVRE1 = 2
+POS_CHAVE = 3
+SOURCE_COLUMNS = [POS_NOME, POS_CPF, POS_LIVRE1, POS_CHAVE, POS_NUMERO]
+
+# Etapa opcional de limpeza dos telefones antes do import (pode ser ligada por upload)
+MAILING_NORMALIZE_PHONES = os.getenv("MAILING_NORMALIZE_PHONES", "False").lower() == "true"
+# Telefone brasileiro sem DDI: DDD (11-99) + celular (9 + 8 dígitos) ou fixo (8 dígitos, 2-8)
+TELEFONE_BR_VALIDO = r"[1-9][1-9](?:9\d{8}|[2-8]\d{7})"
 
 if not API_TOKEN:
     print("ATENÇÃO: API_TOKEN não encontrado. As chamadas API falharão.")
@@ -30,18 +75,13 @@ if not API_TOKEN:
 
 def get_base_url_for_api(server: str) -> str:
     """Retorna a URL base correta: http://IP/api/ (O caminho validado)."""
-    if server.upper() == "SP":
-        base = BASE_URL_SP
-    else:
-        base = BASE_URL_MG
+    base = get_server(server).base_url
     return f"{base.rstrip('/')}/api/"
 
 
 def get_fila_name(server: str) -> str:
     """Retorna o nome da fila correto para a construção do CSV."""
-    if server.upper() == "SP":
-        return FILA_NOME_SP
-    return FILA_NOME_MG
+    return get_server(server).fila_nome
 
 
 def extract_metrics(status_data, server_name):
@@ -80,26 +120,47 @@ def _generate_metadata_line(campaign_id: str, mailling_name: str, server: str, l
     return ";".join(metadata)
 
 
-def _transform_client_data(file_content_base64: str, campaign_id: str, mailling_name: str, server: str,
-                           login_crm: str) -> str:
-    # ... (Lógica de transformação omitida, mantida do original)
-    try:
-        decoded_bytes = base64.b64decode(file_content_base64)
-        decoded_content = decoded_bytes.decode('latin-1')
-    except Exception as e:
-        raise Exception(f"Falha na decodificação do arquivo: {e}")
-
-    POS_NUMERO = 29;
-    POS_NOME = 0;
-    POS_CPF = 1;
-    POS_LIVRE1 = 2;
-    POS_CHAVE = 3
-
-    try:
-        df_source = pd.read_csv(StringIO(decoded_content), sep=';', header=None, engine='python')
-    except Exception as e:
-        raise Exception(f"Falha na leitura do CSV de origem pelo Pandas: {e}")
+class _Base64StreamReader(io.RawIOBase):
+    """
+    Decodifica a string base64 em blocos, sob demanda. Evita manter o arquivo inteiro
+    decodificado em memória (bytes + str + StringIO) ao mesmo tempo.
+    """
 
+    _NAO_BASE64 = re.compile(r"[^A-Za-z0-9+/=]")  # b64decode padrão também descarta esses caracteres
+
+    def __init__(self, encoded: str, block_chars: int = 1 << 20):
+        self._encoded = encoded
+        self._block_chars = block_chars
+        self._pos = 0
+        self._carry = ""
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def _decode_next_block(self):
+        block = self._encoded[self._pos:self._pos + self._block_chars]
+        self._pos += self._block_chars
+        block = self._carry + self._NAO_BASE64.sub("", block)
+
+        if self._pos < len(self._encoded):
+            cut = len(block) - (len(block) % 4)  # base64 decodifica em grupos de 4 caracteres
+            block, self._carry = block[:cut], block[cut:]
+        else:
+            self._carry = ""
+        self._buffer += base64.b64decode(block)
+
+    def readinto(self, target) -> int:
+        while len(self._buffer) < len(target) and self._pos < len(self._encoded):
+            self._decode_next_block()
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _project_chunk(df_source: pd.DataFrame) -> pd.DataFrame:
+    """Projeta as colunas de origem (29/0/1/2/3) no layout de 13 colunas do discador."""
     df_target = pd.DataFrame()
     df_target[0] = df_source[POS_NUMERO].astype(str)
     df_target[1] = ""
@@ -108,14 +169,228 @@ def _transform_client_data(file_content_base64: str, campaign_id: str, mailling_
     df_target[4] = df_source[POS_LIVRE1].fillna('')
     df_target[5] = df_source[POS_CHAVE].fillna('')
     for i in range(6, 13): df_target[i] = ""
+    return df_target
+
+
+class _PhoneCleaner:
+    """
+    Etapa opcional do pipeline: remove pontuação, normaliza números brasileiros (DDD + 8/9 dígitos),
+    descarta inválidos/sem telefone e deduplica pelo telefone (inclusive entre blocos).
+    Tudo com operações vetorizadas de string do pandas, bloco a bloco.
+    """
+
+    def __init__(self):
+        self._seen: set[str] = set()
+        self.descartes = {"sem_telefone": 0, "telefone_invalido": 0, "duplicado": 0}
+
+    def apply(self, df_source: pd.DataFrame) -> pd.DataFrame:
+        digits = df_source[POS_NUMERO].fillna('').astype(str).str.replace(r'\D', '', regex=True)
+
+        # DDI 55 (12/13 dígitos) e prefixo de tronco 0 (11/12 dígitos) são removidos
+        has_ddi = digits.str.startswith('55') & digits.str.len().isin([12, 13])
+        digits = digits.where(~has_ddi, digits.str[2:])
+        has_trunk = digits.str.startswith('0') & digits.str.len().isin([11, 12])
+        digits = digits.where(~has_trunk, digits.str[1:])
+
+        empty = digits.str.len() == 0
+        invalid = ~empty & ~digits.str.fullmatch(TELEFONE_BR_VALIDO).fillna(False).astype(bool)
+        candidates = ~empty & ~invalid
+        duplicated = candidates & (digits.duplicated() | digits.isin(self._seen))
+        keep = candidates & ~duplicated
+
+        self.descartes["sem_telefone"] += int(empty.sum())
+        self.descartes["telefone_invalido"] += int(invalid.sum())
+        self.descartes["duplicado"] += int(duplicated.sum())
+        self._seen.update(digits[keep])
+
+        df_clean = df_source[keep].copy()
+        df_clean[POS_NUMERO] = digits[keep].astype(object)
+        return df_clean
+
+
+def resolve_csv_engine(engine: str | None = None) -> str:
+    """Resolve o motor de leitura efetivo ('pyarrow', 'c' ou 'python')."""
+    engine = (engine or MAILING_CSV_ENGINE).lower()
+    if engine == "auto":
+        return "pyarrow" if pa_csv is not None else "c"
+    if engine == "pyarrow" and pa_csv is None:
+        print("⚠️ MAILING_CSV_ENGINE=pyarrow, mas o pyarrow não está instalado. Usando o parser C.")
+        return "c"
+    return engine
+
+
+def _iter_source_chunks(source_stream, engine: str):
+    """
+    Gera DataFrames de até TRANSFORM_CHUNK_ROWS linhas com as colunas de origem como texto (object),
+    células vazias como NaN e rótulos = posição da coluna no arquivo.
+    - python: parser puro-Python lendo todas as colunas (comportamento legado).
+    - c / pyarrow: lêem apenas SOURCE_COLUMNS, como texto (preserva zeros à esquerda de CPF e telefone).
+    """
+    if engine == "python":
+        source_text = io.TextIOWrapper(source_stream, encoding='latin-1', newline='')
+        yield from pd.read_csv(source_text, sep=';', header=None, engine='python', dtype=object,
+                               chunksize=TRANSFORM_CHUNK_ROWS)
+
+    elif engine == "c":
+        yield from pd.read_csv(source_stream, sep=';', header=None, engine='c', dtype=object, encoding='latin-1',
+                               usecols=SOURCE_COLUMNS, chunksize=TRANSFORM_CHUNK_ROWS)
+
+    elif engine == "pyarrow":
+        names = {f"f{pos}": pos for pos in SOURCE_COLUMNS}
+        reader = pa_csv.open_csv(
+            source_stream,
+            read_options=pa_csv.ReadOptions(autogenerate_column_names=True, encoding='latin1',
+                                            block_size=TRANSFORM_BLOCK_BYTES),
+            parse_options=pa_csv.ParseOptions(delimiter=';', newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=list(names),
+                column_types={name: pa.string() for name in names},
+                strings_can_be_null=True,
+            ),
+        )
+        # Cada RecordBatch (~block_size bytes) vira um bloco
+        for batch in reader:
+            df = batch.to_pandas().rename(columns=names).astype(object)
+            yield df.where(df.notna(), np.nan)  # Nulos do Arrow viram NaN, igual ao pandas
+
+    else:
+        raise ValueError(f"Motor de CSV desconhecido: {engine}")
+
+
+def open_base64_stream(file_content_base64: str):
+    """Stream binário que decodifica o conteúdo base64 sob demanda."""
+    return io.BufferedReader(_Base64StreamReader(file_content_base64))
+
+
+def _transform_client_data(file_content_base64: str, campaign_id: str, mailling_name: str, server: str,
+                           login_crm: str, stats: dict | None = None, normalize_phones: bool | None = None):
+    """
+    Transforma o CSV do cliente (base64) no CSV do discador, em streaming:
+    decodifica o base64 aos poucos e repassa os bytes para `_transform_source_stream`.
+    """
+    return _transform_source_stream(open_base64_stream(file_content_base64), campaign_id, mailling_name, server,
+                                    login_crm, stats, normalize_phones=normalize_phones)
+
+
+class _TargetWriter:
+    """
+    Destino da transformação: SpooledTemporaryFiles que começam com a linha de metadados.
+    Sem `batch_rows`, tudo vai para um único buffer; com `batch_rows`, abre um novo lote
+    (com a própria linha de metadados) a cada `batch_rows` contatos.
+    """
+
+    def __init__(self, metadata_line: str, batch_rows: int | None = None):
+        self.metadata_line = metadata_line
+        self.batch_rows = batch_rows or None
+        self.buffers: list = []
+        self.rows_per_buffer: list[int] = []
+        self._text = None
+        self._open()
+
+    def _open(self):
+        self._detach()
+        target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode='w+b')
+        self.buffers.append(target)
+        self.rows_per_buffer.append(0)
+        self._text = io.TextIOWrapper(target, encoding='latin-1', newline='')
+        self._text.write(self.metadata_line + os.linesep)
+
+    def _detach(self):
+        if self._text is not None:
+            self._text.flush()
+            self._text.detach()  # Libera o buffer binário sem fechá-lo
+            self._text = None
+
+    def write(self, df_target: pd.DataFrame):
+        if self.batch_rows is None:
+            df_target.to_csv(self._text, sep=';', header=False, index=False)
+            self.rows_per_buffer[-1] += len(df_target)
+            return
+
+        start = 0
+        while start < len(df_target):
+            if self.rows_per_buffer[-1] >= self.batch_rows:
+                self._open()
+            take = min(self.batch_rows - self.rows_per_buffer[-1], len(df_target) - start)
+            df_target.iloc[start:start + take].to_csv(self._text, sep=';', header=False, index=False)
+            self.rows_per_buffer[-1] += take
+            start += take
+
+    def finish(self) -> list:
+        self._detach()
+        for buffer in self.buffers:
+            buffer.seek(0)
+        return self.buffers
+
+    def discard(self):
+        self._detach()
+        for buffer in self.buffers:
+            buffer.close()
+
+
+def _transform_source_stream(source_stream, campaign_id: str, mailling_name: str, server: str, login_crm: str,
+                             stats: dict | None = None, engine: str | None = None,
+                             normalize_phones: bool | None = None):
+    """
+    Lê o CSV de origem (stream binário latin-1) em blocos de TRANSFORM_CHUNK_ROWS linhas e escreve
+    cada bloco projetado num SpooledTemporaryFile logo após a linha de metadados.
+    `engine` sobrepõe o MAILING_CSV_ENGINE configurado; `normalize_phones` liga a limpeza de telefones
+    (padrão: MAILING_NORMALIZE_PHONES).
+    Retorna o buffer binário (posicionado no início), pronto para o upload.
+    Se `stats` for informado, recebe as contagens 'linhas_origem' e 'linhas_enviadas' e,
+    com a limpeza ligada, 'descartes' por motivo.
+    """
+    return _transform_source_batches(source_stream, campaign_id, mailling_name, server, login_crm, stats,
+                                     engine=engine, normalize_phones=normalize_phones)[0]
+
+
+def _transform_source_batches(source_stream, campaign_id: str, mailling_name: str, server: str, login_crm: str,
+                              stats: dict | None = None, engine: str | None = None,
+                              normalize_phones: bool | None = None, batch_rows: int | None = None) -> list:
+    """
+    Mesma transformação de `_transform_source_stream`, mas dividida em lotes de `batch_rows` contatos,
+    cada um com a linha de metadados de 15 colunas. Retorna a lista de buffers (ao menos um).
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("linhas_origem", 0)
+    stats.setdefault("linhas_enviadas", 0)
+
+    if normalize_phones is None:
+        normalize_phones = MAILING_NORMALIZE_PHONES
+    cleaner = _PhoneCleaner() if normalize_phones else None
+
+    reader = _iter_source_chunks(source_stream, resolve_csv_engine(engine))
 
     metadata_line = _generate_metadata_line(campaign_id, mailling_name, server, login_crm)
-    temp_target_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_api_upload.csv")
+    writer = _TargetWriter(metadata_line, batch_rows)
+
+    try:
+        for chunk_index, df_source in enumerate(reader):
+            if chunk_index == 0:
+                df_source = df_source.iloc[1:]  # Primeira linha da origem é o cabeçalho
+            stats["linhas_origem"] += len(df_source)
+
+            if cleaner is not None:
+                df_source = cleaner.apply(df_source)
+
+            df_target = _project_chunk(df_source)
+            writer.write(df_target)
+            stats["linhas_enviadas"] += len(df_target)
+    except binascii.Error as e:
+        writer.discard()
+        raise Exception(f"Falha na decodificação do arquivo: {e}")
+    except Exception as e:
+        writer.discard()
+        raise Exception(f"Falha na leitura do CSV de origem pelo Pandas: {e}")
+
+    if cleaner is not None:
+        stats["descartes"] = cleaner.descartes
+        print(f"[{server}] 🧹 Limpeza de telefones: {stats['linhas_enviadas']} mantidas, descartes {cleaner.descartes}")
 
-    with open(temp_target_path, 'w', encoding='latin-1') as f:
-        f.write(metadata_line + "\n")
-    df_target.iloc[1:].to_csv(temp_target_path, mode='a', sep=';', header=False, index=False, encoding='latin-1')
-    return temp_target_path
+    if batch_rows:
+        stats["lotes"] = list(writer.rows_per_buffer)
+    return writer.finish()
 
 
 def _clean_php_output(response_text: str, server: str) -> str:
@@ -135,25 +410,80 @@ def _clean_php_output(response_text: str, server: str) -> str:
     return response_text
 
 
+def _is_dialer_failure(error: Exception) -> bool:
+    """Falhas que indicam caixa fora do ar (contam para o circuito): rede/timeout e HTTP 5xx."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500
+
+
+def _retry_delay(attempt: int) -> float:
+    """Backoff exponencial com jitter completo (evita que todos os clientes repitam juntos)."""
+    return random.uniform(0, min(DIALER_RETRY_MAX_BACKOFF, DIALER_RETRY_BACKOFF * 2 ** (attempt - 1)))
+
+
+async def _dialer_request(server: str, method: str, url: str, idempotent: bool = False, **kwargs) -> httpx.Response:
+    """
+    Chamada HTTP ao discador protegida pelo circuit breaker do servidor.
+    Com o circuito aberto levanta CircuitOpenError na hora, sem esperar o timeout.
+    Chamadas idempotentes repetem falhas de rede/5xx com backoff exponencial + jitter.
+    """
+    breaker = dialer_breakers.get(server)
+    client = dialer_clients.get(server)  # Conexão keep-alive compartilhada
+    attempts = max(1, DIALER_RETRY_ATTEMPTS) if idempotent else 1
+    endpoint = url.rsplit('/', 1)[-1]
+
+    for attempt in range(1, attempts + 1):
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            FAILURES_TOTAL.inc(componente="api_discador", motivo="circuito_aberto")
+            raise
+        try:
+            with DIALER_API_SECONDS.time(server=server.upper(), endpoint=endpoint, resultado="erro") as labels:
+                response = await client.request(method, url, **kwargs)
+                labels["resultado"] = str(response.status_code)
+            response.raise_for_status()
+        except Exception as e:
+            FAILURES_TOTAL.inc(componente="api_discador", motivo=type(e).__name__)
+            if not _is_dialer_failure(e):
+                # 4xx: o servidor respondeu, então está de pé
+                breaker.record_success()
+                raise
+            breaker.record_failure(e)
+            if attempt == attempts:
+                raise
+            delay = _retry_delay(attempt)
+            print(f"[{server}] ⚠️ {method} {endpoint} falhou (tentativa {attempt}/{attempts}): "
+                  f"{type(e).__name__}. Nova tentativa em {delay:.2f}s")
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelada (ex.: shutdown): não é sucesso nem falha
+            breaker.release_half_open()
+            raise
+        else:
+            breaker.record_success()
+            return response
+
+
 # --- API CALL 1: LISTAR CAMPANHAS ---
 async def api_list_campaigns(server: str):
     """Lista todas as campanhas ativas."""
     url = f"{get_base_url_for_api(server)}list_campaign.php"
     data = {'token': API_TOKEN}
-    async with httpx.AsyncClient(timeout=20.0, verify=False) as client:
-        response = await client.post(url, data=data)
-        response.raise_for_status()
+    # Só leitura: pode repetir com backoff
+    response = await _dialer_request(server, "POST", url, idempotent=True, data=data)
 
-        # 🚨 CORREÇÃO DE PHP NOTICE
-        response_text_clean = _clean_php_output(response.text.strip(), server)
+    # 🚨 CORREÇÃO DE PHP NOTICE
+    response_text_clean = _clean_php_output(response.text.strip(), server)
 
-        try:
-            return json.loads(response_text_clean)
-        except json.JSONDecodeError as e:
-            # 🚨 Loga o erro após a tentativa de limpeza
-            print(f"[{server}] ❌ ERRO JSON LIST_CAMPAIGNS (Decodificação Falhou). Resposta limpa:")
-            print(response_text_clean[:200])
-            raise Exception(f"API retornou formato inválido (não é JSON).") from e
+    try:
+        return json.loads(response_text_clean)
+    except json.JSONDecodeError as e:
+        # 🚨 Loga o erro após a tentativa de limpeza
+        print(f"[{server}] ❌ ERRO JSON LIST_CAMPAIGNS (Decodificação Falhou). Resposta limpa:")
+        print(response_text_clean[:200])
+        raise Exception(f"API retornou formato inválido (não é JSON).") from e
 
         # --- API CALL 2: OBTER STATUS DA CAMPANHA ---
 
@@ -162,20 +492,18 @@ async def api_get_campaign_status(server: str, campaign_id: str):
     """Obtém status detalhado de uma campanha (necessário para progresso)."""
     url = f"{get_base_url_for_api(server)}campaign_exec.php"
     params = {'id': campaign_id, 'token': API_TOKEN}
-    async with httpx.AsyncClient(timeout=20.0, verify=False) as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
+    response = await _dialer_request(server, "GET", url, idempotent=True, params=params)
 
-        # 🚨 CORREÇÃO DE PHP NOTICE
-        response_text_clean = _clean_php_output(response.text.strip(), server)
+    # 🚨 CORREÇÃO DE PHP NOTICE
+    response_text_clean = _clean_php_output(response.text.strip(), server)
 
-        try:
-            return json.loads(response_text_clean)
-        except json.JSONDecodeError as e:
-            # 🚨 ESTA LINHA DEVE SER ACIONADA PARA MOSTRAR A RESPOSTA BRUTA
-            print(f"[{server}] ❌ ERRO JSON CAMPAIGN_EXEC. Resposta Bruta Inesperada:")
-            print(response.text[:500])  # Mostra os primeiros 500 caracteres
-            raise Exception(f"API retornou formato inválido (não é JSON).") from e
+    try:
+        return json.loads(response_text_clean)
+    except json.JSONDecodeError as e:
+        # 🚨 ESTA LINHA DEVE SER ACIONADA PARA MOSTRAR A RESPOSTA BRUTA
+        print(f"[{server}] ❌ ERRO JSON CAMPAIGN_EXEC. Resposta Bruta Inesperada:")
+        print(response.text[:500])  # Mostra os primeiros 500 caracteres
+        raise Exception(f"API retornou formato inválido (não é JSON).") from e
 
 
 # ... (restante das funções extract_metrics, get_active_campaign_metrics e api_import_mailling_upload permanecem as mesmas)
@@ -201,52 +529,167 @@ async def get_active_campaign_metrics(server: str) -> dict:
             "id": campaign_id
         }
 
+    except CircuitOpenError as e:
+        # Falha rápida: a caixa já está marcada como fora, sem esperar o timeout
+        print(f"[{server}] ⚡ {e}")
+        return {"nome": "ERRO API", "progresso": "N/A", "saidas": "N/A", "id": None}
+
     except Exception as e:
         print(f"[{server}] ❌ ERRO CRÍTICO NA API (Master Metric):")
         print(f"[{server}] Detalhe: {e}")
         return {"nome": "ERRO API", "progresso": "N/A", "saidas": "N/A", "id": None}
 
 
-async def api_import_mailling_upload(server: str, campaign_id: str, file_content_base64: str, mailling_name: str,
-                                     login_crm: str):
-    """
-    Recebe o conteúdo Base64 do Dash, transforma, e envia o arquivo Multipart para a API.
-    """
-    temp_file_path = None
+async def _post_import_file(server: str, target_buffer, filename: str = 'temp_api_upload.csv') -> dict:
+    """Envia um CSV já transformado (metadados + contatos) ao import_mailling.php e devolve o JSON limpo."""
+    url = f"{get_base_url_for_api(server)}import_mailling.php"
+    files = {'import': (filename, target_buffer, 'text/csv')}
+    data = {'token': API_TOKEN, 'ok': 'ok'}
 
-    try:
-        # 1. TRANSFORMAÇÃO E GERAÇÃO DO ARQUIVO TEMPORÁRIO (USANDO O CONTEÚDO BASE64)
-        temp_file_path = _transform_client_data(file_content_base64, campaign_id, mailling_name, server, login_crm)
+    # Mesmo cliente keep-alive, com o perfil de timeout longo de upload.
+    # Não idempotente: repetir aqui duplicaria contatos (o import em lotes tem a própria nova tentativa)
+    with UPLOAD_POST_SECONDS.time(server=server.upper(), resultado="erro") as labels:
+        response = await _dialer_request(server, "POST", url, idempotent=False,
+                                         data=data, files=files, timeout=TIMEOUT_UPLOAD)
+        labels["resultado"] = "ok"
 
-        # 2. CONFIGURAÇÃO E ENVIO MULTIPART/FORM-DATA
-        url = f"{get_base_url_for_api(server)}import_mailling.php"
+    raw_response_text = response.text
 
-        with open(temp_file_path, 'rb') as f:
-            files = {'import': ('temp_api_upload.csv', f, 'text/csv')}
-            data = {'token': API_TOKEN, 'ok': 'ok'}
+    # 🚨 CORREÇÃO AQUI TAMBÉM: Limpar o output de Notices antes de tentar JSON
+    response_text_clean = _clean_php_output(raw_response_text.strip(), server)
 
-            async with httpx.AsyncClient(timeout=120.0, verify=False) as client:
-                response = await client.post(url, data=data, files=files)
-                response.raise_for_status()
+    try:
+        return json.loads(response_text_clean)
+    except json.JSONDecodeError:
+        raise Exception(f"RESPOSTA BRUTA DO SERVIDOR (Não é JSON): {raw_response_text[:1000]}...")
 
-            raw_response_text = response.text
 
-            # 🚨 CORREÇÃO AQUI TAMBÉM: Limpar o output de Notices antes de tentar JSON
-            response_text_clean = _clean_php_output(raw_response_text.strip(), server)
+def _is_import_retryable(error: Exception) -> bool:
+    """
+    O import_mailling.php não é idempotente: só repete quando o lote com certeza não foi processado
+    (nem chegou a sair: falha/timeout de conexão, pool cheio, circuito aberto) ou quando o servidor
+    o recusou com um status transitório explícito. Timeout de leitura não entra: o discador pode
+    ter importado o lote e só não ter respondido a tempo.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, CircuitOpenError)):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code in IMPORT_RETRY_STATUS
 
+
+async def _post_import_batch(server: str, index: int, total: int, buffer, rows: int,
+                             semaphore: asyncio.Semaphore, retries: int) -> dict:
+    """
+    Envia um lote com concorrência limitada e nova tentativa (backoff exponencial) só deste lote,
+    apenas para falhas em que ele não foi processado (ver _is_import_retryable).
+    Retorna o resumo do lote; não levanta exceção, para os demais lotes seguirem.
+    """
+    result = {"lote": index + 1, "linhas": rows, "tentativas": 0, "success": False}
+    async with semaphore:
+        for attempt in range(1, retries + 1):
+            result["tentativas"] = attempt
             try:
-                return json.loads(response_text_clean)
-            except json.JSONDecodeError:
-                raise Exception(f"RESPOSTA BRUTA DO SERVIDOR (Não é JSON): {raw_response_text[:1000]}...")
+                buffer.seek(0)
+                response = await _post_import_file(server, buffer, f"temp_api_upload_{index + 1:04d}.csv")
+            except Exception as e:
+                result["erro"] = str(e) or type(e).__name__
+                if attempt < retries and _is_import_retryable(e):
+                    print(f"[{server}] ⚠️ Lote {index + 1}/{total} não processado (tentativa {attempt}/{retries}): "
+                          f"{result['erro']}. Nova tentativa...")
+                    await asyncio.sleep(MAILING_UPLOAD_RETRY_BACKOFF * 2 ** (attempt - 1))
+                    continue
+                print(f"[{server}] ❌ Lote {index + 1}/{total} falhou (tentativa {attempt}/{retries}): {result['erro']}")
+                return result
+
+            # O discador respondeu: a resposta é final (repetir poderia duplicar contatos)
+            result["resposta"] = response
+            result["success"] = bool(response.get('success'))
+            if result["success"]:
+                print(f"[{server}] ✅ Lote {index + 1}/{total} importado ({rows} linhas)")
+            else:
+                result["erro"] = f"Discador recusou o lote: {str(response)[:300]}"
+                print(f"[{server}] ❌ Lote {index + 1}/{total} recusado: {result['erro']}")
+            return result
+    return result
+
+
+def _aggregate_batch_results(results: list[dict]) -> dict:
+    """
+    Consolida as respostas dos lotes num único resultado. Cada lote vira uma lista própria no
+    discador: `ids_lista` traz o id de todas as importadas, na ordem dos lotes.
+    """
+    failed = [r["lote"] for r in results if not r["success"]]
+    return {
+        "success": not failed,
+        "ids_lista": [r["resposta"].get("id_lista") for r in results if r["success"]],
+        "lotes_total": len(results),
+        "lotes_com_falha": failed,
+        "linhas_importadas": sum(r["linhas"] for r in results if r["success"]),
+        "lotes": results,
+    }
+
+
+async def api_import_mailling_upload(server: str, campaign_id: str, file_content_base64: str | None = None,
+                                     mailling_name: str = "MAILING", login_crm: str = "AUTOMACAO",
+                                     source_stream=None, source_csv_path: str | None = None,
+                                     stats: dict | None = None, normalize_phones: bool | None = None,
+                                     chunk_rows: int | None = None):
+    """
+    Recebe o mailing do Dash, transforma, e envia o arquivo Multipart para a API.
+    A origem pode ser o conteúdo Base64 (rota JSON), um stream binário (upload multipart)
+    ou um caminho local (daily worker). `stats` recebe as contagens de linhas da transformação;
+    `normalize_phones` liga a limpeza/deduplicação de telefones.
+    Com `chunk_rows` (padrão: MAILING_UPLOAD_CHUNK_ROWS) o import é feito em lotes paralelos
+    e o retorno é o resultado consolidado dos lotes.
+    """
+    if chunk_rows is None:
+        chunk_rows = MAILING_UPLOAD_CHUNK_ROWS
+    if stats is None:
+        stats = {}
+    options = {"stats": stats, "normalize_phones": normalize_phones, "batch_rows": chunk_rows or None}
+
+    def _build_target_buffers():
+        if source_stream is not None:
+            return _transform_source_batches(source_stream, campaign_id, mailling_name, server, login_crm, **options)
+        if source_csv_path is not None:
+            with open(source_csv_path, 'rb') as source_file:
+                return _transform_source_batches(source_file, campaign_id, mailling_name, server, login_crm,
+                                                 **options)
+        if file_content_base64:
+            return _transform_source_batches(open_base64_stream(file_content_base64), campaign_id, mailling_name,
+                                             server, login_crm, **options)
+        raise Exception("Nenhum conteúdo de mailing recebido.")
 
+    try:
+        # 1. TRANSFORMAÇÃO EM STREAMING PARA BUFFERS TEMPORÁRIOS
+        # Roda numa thread: o pandas é CPU-bound e não pode travar o event loop do gateway
+        with UPLOAD_TRANSFORM_SECONDS.time(server=server.upper()):
+            target_buffers = await asyncio.to_thread(_build_target_buffers)
 
+        # 2. CONFIGURAÇÃO E ENVIO MULTIPART/FORM-DATA
+        if not chunk_rows:
+            with target_buffers[0] as f:
+                return await _post_import_file(server, f)
+
+        # 2b. IMPORT EM LOTES: concorrência limitada, falha de um lote não derruba os outros
+        rows_per_batch = stats["lotes"]
+        print(f"[{server}] 📦 Import em {len(target_buffers)} lote(s) de até {chunk_rows} linhas")
+        semaphore = asyncio.Semaphore(max(1, MAILING_UPLOAD_CONCURRENCY))
+        try:
+            results = await asyncio.gather(*(
+                _post_import_batch(server, i, len(target_buffers), buffer, rows, semaphore,
+                                   max(1, MAILING_UPLOAD_RETRIES))
+                for i, (buffer, rows) in enumerate(zip(target_buffers, rows_per_batch))
+            ))
+        finally:
+            for buffer in target_buffers:
+                buffer.close()
+        return _aggregate_batch_results(results)
+
+    except CircuitOpenError:
+        raise  # Nada foi enviado: o driver pode cair para o próximo caminho
     except Exception as e:
         raise Exception(f"ERRO CRÍTICO NA REQUISIÇÃO HTTP: {e}")
 
-    finally:
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-
 # API Call 3. Recebe a Base64, chama _transform_client_data para obter o arquivo temporário,
 # e usa o httpx para enviar o Upload Multipart para o endpoint import_mailling.php.
 
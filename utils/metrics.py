@@ -0,0 +1,248 @@
+# utils/metrics.py (Métricas no formato texto do Prometheus: contadores, gauges e histogramas)
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+# Porta do exportador /metrics de cada processo sem FastAPI (o gateway serve /metrics na própria porta).
+# Padrões distintos: os dois podem dividir o mesmo host/namespace de rede. 0 = desligado
+METRICS_PORT_MONITOR = int(os.getenv("METRICS_PORT_MONITOR", "9100"))  # main.py
+METRICS_PORT_CUSTOS = int(os.getenv("METRICS_PORT_CUSTOS", "9101"))    # cost_scheduler.py
+
+# Buckets (segundos): de chamadas HTTP rápidas até logins e uploads lentos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # O transform do upload observa a partir de threads
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recebidos {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _ScalarMetric(_Metric):
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Counter(_ScalarMetric):
+    """Valor que só cresce (ex.: restarts, falhas por motivo)."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ScalarMetric):
+    """Valor instantâneo (ex.: active calls por servidor)."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Distribuição de latências em buckets cumulativos, com _sum e _count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # chave -> [contagens por bucket, soma, total]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Mede o bloco (síncrono ou com await dentro) em segundos, inclusive quando ele levanta exceção.
+        Entrega o dict de labels: o bloco pode ajustar o resultado (ex.: labels["resultado"] = "ok").
+        """
+        start = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo, renderizado no formato texto do Prometheus."""
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Instância compartilhada do processo
+metrics = MetricsRegistry()
+
+# --- LATÊNCIAS ---
+BROWSER_LAUNCH_SECONDS = metrics.histogram(
+    "discador_browser_launch_seconds", "Tempo para lançar o Chromium.")
+LOGIN_SECONDS = metrics.histogram(
+    "discador_login_seconds", "Tempo para obter um contexto autenticado (cache ou login completo).",
+    ("server", "modo", "resultado"))
+PAGE_GOTO_SECONDS = metrics.histogram(
+    "discador_page_goto_seconds", "Duração do page.goto do Playwright.", ("server", "pagina"))
+DIALER_API_SECONDS = metrics.histogram(
+    "discador_api_request_seconds", "Latência das chamadas HTTP à API do discador.",
+    ("server", "endpoint", "resultado"))
+UPLOAD_TRANSFORM_SECONDS = metrics.histogram(
+    "discador_upload_transform_seconds", "Tempo da transformação do CSV do mailing.", ("server",))
+UPLOAD_POST_SECONDS = metrics.histogram(
+    "discador_upload_post_seconds", "Tempo do POST ao import_mailling.php.", ("server", "resultado"))
+REDIS_SECONDS = metrics.histogram(
+    "discador_redis_operation_seconds", "Latência das operações Redis.", ("operacao", "resultado"))
+AUTOMATION_STEP_SECONDS = metrics.histogram(
+    "discador_automation_step_seconds", "Duração de cada etapa das automações Playwright.",
+    ("automacao", "etapa", "resultado"))
+
+# --- CONTADORES E GAUGES ---
+RESTARTS_TOTAL = metrics.counter(
+    "discador_restarts_total", "Rotinas de restart de campanha executadas.", ("server", "resultado"))
+RESTARTS_SKIPPED_TOTAL = metrics.counter(
+    "discador_restarts_skipped_total", "Restarts não disparados (rampa, cooldown ou lock de outro processo).",
+    ("server", "motivo"))
+FAILURES_TOTAL = metrics.counter(
+    "discador_failures_total", "Falhas por componente e motivo.", ("componente", "motivo"))
+CACHE_REQUESTS_TOTAL = metrics.counter(
+    "discador_cache_requests_total", "Consultas a caches em memória por resultado.", ("cache", "resultado"))
+DRIVER_OPERATIONS_TOTAL = metrics.counter(
+    "discador_driver_operations_total", "Operações do discador por driver (http/browser) e resultado.",
+    ("operacao", "driver", "resultado"))
+ACTIVE_CALLS = metrics.gauge(
+    "discador_active_calls", "Última leitura de active calls por servidor.", ("server",))
+
+
+async def _handle_metrics_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass  # Descarta os cabeçalhos
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, content_type, body = "200 OK", CONTENT_TYPE, metrics.render().encode()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", b"Use /metrics\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int) -> asyncio.AbstractServer | None:
+    """Exportador /metrics mínimo (sem dependências) para processos que não rodam o FastAPI."""
+    if not port:
+        return None
+    try:
+        server = await asyncio.start_server(_handle_metrics_request, host="0.0.0.0", port=port)
+    except OSError as e:
+        print(f"[METRICS] ⚠️ Exportador /metrics não iniciado na porta {port}: {e}")
+        return None
+    print(f"[METRICS] 📈 Exportador /metrics ouvindo na porta {port}.")
+    return server
@@ -0,0 +1,137 @@
+# utils/monitor_cadence.py (Cadência adaptativa do monitoramento por servidor do Discador)
+
+import os
+import re
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+CADENCE_MIN_SECONDS = float(os.getenv("CADENCE_MIN_SECONDS", "5"))            # Intervalo mais curto (perto do zero)
+CADENCE_MAX_SECONDS = float(os.getenv("CADENCE_MAX_SECONDS", "60"))           # Intervalo mais longo (estável e alto)
+CADENCE_DEFAULT_SECONDS = float(os.getenv("CADENCE_DEFAULT_SECONDS", "15"))   # Sem histórico / após restart
+CADENCE_HIGH_CALLS = int(os.getenv("CADENCE_HIGH_CALLS", "20"))               # Chamadas a partir das quais é "alto"
+CADENCE_LEAD_FRACTION = float(os.getenv("CADENCE_LEAD_FRACTION", "0.25"))     # Fração do tempo previsto até zerar
+CADENCE_LOW_REMAINING_PCT = float(os.getenv("CADENCE_LOW_REMAINING_PCT", "5"))  # % restante que já é "acabando"
+CADENCE_HISTORY = int(os.getenv("CADENCE_HISTORY", "6"))                      # Amostras usadas na tendência
+
+
+def parse_progresso(progresso) -> float | None:
+    """Converte o 'progresso' do campaign_exec.php ('42%', '42.5', 'N/A') em número ou None."""
+    match = re.search(r"\d+(?:[.,]\d+)?", str(progresso or ""))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+
+def _slope(samples) -> float | None:
+    """Inclinação (unidades por segundo) da regressão linear das amostras (instante, valor)."""
+    if len(samples) < 2:
+        return None
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var_t = sum((t - mean_t) ** 2 for t, _ in samples)
+    if var_t == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var_t
+
+
+def _time_to_zero(samples) -> float | None:
+    """Segundos previstos até a série chegar a zero, se ela estiver caindo."""
+    slope = _slope(samples)
+    if slope is None or slope >= 0:
+        return None
+    return samples[-1][1] / -slope
+
+
+class ServerCadence:
+    """
+    Intervalo até a próxima checagem de um servidor, ajustado a cada resultado do monitor:
+    - chamadas altas e estáveis: espaça até `max_seconds`;
+    - chamadas ou restante da campanha (100 - progresso) caindo: aperta em proporção ao tempo previsto até zerar;
+    - chamadas zeradas ou campanha quase no fim: `min_seconds`;
+    - falhas seguidas do monitor: backoff exponencial a partir do intervalo padrão.
+    """
+
+    def __init__(self, name: str, min_seconds: float = CADENCE_MIN_SECONDS,
+                 max_seconds: float = CADENCE_MAX_SECONDS, default_seconds: float = CADENCE_DEFAULT_SECONDS,
+                 history: int = CADENCE_HISTORY):
+        self.name = name
+        self.min_seconds = max(1.0, min_seconds)
+        self.max_seconds = max(self.min_seconds, max_seconds)
+        self.default_seconds = min(max(default_seconds, self.min_seconds), self.max_seconds)
+        self._calls = deque(maxlen=max(2, history))
+        self._remaining = deque(maxlen=max(2, history))
+        self.consecutive_failures = 0
+        self.interval = self.default_seconds
+        self.reason = "inicial"
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self.max_seconds, max(self.min_seconds, seconds))
+
+    def _schedule(self, interval: float, reason: str) -> float:
+        self.interval = interval
+        self.reason = reason
+        return interval
+
+    def record_failure(self) -> float:
+        """Monitor falhou: não há leitura confiável, então espaça para não martelar a caixa."""
+        self.consecutive_failures += 1
+        interval = min(self.max_seconds, self.default_seconds * 2 ** (self.consecutive_failures - 1))
+        return self._schedule(interval, f"backoff após {self.consecutive_failures} falha(s)")
+
+    def record(self, active_calls: int, progresso=None, now: float | None = None) -> float:
+        """Registra uma leitura válida e retorna o intervalo até a próxima checagem."""
+        now = now if now is not None else time.monotonic()
+        self.consecutive_failures = 0
+        self._calls.append((now, float(active_calls)))
+        progress_pct = parse_progresso(progresso)
+        if progress_pct is not None:
+            self._remaining.append((now, max(0.0, 100.0 - progress_pct)))
+
+        if active_calls <= 0:
+            return self._schedule(self.min_seconds, "chamadas zeradas")
+        if self._remaining and self._remaining[-1][1] <= CADENCE_LOW_REMAINING_PCT:
+            return self._schedule(self.min_seconds, "campanha no fim")
+
+        # Nível: poucas chamadas já pedem atenção, muitas permitem espaçar
+        level = min(1.0, active_calls / max(1, CADENCE_HIGH_CALLS))
+        interval = self.min_seconds + (self.max_seconds - self.min_seconds) * level
+        reason = "nível de chamadas"
+
+        # Tendência: checa algumas vezes antes do zero previsto
+        for label, samples in (("chamadas caindo", self._calls), ("mailing acabando", self._remaining)):
+            eta = _time_to_zero(samples)
+            if eta is not None and eta * CADENCE_LEAD_FRACTION < interval:
+                interval = eta * CADENCE_LEAD_FRACTION
+                reason = f"{label} (zero em ~{eta:.0f}s)"
+
+        return self._schedule(self._clamp(interval), reason)
+
+    def reset(self) -> float:
+        """Após um restart o histórico não vale mais: volta ao intervalo padrão."""
+        self._calls.clear()
+        self._remaining.clear()
+        self.consecutive_failures = 0
+        return self._schedule(self.default_seconds, "após restart")
+
+
+class MonitorCadenceRegistry:
+    """Uma ServerCadence por servidor, criada sob demanda."""
+
+    def __init__(self):
+        self._cadences: dict[str, ServerCadence] = {}
+
+    def get(self, server: str) -> ServerCadence:
+        server_id = server.upper()
+        cadence = self._cadences.get(server_id)
+        if cadence is None:
+            cadence = self._cadences[server_id] = ServerCadence(server_id)
+        return cadence
+
+
+# Instância compartilhada do processo
+monitor_cadence = MonitorCadenceRegistry()
@@ -0,0 +1,277 @@
+# utils/restart_guard.py (Máquina de estados do restart por servidor + lock distribuído no Redis)
+
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from utils.redis_client import AsyncRedisStore, redis_store
+from utils.metrics import RESTARTS_SKIPPED_TOTAL
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+RESTART_COOLDOWN_SECONDS = float(os.getenv("RESTART_COOLDOWN_SECONDS", "180"))          # Entre inícios de restart
+RESTART_MAX_COOLDOWN_SECONDS = float(os.getenv("RESTART_MAX_COOLDOWN_SECONDS", "1800"))  # Teto após falhas seguidas
+RESTART_VERIFY_SECONDS = float(os.getenv("RESTART_VERIFY_SECONDS", "120"))              # Janela da rampa pós-restart
+RESTART_LOCK_LEASE_SECONDS = float(os.getenv("RESTART_LOCK_LEASE_SECONDS", "120"))      # Renovado enquanto roda
+RESTART_LOCK_WAIT_SECONDS = float(os.getenv("RESTART_LOCK_WAIT_SECONDS", "900"))        # Espera máx. do import
+RESTART_LOCK_POLL_SECONDS = float(os.getenv("RESTART_LOCK_POLL_SECONDS", "5"))
+# Redis fora do ar: segue só com a proteção local (True) ou não reinicia (False)
+RESTART_LOCK_FAIL_OPEN = os.getenv("RESTART_LOCK_FAIL_OPEN", "True").lower() == "true"
+RESTART_LOCK_PREFIX = "restart_lock:"
+RESTART_COOLDOWN_PREFIX = "restart_cooldown:"
+
+# Só mexe na chave se o token ainda for o nosso (o lease pode ter expirado e outro processo assumido)
+_RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+_RENEW_SCRIPT = ("if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) "
+                 "else return 0 end")
+
+
+class ServerRestartState:
+    """
+    Ciclo de vida do restart de um servidor:
+      ocioso -> reiniciando -> aquecendo -> saudavel | falhou
+    - aquecendo: o discador está subindo os canais; leituras zeradas não disparam outro restart
+      até `verify_seconds`. Chamadas > 0 nessa janela = saudavel; janela vencida ainda zerada = falhou.
+    - cooldown entre inícios de restart, dobrando a cada falha seguida (até `max_cooldown_seconds`).
+    """
+
+    def __init__(self, name: str, cooldown_seconds: float = RESTART_COOLDOWN_SECONDS,
+                 verify_seconds: float = RESTART_VERIFY_SECONDS,
+                 max_cooldown_seconds: float = RESTART_MAX_COOLDOWN_SECONDS):
+        self.name = name
+        self.cooldown_seconds = cooldown_seconds
+        self.verify_seconds = verify_seconds
+        self.max_cooldown_seconds = max(cooldown_seconds, max_cooldown_seconds)
+        self.state = "ocioso"
+        self.since = time.monotonic()
+        self.last_started_at: float | None = None
+        self.consecutive_failures = 0
+
+    def _transition(self, state: str, now: float, detail: str = ""):
+        if state != self.state:
+            print(f"[{self.name}] 🔄 Restart: {self.state} -> {state}" + (f" ({detail})" if detail else ""))
+        self.state = state
+        self.since = now
+
+    def cooldown(self) -> float:
+        return min(self.max_cooldown_seconds, self.cooldown_seconds * 2 ** self.consecutive_failures)
+
+    def observe(self, active_calls: int, now: float | None = None):
+        """Registra uma leitura válida do monitor (fecha a janela de verificação quando possível)."""
+        now = now if now is not None else time.monotonic()
+        if self.state == "aquecendo":
+            if active_calls > 0:
+                self.consecutive_failures = 0
+                self._transition("saudavel", now, f"{active_calls} chamadas após o restart")
+            elif now - self.since >= self.verify_seconds:
+                self.consecutive_failures += 1
+                self._transition("falhou", now, f"sem chamadas {self.verify_seconds:.0f}s após o restart")
+        elif self.state == "falhou" and active_calls > 0:
+            self.consecutive_failures = 0
+            self._transition("saudavel", now, "chamadas voltaram")
+
+    def can_start(self, now: float | None = None) -> tuple[bool, str]:
+        """(pode reiniciar agora?, motivo quando não pode)."""
+        now = now if now is not None else time.monotonic()
+        if self.state == "reiniciando":
+            return False, "restart em andamento"
+        if self.state == "aquecendo":
+            remaining = self.verify_seconds - (now - self.since)
+            if remaining > 0:
+                return False, f"aguardando a rampa do discador ({remaining:.0f}s restantes)"
+            self.observe(0, now)
+        if self.last_started_at is not None:
+            remaining = self.cooldown() - (now - self.last_started_at)
+            if remaining > 0:
+                return False, f"cooldown ({remaining:.0f}s restantes, {self.consecutive_failures} falha(s) seguida(s))"
+        return True, ""
+
+    def begin(self, now: float | None = None):
+        now = now if now is not None else time.monotonic()
+        self.last_started_at = now
+        self._transition("reiniciando", now)
+
+    def finish(self, success: bool, now: float | None = None):
+        now = now if now is not None else time.monotonic()
+        if success:
+            self._transition("aquecendo", now)
+        else:
+            self.consecutive_failures += 1
+            self._transition("falhou", now, "rotina de restart falhou")
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "estado": self.state,
+            "ha_segundos": round(now - self.since, 1),
+            "ultimo_inicio_ha_segundos": round(now - self.last_started_at, 1) if self.last_started_at else None,
+            "cooldown_segundos": self.cooldown(),
+            "falhas_seguidas": self.consecutive_failures,
+        }
+
+
+class RestartLock:
+    """
+    Lock por servidor no Redis (SET NX com lease), tomado pelas ações que não podem se sobrepor
+    na caixa (restart, finalizar + importar o mailing). O lease é renovado em segundo plano enquanto
+    a ação roda; se o processo morrer, a chave expira sozinha e o servidor não fica travado.
+    """
+
+    def __init__(self, server: str, store: AsyncRedisStore = redis_store,
+                 lease_seconds: float = RESTART_LOCK_LEASE_SECONDS):
+        self.key = RESTART_LOCK_PREFIX + server.upper()
+        self.store = store
+        self.lease_ms = int(lease_seconds * 1000)
+        self.token = uuid.uuid4().hex
+        self._renewer: asyncio.Task | None = None
+
+    async def acquire(self) -> bool:
+        await self.store.connect()
+        acquired = bool(await self.store.client.set(self.key, self.token, nx=True, px=self.lease_ms))
+        if acquired:
+            self._renewer = asyncio.create_task(self._renew())
+        return acquired
+
+    async def _renew(self):
+        while True:
+            await asyncio.sleep(self.lease_ms / 3000)
+            try:
+                if not await self.store.client.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.lease_ms):
+                    print(f"⚠️ Lease de {self.key} perdido: outro processo pode reiniciar em paralelo.")
+                    return
+            except (RedisError, OSError) as e:
+                print(f"⚠️ Falha ao renovar {self.key}: {e}")
+
+    async def release(self):
+        if self._renewer is not None:
+            self._renewer.cancel()
+            self._renewer = None
+        try:
+            await self.store.client.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+        except (RedisError, OSError) as e:
+            print(f"⚠️ Falha ao liberar {self.key} (expira em {self.lease_ms / 1000:.0f}s): {e}")
+
+
+class RestartGuard:
+    """
+    Porta única para disparar restarts: aplica a máquina de estados do processo, o lock
+    distribuído e o cooldown compartilhado (chave no Redis vista por todas as réplicas e
+    execuções avulsas). `exclusive` dá o mesmo lock às outras ações que mexem na caixa.
+    """
+
+    def __init__(self, store: AsyncRedisStore = redis_store):
+        self.store = store
+        self._states: dict[str, ServerRestartState] = {}
+        # Exclusão dentro do processo: vale mesmo com o Redis fora (RESTART_LOCK_FAIL_OPEN)
+        self._local_locks: dict[str, asyncio.Lock] = {}
+
+    def get(self, server: str) -> ServerRestartState:
+        server_id = server.upper()
+        state = self._states.get(server_id)
+        if state is None:
+            state = self._states[server_id] = ServerRestartState(server_id)
+        return state
+
+    def observe(self, server: str, active_calls: int):
+        self.get(server).observe(active_calls)
+
+    def _local_lock(self, server: str) -> asyncio.Lock:
+        return self._local_locks.setdefault(server.upper(), asyncio.Lock())
+
+    @asynccontextmanager
+    async def exclusive(self, server: str, wait_seconds: float = RESTART_LOCK_WAIT_SECONDS):
+        """
+        Segura o lock do servidor para uma ação que não pode se sobrepor a um restart (ex.: finalizar
+        e importar o mailing diário). Espera a ação em andamento terminar, até `wait_seconds`
+        (TimeoutError depois disso). Restarts disparados enquanto isso são barrados pelo lock.
+        Não mexe no estado nem no cooldown do restart.
+        """
+        async with self._local_lock(server):
+            lock = RestartLock(server, self.store)
+            deadline = time.monotonic() + wait_seconds
+            while True:
+                try:
+                    if await lock.acquire():
+                        break
+                except (RedisError, OSError) as e:
+                    if not RESTART_LOCK_FAIL_OPEN:
+                        raise
+                    print(f"[{server.upper()}] ⚠️ Redis indisponível para o lock ({e}). Seguindo só com a proteção local.")
+                    lock = None
+                    break
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"lock de {server.upper()} ocupado por mais de {wait_seconds:.0f}s")
+                await asyncio.sleep(RESTART_LOCK_POLL_SECONDS)
+            try:
+                yield
+            finally:
+                if lock is not None:
+                    await lock.release()
+
+    def _skip(self, server: str, reason: str, motivo: str) -> None:
+        print(f"[{server.upper()}] ⏸️ Restart não disparado: {reason}")
+        RESTARTS_SKIPPED_TOTAL.inc(server=server.upper(), motivo=motivo)
+
+    async def run(self, server: str, action, force: bool = False) -> bool | None:
+        """
+        Executa `action()` (corrotina que retorna sucesso) se nenhuma proteção impedir.
+        Retorna None quando o restart não foi disparado. `force` ignora estado e cooldown, nunca o lock.
+        """
+        state = self.get(server)
+        if not force:
+            allowed, reason = state.can_start()
+            if not allowed:
+                return self._skip(server, reason, "estado")
+
+        local = self._local_lock(server)
+        if local.locked():
+            return self._skip(server, "outra ação em andamento no servidor (import ou restart)", "lock")
+        async with local:
+            return await self._run_locked(server, state, action, force)
+
+    async def _run_locked(self, server: str, state: ServerRestartState, action, force: bool) -> bool | None:
+        lock = RestartLock(server, self.store)
+        try:
+            acquired = await lock.acquire()
+        except (RedisError, OSError) as e:
+            if not RESTART_LOCK_FAIL_OPEN:
+                return self._skip(server, f"Redis indisponível para o lock ({e})", "redis_indisponivel")
+            print(f"[{server.upper()}] ⚠️ Redis indisponível para o lock ({e}). Seguindo só com a proteção local.")
+            lock = None
+        else:
+            if not acquired:
+                return self._skip(server, "outra ação em andamento no servidor em outro processo", "lock")
+
+        try:
+            if lock is not None:
+                cooldown_key = RESTART_COOLDOWN_PREFIX + server.upper()
+                try:
+                    # Cooldown compartilhado: outra réplica (ou execução avulsa) pode ter reiniciado há pouco
+                    if not force and await self.store.client.exists(cooldown_key):
+                        return self._skip(server, "reiniciado recentemente por outro processo",
+                                          "cooldown_compartilhado")
+                    await self.store.client.set(cooldown_key, str(time.time()), px=int(state.cooldown() * 1000))
+                except (RedisError, OSError) as e:
+                    print(f"[{server.upper()}] ⚠️ Cooldown compartilhado indisponível ({e}). Seguindo.")
+
+            state.begin()
+            success = False
+            try:
+                success = bool(await action())
+            finally:
+                state.finish(success)
+            return success
+        finally:
+            if lock is not None:
+                await lock.release()
+
+    def snapshot(self) -> dict:
+        return {server_id: state.snapshot() for server_id, state in self._states.items()}
+
+
+# Instância compartilhada do processo
+restart_guard = RestartGuard()
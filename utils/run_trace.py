@@ -0,0 +1,173 @@
+# utils/run_trace.py (Traces por execução das automações Playwright: um span por etapa)
+
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from utils.redis_client import AsyncRedisStore, redis_store
+from utils.metrics import AUTOMATION_STEP_SECONDS
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", "50"))        # Últimas execuções guardadas por automação
+TRACE_KEY_PREFIX = "traces_automacao:"
+# Grava o trace do Playwright (.zip com snapshots) quando a execução falha. Abrir com `playwright show-trace`
+TRACE_PLAYWRIGHT_ON_FAILURE = os.getenv("TRACE_PLAYWRIGHT_ON_FAILURE", "False").lower() == "true"
+TRACE_PLAYWRIGHT_DIR = os.getenv(
+    "TRACE_PLAYWRIGHT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "traces")
+)
+TRACE_PLAYWRIGHT_KEEP = int(os.getenv("TRACE_PLAYWRIGHT_KEEP", "10"))  # Zips mantidos em disco
+
+
+class RunTrace:
+    """
+    Trace de uma execução (ex.: um restart): cada etapa nomeada vira um span com início
+    (relativo ao começo da execução), duração e resultado. `finish()` persiste o trace.
+    """
+
+    def __init__(self, automation: str, server: str, store: "TraceStore | None" = None):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.automation = automation
+        self.server = server.upper()
+        self.store = store or trace_store
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self.spans: list[dict] = []
+        self._context = None  # BrowserContext com tracing do Playwright ligado
+
+    @contextmanager
+    def step(self, name: str):
+        """
+        Mede uma etapa. Exceção marca o span como 'erro' (e é propagada); o bloco pode
+        definir outro resultado (ex.: span["resultado"] = "nao_encontrado").
+        """
+        span = {"etapa": name, "inicio_ms": round((time.perf_counter() - self._t0) * 1000), "resultado": "ok"}
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["resultado"] = "erro"
+            span["erro"] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            span["duracao_ms"] = round(duration * 1000)
+            self.spans.append(span)
+            AUTOMATION_STEP_SECONDS.observe(duration, automacao=self.automation, etapa=name,
+                                            resultado=span["resultado"])
+
+    async def attach_playwright(self, context):
+        """
+        Liga o tracing do Playwright no contexto (só se TRACE_PLAYWRIGHT_ON_FAILURE). O contexto deve
+        ser exclusivo da execução (BrowserPool.isolated_page): o tracing grava todas as páginas dele.
+        """
+        if not TRACE_PLAYWRIGHT_ON_FAILURE or context is None:
+            return
+        try:
+            await context.tracing.start(screenshots=True, snapshots=True)
+            self._context = context
+        except Exception as e:
+            print(f"[{self.server}] ⚠️ Tracing do Playwright não iniciado: {e}")
+
+    async def _stop_playwright(self, success: bool) -> str | None:
+        if self._context is None:
+            return None
+        path = None
+        if not success:
+            os.makedirs(TRACE_PLAYWRIGHT_DIR, exist_ok=True)
+            path = os.path.join(TRACE_PLAYWRIGHT_DIR, f"{self.automation}_{self.server}_{self.trace_id}.zip")
+        try:
+            await self._context.tracing.stop(path=path)
+        except Exception as e:
+            print(f"[{self.server}] ⚠️ Falha ao encerrar o tracing do Playwright: {e}")
+            return None
+        finally:
+            self._context = None
+        if path:
+            _prune_playwright_traces()
+        return path
+
+    def to_dict(self, success: bool) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "automacao": self.automation,
+            "servidor": self.server,
+            "inicio": self.started_at.isoformat(timespec="seconds"),
+            "duracao_ms": round((time.perf_counter() - self._t0) * 1000),
+            "sucesso": success,
+            "etapas": self.spans,
+        }
+
+    async def finish(self, success: bool) -> dict:
+        """Fecha a execução, loga a etapa mais lenta e persiste o trace."""
+        playwright_trace = await self._stop_playwright(success)
+        data = self.to_dict(success)
+        if playwright_trace:
+            data["playwright_trace"] = os.path.basename(playwright_trace)
+        slowest = max(self.spans, key=lambda s: s["duracao_ms"], default=None)
+        if slowest:
+            print(f"[{self.server}] ⏱️ {self.automation}: {data['duracao_ms'] / 1000:.1f}s "
+                  f"(etapa mais lenta: {slowest['etapa']} {slowest['duracao_ms'] / 1000:.1f}s)")
+        await self.store.save(data)
+        return data
+
+
+def _prune_playwright_traces():
+    """Mantém só os TRACE_PLAYWRIGHT_KEEP zips mais recentes."""
+    try:
+        zips = sorted(
+            (os.path.join(TRACE_PLAYWRIGHT_DIR, name) for name in os.listdir(TRACE_PLAYWRIGHT_DIR)
+             if name.endswith(".zip")),
+            key=os.path.getmtime, reverse=True,
+        )
+        for old in zips[TRACE_PLAYWRIGHT_KEEP:]:
+            os.remove(old)
+    except OSError:
+        pass
+
+
+class TraceStore:
+    """Últimos TRACE_HISTORY traces de cada automação numa lista do Redis (compartilhada com o gateway)."""
+
+    def __init__(self, store: AsyncRedisStore = redis_store, prefix: str = TRACE_KEY_PREFIX,
+                 history: int = TRACE_HISTORY):
+        self.store = store
+        self.prefix = prefix
+        self.history = history
+
+    async def save(self, data: dict):
+        """Falha do Redis é logada: o trace nunca derruba a automação."""
+        key = self.prefix + data["automacao"]
+        try:
+            await self.store.connect()
+            async with self.store.client.pipeline(transaction=False) as pipe:
+                pipe.lpush(key, json.dumps(data))
+                pipe.ltrim(key, 0, self.history - 1)
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            print(f"[{data['servidor']}] ⚠️ Trace de {data['automacao']} não gravado (Redis indisponível): {e}")
+
+    async def list(self, automation: str, server: str | None = None, limit: int = 20) -> list[dict]:
+        """Traces mais recentes primeiro, opcionalmente filtrados por servidor."""
+        await self.store.connect()
+        raw = await self.store.client.lrange(self.prefix + automation, 0, self.history - 1)
+        traces = [json.loads(item) for item in raw]
+        if server:
+            traces = [t for t in traces if t["servidor"] == server.upper()]
+        return traces[:limit]
+
+    async def get(self, automation: str, trace_id: str) -> dict | None:
+        for trace in await self.list(automation, limit=self.history):
+            if trace["trace_id"] == trace_id:
+                return trace
+        return None
+
+
+# Instância compartilhada do processo
+trace_store = TraceStore()
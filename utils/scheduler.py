@@ -0,0 +1,177 @@
+# utils/scheduler.py (Agendador de jobs: intervalo no relógio monotônico e diários estilo cron)
+
+import asyncio
+import datetime
+import json
+import os
+import time
+from typing import Awaitable, Callable
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+# Marcadores de última execução dos jobs diários (volume compartilhado cache_data, como o cache de sessão)
+SCHEDULER_STATE_PATH = os.getenv(
+    "SCHEDULER_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "scheduler_state.json")
+)
+# Atraso máximo para recuperar um job diário perdido (processo fora do ar no horário)
+SCHEDULER_CATCHUP_SECONDS = float(os.getenv("SCHEDULER_CATCHUP_SECONDS", str(6 * 3600)))
+# Maior cochilo de um job diário: o relógio de parede é reconferido (ajuste de hora, NTP)
+SCHEDULER_MAX_SLEEP_SECONDS = float(os.getenv("SCHEDULER_MAX_SLEEP_SECONDS", "60"))
+
+
+class SchedulerState:
+    """Marcadores persistidos (job -> data do último disparo) para não repetir nem perder execuções."""
+
+    def __init__(self, path: str = SCHEDULER_STATE_PATH):
+        self.path = path
+        self._markers: dict[str, str] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._markers = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"[SCHEDULER] ⚠️ Estado ilegível em {path} (recomeçando vazio): {e}")
+
+    def last_run(self, job_name: str) -> str | None:
+        return self._markers.get(job_name)
+
+    def mark(self, job_name: str, value: str):
+        self._markers[job_name] = value
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._markers, f)
+            os.replace(tmp_path, self.path)  # Troca atômica: nunca fica um JSON pela metade
+        except OSError as e:
+            print(f"[SCHEDULER] ⚠️ Não foi possível gravar o marcador de '{job_name}': {e}")
+
+
+class IntervalJob:
+    """
+    Job periódico. O próximo disparo é ancorado no início da execução anterior (relógio monotônico),
+    então o tempo gasto no trabalho não acumula atraso. `interval` pode ser um número ou uma função
+    consultada a cada ciclo (ex.: cadência adaptativa).
+    """
+
+    def __init__(self, name: str, func: Callable[[], Awaitable], interval: float | Callable[[], float]):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+    def _next_interval(self) -> float:
+        value = self.interval() if callable(self.interval) else self.interval
+        return max(0.5, float(value))
+
+    async def run_forever(self):
+        next_run = time.monotonic()
+        while True:
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            started = time.monotonic()
+            await _run_safely(self.name, self.func)
+            next_run = started + self._next_interval()
+            if next_run <= time.monotonic():
+                # Execução mais longa que o intervalo: segue sem rajada de execuções atrasadas
+                next_run = time.monotonic()
+
+
+class DailyJob:
+    """
+    Job diário estilo cron (hora:minuto, nos dias da semana informados; 0=Segunda).
+    Dispara uma única vez por dia: o marcador é gravado antes da execução. Se o processo estava
+    fora do ar no horário, recupera a execução ao subir, dentro de `catchup_seconds`.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Awaitable], hour: int, minute: int = 0,
+                 weekdays: tuple[int, ...] = (0, 1, 2, 3, 4), state: SchedulerState | None = None,
+                 catchup_seconds: float = SCHEDULER_CATCHUP_SECONDS):
+        self.name = name
+        self.func = func
+        self.hour = hour
+        self.minute = minute
+        self.weekdays = weekdays
+        self.state = state or SchedulerState()
+        self.catchup_seconds = catchup_seconds
+
+    def _slot(self, day: datetime.date) -> datetime.datetime:
+        return datetime.datetime.combine(day, datetime.time(self.hour, self.minute))
+
+    def pending_slot(self, now: datetime.datetime) -> datetime.datetime | None:
+        """Horário de hoje que já venceu e ainda não foi executado (dentro da janela de recuperação)."""
+        slot = self._slot(now.date())
+        if now.weekday() not in self.weekdays or now < slot:
+            return None
+        if self.state.last_run(self.name) == slot.date().isoformat():
+            return None
+        if (now - slot).total_seconds() > self.catchup_seconds:
+            return None
+        return slot
+
+    def next_slot(self, now: datetime.datetime) -> datetime.datetime:
+        day = now.date()
+        for offset in range(8):
+            candidate = day + datetime.timedelta(days=offset)
+            slot = self._slot(candidate)
+            if candidate.weekday() in self.weekdays and slot > now:
+                return slot
+        return self._slot(day + datetime.timedelta(days=1))
+
+    async def run_forever(self):
+        while True:
+            now = datetime.datetime.now()
+            slot = self.pending_slot(now)
+            if slot is not None:
+                late = (now - slot).total_seconds()
+                if late >= SCHEDULER_MAX_SLEEP_SECONDS:
+                    print(f"[SCHEDULER] ⏪ '{self.name}' perdido às {slot.strftime('%H:%M')}: recuperando agora "
+                          f"({late / 60:.0f} min de atraso)")
+                self.state.mark(self.name, slot.date().isoformat())
+                await _run_safely(self.name, self.func)
+                continue
+
+            wait = (self.next_slot(now) - now).total_seconds()
+            await asyncio.sleep(min(max(wait, 0.05), SCHEDULER_MAX_SLEEP_SECONDS))
+
+
+async def _run_safely(name: str, func: Callable[[], Awaitable]):
+    """Falha de uma execução é logada e não derruba o job."""
+    try:
+        await func()
+    except Exception as e:
+        print(f"[SCHEDULER] ❌ Job '{name}' falhou: {e}")
+
+
+class JobScheduler:
+    """Roda cada job registrado numa task própria: um import demorado não atrasa o monitoramento."""
+
+    def __init__(self, state: SchedulerState | None = None):
+        self.state = state or SchedulerState()
+        self.jobs: list[IntervalJob | DailyJob] = []
+
+    def every(self, name: str, func: Callable[[], Awaitable], interval: float | Callable[[], float]) -> IntervalJob:
+        job = IntervalJob(name, func, interval)
+        self.jobs.append(job)
+        return job
+
+    def daily(self, name: str, func: Callable[[], Awaitable], hour: int, minute: int = 0,
+              weekdays: tuple[int, ...] = (0, 1, 2, 3, 4),
+              catchup_seconds: float = SCHEDULER_CATCHUP_SECONDS) -> DailyJob:
+        job = DailyJob(name, func, hour, minute, weekdays, state=self.state, catchup_seconds=catchup_seconds)
+        self.jobs.append(job)
+        return job
+
+    async def run(self):
+        """Executa até ser cancelado; cancela todas as tasks dos jobs ao sair."""
+        tasks = [asyncio.create_task(job.run_forever(), name=job.name) for job in self.jobs]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,103 @@
+# utils/session_cache.py (Cache de Sessão do Discador via storage_state do Playwright)
+
+import os
+import json
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES (lidas do .env / Railway Secrets) ---
+# "disk" grava no volume compartilhado cache_data (/app/cache); "redis" usa o REDIS_URL
+SESSION_CACHE_BACKEND = os.getenv("SESSION_CACHE_BACKEND", "disk").lower()
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "1800"))
+SESSION_CACHE_DIR = os.getenv(
+    "SESSION_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "sessions")
+)
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_KEY_PREFIX = "sessao_discador:"
+
+
+class SessionCache:
+    """
+    Guarda o storage_state (cookies + localStorage) de cada servidor com TTL.
+    Permite que main.py, daily_mailing_worker.py e execuções avulsas reaproveitem a mesma sessão.
+    """
+
+    def __init__(self, backend: str = SESSION_CACHE_BACKEND, ttl_seconds: int = SESSION_CACHE_TTL_SECONDS,
+                 cache_dir: str = SESSION_CACHE_DIR, redis_url: str | None = REDIS_URL):
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._redis = None
+
+        if backend == "redis" and not redis_url:
+            print("[SESSION-CACHE] ⚠️ REDIS_URL ausente. Usando cache em disco.")
+            backend = "disk"
+        self.backend = backend
+        self.redis_url = redis_url
+
+    def _path(self, server: str) -> str:
+        return os.path.join(self.cache_dir, f"{server.upper()}.json")
+
+    async def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def load(self, server: str) -> dict | None:
+        """Retorna o storage_state salvo do servidor, ou None se ausente/expirado."""
+        try:
+            if self.backend == "redis":
+                raw = await (await self._get_redis()).get(REDIS_KEY_PREFIX + server.upper())
+            else:
+                with open(self._path(server), "r", encoding="utf-8") as f:
+                    raw = f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[{server.upper()}] ⚠️ Falha ao ler cache de sessão: {e}")
+            return None
+
+        if not raw:
+            return None
+
+        try:
+            entry = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+
+        if time.time() - entry.get("salvo_em", 0) > self.ttl_seconds:
+            return None
+        return entry.get("storage_state")
+
+    async def save(self, server: str, storage_state: dict):
+        """Grava o storage_state do servidor com o carimbo de tempo atual."""
+        raw = json.dumps({"salvo_em": time.time(), "storage_state": storage_state})
+        try:
+            if self.backend == "redis":
+                await (await self._get_redis()).set(REDIS_KEY_PREFIX + server.upper(), raw, ex=self.ttl_seconds)
+            else:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = self._path(server)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(raw)
+                os.replace(tmp_path, path)  # Escrita atômica: outros processos nunca leem arquivo parcial
+        except Exception as e:
+            print(f"[{server.upper()}] ⚠️ Falha ao gravar cache de sessão: {e}")
+
+    async def invalidate(self, server: str):
+        """Remove a sessão salva (ex.: o discador rejeitou os cookies)."""
+        try:
+            if self.backend == "redis":
+                await (await self._get_redis()).delete(REDIS_KEY_PREFIX + server.upper())
+            elif os.path.exists(self._path(server)):
+                os.remove(self._path(server))
+        except Exception as e:
+            print(f"[{server.upper()}] ⚠️ Falha ao invalidar cache de sessão: {e}")
+
+
+# Instância compartilhada do processo
+session_cache = SessionCache()
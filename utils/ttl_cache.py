@@ -0,0 +1,85 @@
+# utils/ttl_cache.py (Cache em memória com TTL, stale-while-revalidate e single-flight)
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+from utils.metrics import CACHE_REQUESTS_TOTAL
+
+
+class AsyncTTLCache:
+    """
+    Cache por chave (ex.: servidor) para respostas de upstream caras.
+    - Dentro do TTL: devolve o valor cacheado (hit).
+    - Entre TTL e TTL + stale: devolve o valor velho na hora e revalida em segundo plano.
+    - Requisições simultâneas para a mesma chave compartilham uma única busca (single-flight).
+    """
+
+    def __init__(self, ttl_seconds: float, stale_seconds: float = 0.0,
+                 should_cache: Callable[[Any], bool] | None = None, name: str = "cache"):
+        self.name = name  # Label 'cache' das métricas
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.should_cache = should_cache or (lambda value: True)
+        self._entries: dict[str, tuple[float, Any]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_fetch(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl_seconds:
+                self.hits += 1
+                CACHE_REQUESTS_TOTAL.inc(cache=self.name, resultado="hit")
+                return entry[1]
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stale_hits += 1
+                CACHE_REQUESTS_TOTAL.inc(cache=self.name, resultado="stale")
+                self._start_fetch(key, fetcher)  # Revalida em segundo plano
+                return entry[1]
+
+        self.misses += 1
+        CACHE_REQUESTS_TOTAL.inc(cache=self.name, resultado="miss")
+        return await asyncio.shield(self._start_fetch(key, fetcher))
+
+    def _start_fetch(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            CACHE_REQUESTS_TOTAL.inc(cache=self.name, resultado="coalesced")
+            return task
+
+        async def _run():
+            try:
+                value = await fetcher()
+                if self.should_cache(value):
+                    self._entries[key] = (time.monotonic(), value)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.create_task(_run())
+        # Revalidações em segundo plano podem falhar sem ninguém aguardando: consome a exceção
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+        return task
+
+    def invalidate(self, key: str | None = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "chaves": len(self._entries),
+            "ttl_segundos": self.ttl_seconds,
+            "stale_segundos": self.stale_seconds,
+        }
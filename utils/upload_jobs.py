@@ -0,0 +1,147 @@
+# utils/upload_jobs.py (Fila de Jobs de Upload de Mailing em Segundo Plano)
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+from utils.dialer_driver import dialer_driver
+
+load_dotenv()
+
+# --- CONFIGURAÇÕES ---
+UPLOAD_JOBS_PER_SERVER = int(os.getenv("UPLOAD_JOBS_PER_SERVER", "1"))   # Imports simultâneos por servidor
+UPLOAD_JOBS_RETENTION = int(os.getenv("UPLOAD_JOBS_RETENTION", "200"))   # Jobs mantidos para consulta
+UPLOAD_JOBS_TEMP_DIR = os.getenv("UPLOAD_JOBS_TEMP_DIR")                 # None = diretório temporário do sistema
+
+
+@dataclass
+class UploadJob:
+    job_id: str
+    servidor: str
+    campanha_id: str
+    mailling_name: str
+    login_crm: str
+    source_path: str
+    normalize_phones: bool | None = None
+    estado: str = "na_fila"  # na_fila -> processando -> concluido | falhou
+    criado_em: float = field(default_factory=time.time)
+    iniciado_em: float | None = None
+    concluido_em: float | None = None
+    stats: dict = field(default_factory=dict)
+    resposta_discador: dict | None = None
+    erro: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        espera = (self.iniciado_em - self.criado_em) if self.iniciado_em else None
+        duracao = (self.concluido_em - self.iniciado_em) if self.concluido_em and self.iniciado_em else None
+        return {
+            "job_id": self.job_id,
+            "estado": self.estado,
+            "servidor": self.servidor,
+            "campanha_id": self.campanha_id,
+            "mailling_name": self.mailling_name,
+            "linhas_origem": self.stats.get("linhas_origem"),
+            "linhas_enviadas": self.stats.get("linhas_enviadas"),
+            "descartes": self.stats.get("descartes"),
+            "tempos": {
+                "criado_em": self.criado_em,
+                "iniciado_em": self.iniciado_em,
+                "concluido_em": self.concluido_em,
+                "espera_segundos": espera,
+                "duracao_segundos": duracao,
+            },
+            "resposta_discador": self.resposta_discador,
+            "erro": self.erro,
+        }
+
+
+class UploadJobQueue:
+    """
+    Recebe uploads, grava a origem num diretório temporário exclusivo do job e processa
+    em segundo plano com concorrência limitada por servidor (MG e SP importam em paralelo).
+    """
+
+    def __init__(self, max_per_server: int = UPLOAD_JOBS_PER_SERVER, retention: int = UPLOAD_JOBS_RETENTION):
+        self.max_per_server = max_per_server
+        self.retention = retention
+        self._jobs: OrderedDict[str, UploadJob] = OrderedDict()
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def new_workdir(self) -> tuple[str, str]:
+        """Cria o diretório isolado de um novo job e retorna (job_id, caminho do arquivo de origem)."""
+        job_id = uuid.uuid4().hex
+        workdir = tempfile.mkdtemp(prefix=f"upload_{job_id}_", dir=UPLOAD_JOBS_TEMP_DIR)
+        return job_id, os.path.join(workdir, "origem.csv")
+
+    def submit(self, job_id: str, source_path: str, servidor: str, campanha_id: str, mailling_name: str,
+               login_crm: str, normalize_phones: bool | None = None) -> UploadJob:
+        """Enfileira o job cuja origem já foi gravada em `source_path` e retorna imediatamente."""
+        job = UploadJob(job_id=job_id, servidor=servidor, campanha_id=campanha_id,
+                        mailling_name=mailling_name, login_crm=login_crm, source_path=source_path,
+                        normalize_phones=normalize_phones)
+        self._jobs[job_id] = job
+        self._trim()
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> UploadJob | None:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[dict]:
+        return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    async def wait(self, job_id: str) -> UploadJob:
+        """Aguarda o término do job (modo síncrono de compatibilidade)."""
+        job = self._jobs[job_id]
+        if job.task is not None:
+            await asyncio.shield(job.task)
+        return job
+
+    async def _run(self, job: UploadJob):
+        semaphore = self._semaphores.setdefault(job.servidor, asyncio.Semaphore(self.max_per_server))
+        try:
+            async with semaphore:
+                job.estado = "processando"
+                job.iniciado_em = time.time()
+                print(f"[UPLOAD-JOB] ⚙️ {job.job_id} iniciado ({job.servidor})")
+
+                job.resposta_discador = await dialer_driver.import_mailing(
+                    job.servidor,
+                    job.campanha_id,
+                    source_csv_path=job.source_path,
+                    mailling_name=job.mailling_name,
+                    login_crm=job.login_crm,
+                    stats=job.stats,
+                    normalize_phones=job.normalize_phones,
+                )
+                if job.resposta_discador.get("lotes_com_falha"):
+                    raise Exception(f"Lotes com falha após as tentativas: {job.resposta_discador['lotes_com_falha']}")
+                if not job.resposta_discador.get("success"):
+                    raise Exception(f"Discador recusou o mailing: {str(job.resposta_discador)[:300]}")
+                job.estado = "concluido"
+                print(f"[UPLOAD-JOB] ✅ {job.job_id} concluído ({job.stats.get('linhas_enviadas')} linhas)")
+        except Exception as e:
+            job.estado = "falhou"
+            job.erro = str(e)
+            print(f"[UPLOAD-JOB] ❌ {job.job_id} falhou: {e}")
+        finally:
+            job.concluido_em = time.time()
+            shutil.rmtree(os.path.dirname(job.source_path), ignore_errors=True)
+
+    def _trim(self):
+        """Descarta os jobs finalizados mais antigos além da retenção."""
+        while len(self._jobs) > self.retention:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.estado in ("na_fila", "processando"):
+                break
+            self._jobs.pop(oldest_id)
+
+
+# Instância compartilhada do gateway
+upload_jobs = UploadJobQueue()